@@ -6,10 +6,34 @@ MD to HWPX Converter v2.0
 
 import re
 import json
+import hashlib
 import zipfile
+import zlib
 import os
 import argparse
+import glob
+import fnmatch
+import collections
+import time
+import contextlib
+import io
+import itertools
+import operator
+import bisect
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
 from datetime import datetime
+from typing import NamedTuple
+import xml.etree.ElementTree as ET
+
+HWPX_NS = {
+    'hh': 'http://www.hancom.co.kr/hwpml/2011/head',
+    'hc': 'http://www.hancom.co.kr/hwpml/2011/core',
+    'hp': 'http://www.hancom.co.kr/hwpml/2011/paragraph',
+    'hs': 'http://www.hancom.co.kr/hwpml/2011/section',
+}
 
 class StyleTextbookParser:
     """style_textbook.md 파서 - 한글 스타일 규칙 읽기"""
@@ -94,27 +118,95 @@ class StyleTextbookParser:
         return styles
 
 
+class RulebookBundle:
+    """컴파일된 규칙북 번들 (바이너리)
+
+    구성: MAGIC(8) | sha256(payload)(32) | payload
+    payload: u32 메타 길이 | 메타 JSON(utf-8) | 사전 렌더링된 header.xml 바이트들
+    메타 JSON의 headers는 {헤더 캐시 키: [오프셋, 길이]} (오프셋은 메타 뒤 데이터 기준)
+    """
+
+    MAGIC = b'HWPXRB\x00\x01'
+    VERSION = 1
+
+    @classmethod
+    def encode(cls, data: dict, headers: dict) -> bytes:
+        blobs = []
+        index = {}
+        offset = 0
+        for key, blob in headers.items():
+            index[key] = [offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+        meta = json.dumps({'version': cls.VERSION, 'data': data, 'headers': index}, ensure_ascii=False).encode('utf-8')
+        payload = len(meta).to_bytes(4, 'little') + meta + b''.join(blobs)
+        return cls.MAGIC + hashlib.sha256(payload).digest() + payload
+
+    @classmethod
+    def decode(cls, raw: bytes) -> dict:
+        """번들 검증 후 {'data': ..., 'headers': {키: bytes}} 반환"""
+        if not raw.startswith(cls.MAGIC):
+            raise ValueError('not a rulebook bundle')
+        digest = raw[8:40]
+        payload = memoryview(raw)[40:]
+        if hashlib.sha256(payload).digest() != digest:
+            raise ValueError('rulebook bundle checksum mismatch')
+        meta_len = int.from_bytes(payload[:4], 'little')
+        meta = json.loads(bytes(payload[4:4 + meta_len]).decode('utf-8'))
+        if meta.get('version') != cls.VERSION:
+            raise ValueError(f"unsupported rulebook bundle version: {meta.get('version')}")
+        base = 4 + meta_len
+        headers = {key: bytes(payload[base + off:base + off + size]) for key, (off, size) in meta['headers'].items()}
+        return {'data': meta['data'], 'headers': headers}
+
+
 class RulebookLoader:
     """규칙북 로더"""
 
-    def __init__(self, styles_json_path, textbook_path=None):
-        with open(styles_json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def __init__(self, styles_json_path, textbook_path=None, log=None):
+        # 스타일 JSON 또는 컴파일된 규칙북 번들(RulebookBundle)을 한 번에 읽는다
+        # log: 로딩 메시지를 기록할 스트림 (None이면 stdout)
+        with open(styles_json_path, 'rb') as f:
+            raw = f.read()
+        bundle = RulebookBundle.decode(raw) if raw.startswith(RulebookBundle.MAGIC) else None
+        data = bundle['data'] if bundle else json.loads(raw.decode('utf-8'))
 
         self.char_styles = {s['id']: s for s in data['char_styles']}
         self.para_styles = {s['id']: s for s in data['para_styles']}
 
-        # style_textbook.md 로딩
+        # 번들에 포함된 사전 렌더링 header.xml (헤더 캐시 키 -> 바이트)
+        self.prerendered_headers = {}
+        self.style_guide = None
+
+        # style_textbook.md 로딩 (번들은 이미 파싱된 결과를 포함)
         self.textbook_styles = None
-        if textbook_path and os.path.exists(textbook_path):
+        if bundle:
+            self.textbook_styles = data['textbook_styles']
+            self.prerendered_headers = bundle['headers']
+            self.style_guide = data.get('style_guide')
+            print(f"[OK] 규칙북 번들 로딩 완료: {styles_json_path}", file=log)
+        elif textbook_path and os.path.exists(textbook_path):
             self.textbook_styles = StyleTextbookParser.parse(textbook_path)
             if self.textbook_styles:
-                print(f"[OK] style_textbook.md 로딩 완료: {len(self.textbook_styles)}개 스타일")
+                print(f"[OK] style_textbook.md 로딩 완료: {len(self.textbook_styles)}개 스타일", file=log)
 
         # 기본 스타일 ID (신규 합성 스타일)
         # HWPX는 연속된 ID를 선호하므로 20대 숫자로 재배치
         self.BOLD_CHAR_ID = 23
         self.ITALIC_CHAR_ID = 24
+        # ***굵게+기울임*** 및 굵게/기울임 중첩 구간 (본문 글꼴 Bold+Italic)
+        self.BOLD_ITALIC_CHAR_ID = 25
+
+        # 폰트 매핑 (ID 기반) - Windows 호환 폰트 사용
+        # id 0: 맑은 고딕 (제목/고딕 계열)
+        # id 1: 휴먼명조 (본문 명조 계열)
+        # id 2: 보조 고딕 (코드 등)
+        self.FONT_IDS = {
+            'HY헤드라인M': 0,    # 맑은 고딕으로 대체
+            '휴먼명조': 1,
+            '맑은 고딕': 0
+        }
+
         # Spacer styles (NBSP 전용): 소제목/내용/설명/-*별표설명 앞 간격용
         # char: 높이 10/8/6/4pt, para: snapToGrid=0, lineSpacing=100
         self.SPACER = {
@@ -125,6 +217,14 @@ class RulebookLoader:
         }
         self.CODE_CHAR_ID = 44
 
+        # GFM 표: 표/셀 테두리는 기존 borderFill(3: 실선, 6: 실선+배경)을 쓰고,
+        # 셀 정렬(:---, :---:, ---:)별 문단 모양은 header의 32~34 paraPr를 쓴다
+        self.TABLE = {
+            'border_fill_id': 3,
+            'header_border_fill_id': 6,
+            'align_para_ids': {'left': 32, 'center': 33, 'right': 34},
+        }
+
         # MD 패턴 매핑 (스타일 텍스트북 기반)
         self.patterns = {
             # 제목: 맑은 고딕(8/9)
@@ -146,18 +246,216 @@ class RulebookLoader:
             'ul_level2': {'char_id': 15, 'para_id': 26, 'bold_char_id': 16, 'italic_char_id': self.ITALIC_CHAR_ID},
             'ol':        {'char_id': 11, 'para_id': 24, 'bold_char_id': 16, 'italic_char_id': self.ITALIC_CHAR_ID},
             'table_raw': {'char_id': 11, 'para_id': 24, 'bold_char_id': 16, 'italic_char_id': self.ITALIC_CHAR_ID},
+            # 표 머리행(굵게, 가운데)/본문 셀(왼쪽). 정렬 행이 지정한 열은 TABLE['align_para_ids']를 쓴다
+            'table_header': {'char_id': 16, 'para_id': 33, 'bold_char_id': 16, 'italic_char_id': self.ITALIC_CHAR_ID},
+            'table_cell':   {'char_id': 11, 'para_id': 32, 'bold_char_id': 16, 'italic_char_id': self.ITALIC_CHAR_ID},
         }
+        # 번들은 스타일 가이드 매핑까지 해석된 패턴을 그대로 사용한다
+        if bundle:
+            self.patterns = data['patterns']
+            self.FONT_IDS = data['font_ids']
+
+        # 스타일 가이드가 정의한 charPr/paraPr 속성 (ID -> 덮어쓸 속성, header 생성 시 적용)
+        self.char_overrides, self.para_overrides = {}, {}
+        if self.style_guide:
+            self.char_overrides, self.para_overrides = self._style_guide_overrides(self.style_guide)
 
     def get_style(self, element_type):
         """요소 타입에 맞는 스타일 반환"""
         return self.patterns.get(element_type, self.patterns['paragraph'])
 
-class MDParser:
-    """Markdown 파서"""
-    
+    # 스타일 가이드(YAML) mappings 키 -> 요소 타입
+    STYLE_GUIDE_KEYS = {
+        'md.h1': 'h1', 'md.h2': 'h2', 'md.h3': 'h3',
+        'md.paragraph': 'paragraph',
+        'md.ul.level1': 'ul', 'md.ul.level2': 'ul_level2',
+        'md.ol.level1': 'ol',
+        'md.table.header': 'table_header', 'md.table.cell': 'table_cell',
+    }
+
+    # 스타일 가이드에서 읽는 최상위 항목과 스타일별 속성 (그 밖의 키는 ValueError)
+    STYLE_GUIDE_SECTIONS = ('meta', 'char_styles', 'para_styles', 'mappings')
+    STYLE_GUIDE_CHAR_KEYS = ('base_id', 'bold', 'italic', 'color', 'font', 'size_pt')
+    # 문단 여백 속성 -> paraPr margin 요소 (값은 <이름>_pt 또는 <이름>_hwpunit, 1pt = 100 HWPUNIT)
+    STYLE_GUIDE_MARGINS = {
+        'first_line_indent': 'intent', 'left_indent': 'left', 'right_indent': 'right',
+        'space_before': 'prev', 'space_after': 'next',
+    }
+    STYLE_GUIDE_PARA_KEYS = ('base_id', 'align', 'line_spacing_pct') + tuple(
+        f"{name}_{unit}" for name in STYLE_GUIDE_MARGINS for unit in ('pt', 'hwpunit')
+    )
+    STYLE_GUIDE_ALIGNS = ('LEFT', 'RIGHT', 'CENTER', 'JUSTIFY', 'DISTRIBUTE', 'DISTRIBUTE_SPACE')
+
+    def _style_guide_overrides(self, guide: dict):
+        """스타일 가이드의 char_styles/para_styles를 ID별 charPr/paraPr 속성으로 해석
+
+        반환: (char ID -> {height, font_id, bold, italic, color}, para ID -> {align, line_spacing, margins})
+        중 가이드에 적힌 속성만 담는다. 알 수 없는 키·값은 ValueError.
+        """
+        unknown = sorted(set(guide) - set(self.STYLE_GUIDE_SECTIONS))
+        if unknown:
+            raise ValueError(f"style guide: unsupported section(s) {unknown} (supported: {', '.join(self.STYLE_GUIDE_SECTIONS)})")
+        spacer_chars = {spacer['char_id'] for spacer in self.SPACER.values()}
+        spacer_paras = {spacer['para_id'] for spacer in self.SPACER.values()}
+
+        def base_id(kind, name, spec, allowed, reserved):
+            if not isinstance(spec, dict):
+                raise ValueError(f"style guide: {kind} style {name!r} must be a mapping")
+            bad = sorted(set(spec) - set(allowed))
+            if bad:
+                raise ValueError(f"style guide: {kind} style {name!r} has unknown key(s) {bad} (supported: {', '.join(allowed)})")
+            if 'base_id' not in spec:
+                return None
+            sid = int(spec['base_id'])
+            if sid in reserved:
+                raise ValueError(f"style guide: {kind} style {name!r} base_id {sid} is reserved for spacer paragraphs")
+            return sid
+
+        chars = {}
+        for name, spec in (guide.get('char_styles') or {}).items():
+            cid = base_id('char', name, spec, self.STYLE_GUIDE_CHAR_KEYS, spacer_chars)
+            override = {key: bool(spec[key]) for key in ('bold', 'italic') if key in spec}
+            if 'size_pt' in spec:
+                override['height'] = int(round(float(spec['size_pt']) * 100))
+            if 'font' in spec:
+                if spec['font'] not in self.FONT_IDS:
+                    raise ValueError(f"style guide: char style {name!r} font {spec['font']!r} is not one of {', '.join(self.FONT_IDS)}")
+                override['font_id'] = self.FONT_IDS[spec['font']]
+            if 'color' in spec:
+                if not re.fullmatch(r'#[0-9A-Fa-f]{6}', str(spec['color'])):
+                    raise ValueError(f"style guide: char style {name!r} color {spec['color']!r} must be #RRGGBB")
+                override['color'] = str(spec['color']).upper()
+            if cid is not None:
+                chars[cid] = override
+
+        paras = {}
+        for name, spec in (guide.get('para_styles') or {}).items():
+            pid = base_id('para', name, spec, self.STYLE_GUIDE_PARA_KEYS, spacer_paras)
+            override = {}
+            if 'align' in spec:
+                align = str(spec['align']).upper()
+                if align not in self.STYLE_GUIDE_ALIGNS:
+                    raise ValueError(f"style guide: para style {name!r} align {spec['align']!r} is not one of {', '.join(self.STYLE_GUIDE_ALIGNS)}")
+                override['align'] = align
+            if 'line_spacing_pct' in spec:
+                override['line_spacing'] = str(int(spec['line_spacing_pct']))
+            margins = {}
+            for key, element in self.STYLE_GUIDE_MARGINS.items():
+                if f"{key}_pt" in spec and f"{key}_hwpunit" in spec:
+                    raise ValueError(f"style guide: para style {name!r} sets both {key}_pt and {key}_hwpunit")
+                if f"{key}_pt" in spec:
+                    margins[element] = int(round(float(spec[f"{key}_pt"]) * 100))
+                elif f"{key}_hwpunit" in spec:
+                    margins[element] = int(spec[f"{key}_hwpunit"])
+            if margins:
+                override['margins'] = margins
+            if pid is not None:
+                paras[pid] = override
+        return chars, paras
+
+    def apply_style_guide(self, guide: dict):
+        """스타일 가이드를 규칙북에 적용
+
+        mappings는 요소 타입별 char/para ID를 덮어쓴다. 값의 para/char는 para_styles/char_styles 항목 이름이며,
+        실제 ID는 각 항목의 base_id이다. 요소 타입 이름(main_title 등)을 키로 직접 써도 된다.
+        char_styles/para_styles의 속성(글꼴·크기·색, 정렬·줄간격·들여쓰기·문단 위아래 여백)은
+        생성 header에서 해당 base_id의 charPr/paraPr에 반영된다 (_style_guide_overrides 참고).
+        """
+        char_overrides, para_overrides = self._style_guide_overrides(guide)
+        char_defs = guide.get('char_styles') or {}
+        para_defs = guide.get('para_styles') or {}
+        for key, target in (guide.get('mappings') or {}).items():
+            element_type = self.STYLE_GUIDE_KEYS.get(key, key)
+            if element_type not in self.patterns:
+                raise ValueError(f"style guide: unknown mapping key {key!r}")
+            if not isinstance(target, dict) or set(target) - {'para', 'char'}:
+                raise ValueError(f"style guide: mapping {key!r} must only have para/char")
+            pattern = dict(self.patterns[element_type])
+            if target.get('char'):
+                name = target['char']
+                if name not in char_defs or 'base_id' not in char_defs[name]:
+                    raise ValueError(f"style guide: char style {name!r} (for {key}) has no base_id")
+                pattern['char_id'] = int(char_defs[name]['base_id'])
+                if char_defs[name].get('bold'):
+                    pattern['bold_char_id'] = pattern['char_id']
+            if target.get('para'):
+                name = target['para']
+                if name not in para_defs or 'base_id' not in para_defs[name]:
+                    raise ValueError(f"style guide: para style {name!r} (for {key}) has no base_id")
+                pattern['para_id'] = int(para_defs[name]['base_id'])
+            self.patterns[element_type] = pattern
+        self.char_overrides, self.para_overrides = char_overrides, para_overrides
+        self.style_guide = guide
+
+    def referenced_ids(self):
+        """규칙북이 섹션에서 참조하는 (char ID 집합, para ID 집합)"""
+        chars = {self.BOLD_CHAR_ID, self.ITALIC_CHAR_ID, self.BOLD_ITALIC_CHAR_ID, self.CODE_CHAR_ID}
+        paras = set()
+        for pattern in self.patterns.values():
+            chars.update(pattern[k] for k in ('char_id', 'bold_char_id', 'italic_char_id') if k in pattern)
+            paras.add(pattern['para_id'])
+        for spacer in self.SPACER.values():
+            chars.add(spacer['char_id'])
+            paras.add(spacer['para_id'])
+        paras.update(self.TABLE['align_para_ids'].values())
+        return chars, paras
+
+class InlineSegment(NamedTuple):
+    """인라인 서식 세그먼트 (text, char_id, flags 비트: BOLD/ITALIC/CODE)"""
+    text: str
+    char_id: int
+    flags: int = 0
+
+    BOLD = 1
+    ITALIC = 2
+    CODE = 4
+
+    @property
+    def bold(self):
+        return bool(self.flags & InlineSegment.BOLD)
+
+    @property
+    def italic(self):
+        return bool(self.flags & InlineSegment.ITALIC)
+
+    @property
+    def code(self):
+        return bool(self.flags & InlineSegment.CODE)
+
+
+class LineClassifier:
+    """마커 디스패치 기반 라인 분류기
+
+    라인의 첫 비공백 문자로 규칙 목록을 바로 찾아 해당 마커의 (미리 컴파일된) 패턴만 검사한다.
+    일반 단락은 테이블 조회 한 번으로 끝나며, 새 마커는 register()로 추가한다.
+    """
+
+    def __init__(self):
+        # 첫 비공백 문자 -> [(compiled, element_type, text_fn, marker, notes, warnings), ...]
+        self._table = {}
+        # 특정 문자로 키를 잡기 어려운 규칙 (guard(첫 문자)가 참일 때만 검사)
+        self._fallback = []
+
     @staticmethod
-    def parse_line(line):
-        """라인 타입 및 내용 파싱"""
+    def _rest(m, line):
+        return line[m.end():]
+
+    def register(self, markers, pattern, element_type, text=None, marker=None, notes=(), warnings=(), guard=None):
+        """규칙 등록
+
+        markers: 규칙이 적용될 첫 비공백 문자(들). None이면 guard 기반 폴백 규칙으로 등록
+        pattern: 라인 전체에 적용할 정규식 (등록 시 컴파일)
+        text: (match, line) -> 본문 텍스트. 생략 시 매치 이후 나머지 문자열
+        """
+        rule = (re.compile(pattern), element_type, text or self._rest, marker, tuple(notes), tuple(warnings))
+        if markers is None:
+            self._fallback.append((guard, rule))
+            return
+        for ch in markers:
+            self._table.setdefault(ch, []).append(rule)
+
+    def classify(self, line):
+        """라인 타입 및 내용 파싱 -> (element_type, text, metadata)"""
         original_line = line.rstrip('\n')
         metadata = {
             'original': original_line,
@@ -166,157 +464,545 @@ class MDParser:
             'warnings': []
         }
         line = original_line
+        head = line.lstrip()[:1]
 
         # 빈 줄
-        if not line.strip():
+        if not head:
             metadata['notes'].append('blank-line')
             return ('empty', '', metadata)
 
-        # 스타일 텍스트북 기반 특수 마커
-        main_title_match = re.match(r'^<주제목>\s*(.+)', line)
-        if main_title_match:
-            metadata['marker'] = '<주제목>'
-            metadata['notes'].append('requires-title-table')
-            return ('main_title', main_title_match.group(1).strip(), metadata)
-
-        m = re.match(r'^□\s+(.*)', line)
-        if m:
-            metadata['marker'] = '□'
-            text_value = m.group(1).strip()
-            metadata['notes'].append('sub-title-marker')
-            return ('sub_title', f'□ {text_value}', metadata)
-
-        m = re.match(r'^\s*◦\s+(.*)', line)
-        if m:
-            metadata['marker'] = '◦'
-            text_value = m.group(1).strip()
-            metadata['notes'].append('body-bullet-marker')
-            # 요구사항: o(원형 불릿) 앞에 공백 한 칸 보장
-            return ('body_bullet', f' ◦ {text_value}', metadata)
-
-        m = re.match(r'^\s{3}-\s+(.*)', line)
-        if m:
-            metadata['marker'] = '---'
-            text_value = m.group(1).strip()
-            metadata['notes'].append('description-dash-marker')
-            return ('description_dash', f'   - {text_value}', metadata)
-
-        m = re.match(r'^\s{4}\*\s+(.*)', line)
-        if m:
-            metadata['marker'] = '****'
-            text_value = m.group(1).strip()
-            metadata['notes'].append('description-star-marker')
-            return ('description_star', f'    * {text_value}', metadata)
-
-        m = re.match(r'^<강조>\s*(.+)', line)
-        if m:
-            metadata['marker'] = '<강조>'
-            metadata['notes'].append('requires-emphasis-table')
-            return ('emphasis', f'◈ {m.group(1).strip()}', metadata)
-
-        # 테이블 라인 감지 (현재 미지원)
-        if re.match(r'^\|.+\|$', line):
-            metadata['marker'] = 'table'
-            metadata['warnings'].append('table-not-implemented')
-            return ('table_raw', line.strip(), metadata)
+        rules = self._table.get(head)
+        if rules:
+            for compiled, element_type, text_fn, marker, notes, warnings in rules:
+                m = compiled.match(line)
+                if m:
+                    return self._build(m, line, metadata, element_type, text_fn, marker, notes, warnings)
+        for guard, (compiled, element_type, text_fn, marker, notes, warnings) in self._fallback:
+            if guard is None or guard(head):
+                m = compiled.match(line)
+                if m:
+                    return self._build(m, line, metadata, element_type, text_fn, marker, notes, warnings)
 
-        # 제목
-        if re.match(r'^### ', line):
-            return ('h3', re.sub(r'^### ', '', line), metadata)
-        elif re.match(r'^## ', line):
-            return ('h2', re.sub(r'^## ', '', line), metadata)
-        elif re.match(r'^# ', line):
-            return ('h1', re.sub(r'^# ', '', line), metadata)
+        # 일반 단락
+        return ('paragraph', line, metadata)
 
+    @staticmethod
+    def _build(m, line, metadata, element_type, text_fn, marker, notes, warnings):
+        metadata['marker'] = marker
+        if notes:
+            metadata['notes'].extend(notes)
+        if warnings:
+            metadata['warnings'].extend(warnings)
+        return (element_type, text_fn(m, line), metadata)
+
+    @classmethod
+    def default(cls):
+        """스타일 텍스트북 마커 + 기본 Markdown 규칙"""
+        c = cls()
+        # 스타일 텍스트북 기반 특수 마커
+        c.register('<', r'<주제목>\s*(.+)', 'main_title', marker='<주제목>',
+                   text=lambda m, line: m.group(1).strip(), notes=['requires-title-table'])
+        c.register('<', r'<강조>\s*(.+)', 'emphasis', marker='<강조>',
+                   text=lambda m, line: f'◈ {m.group(1).strip()}', notes=['requires-emphasis-table'])
+        c.register('□', r'□\s+(.*)', 'sub_title', marker='□',
+                   text=lambda m, line: f'□ {m.group(1).strip()}', notes=['sub-title-marker'])
+        # 요구사항: o(원형 불릿) 앞에 공백 한 칸 보장
+        c.register('◦', r'\s*◦\s+(.*)', 'body_bullet', marker='◦',
+                   text=lambda m, line: f' ◦ {m.group(1).strip()}', notes=['body-bullet-marker'])
+        c.register('-', r'\s{3}-\s+(.*)', 'description_dash', marker='---',
+                   text=lambda m, line: f'   - {m.group(1).strip()}', notes=['description-dash-marker'])
+        c.register('*', r'\s{4}\*\s+(.*)', 'description_star', marker='****',
+                   text=lambda m, line: f'    * {m.group(1).strip()}', notes=['description-star-marker'])
+        # 표 라인 감지 (연속된 행은 MDtoHWPXConverter가 GFM 표로 묶는다)
+        c.register('|', r'\|.+\|$', 'table_raw', marker='table',
+                   text=lambda m, line: line.strip())
+        # 제목
+        c.register('#', r'### ', 'h3')
+        c.register('#', r'## ', 'h2')
+        c.register('#', r'# ', 'h1')
         # 리스트
-        elif re.match(r'^    - ', line):
-            metadata['marker'] = 'list-indent'
-            return ('ul_level2', re.sub(r'^    - ', '', line), metadata)
-        elif re.match(r'^  - ', line):
-            metadata['marker'] = 'list-indent'
-            return ('ul_level2', re.sub(r'^  - ', '', line), metadata)
-        elif re.match(r'^- ', line):
-            metadata['marker'] = '-'
-            return ('ul', re.sub(r'^- ', '', line), metadata)
-        elif re.match(r'^\d+\. ', line):
-            metadata['marker'] = 'numbered'
-            return ('ol', re.sub(r'^\d+\. ', '', line), metadata)
+        c.register('-', r'    - ', 'ul_level2', marker='list-indent')
+        c.register('-', r'  - ', 'ul_level2', marker='list-indent')
+        c.register('-', r'- ', 'ul', marker='-')
+        c.register(None, r'\d+\. ', 'ol', marker='numbered', guard=str.isdecimal)
+        return c
 
-        # 일반 단락
-        else:
-            return ('paragraph', line, metadata)
+
+class MDParser:
+    """Markdown 파서"""
+
+    # 라인 분류기 (새 마커는 MDParser.classifier.register(...)로 추가)
+    classifier = LineClassifier.default()
+
+    @staticmethod
+    def parse_line(line):
+        """라인 타입 및 내용 파싱"""
+        return MDParser.classifier.classify(line)
     
+    # GFM 표: 이스케이프되지 않은 | 로 셀을 나누고, 정렬 행 셀은 :?-+:? 형식
+    TABLE_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+    TABLE_ALIGN_CELL = re.compile(r':?-+:?')
+
+    @staticmethod
+    def split_table_row(line):
+        """표 행 -> 셀 텍스트 목록 (양 끝 | 제거, \\| 는 셀 내용의 | 로 복원)"""
+        row = line.strip()
+        if row.startswith('|'):
+            row = row[1:]
+        if row.endswith('|') and not row.endswith('\\|'):
+            row = row[:-1]
+        return [cell.strip().replace('\\|', '|') for cell in MDParser.TABLE_CELL_SPLIT.split(row)]
+
+    @staticmethod
+    def parse_table_alignments(line):
+        """정렬 행(|:---|---:|) -> 열별 정렬 목록 ('left'/'center'/'right'/None), 정렬 행이 아니면 None"""
+        alignments = []
+        for cell in MDParser.split_table_row(line):
+            cell = cell.replace(' ', '')
+            if not MDParser.TABLE_ALIGN_CELL.fullmatch(cell):
+                return None
+            if cell.startswith(':') and cell.endswith(':'):
+                alignments.append('center')
+            elif cell.endswith(':'):
+                alignments.append('right')
+            elif cell.startswith(':'):
+                alignments.append('left')
+            else:
+                alignments.append(None)
+        return alignments
+
+    # 인라인 토큰: 이스케이프(\* \`), 별표 연속, 백틱 (역추적 없는 패턴)
+    INLINE_TOKEN = re.compile(r'\\[*`]|\*+|`')
+
     @staticmethod
     def process_inline_formats(text, base_char_id):
-        """인라인 서식 처리 - 여러 run으로 분리"""
-        segments = []
+        """인라인 서식 처리 - 여러 run(InlineSegment)으로 분리
+
+        토큰을 왼쪽에서 오른쪽으로 한 번만 읽는 상태 기계이므로 짝 없는 * 가 많은 라인도 길이에 선형이다.
+        **굵게**, *기울임*, ***굵게+기울임***과 서로의 중첩, `코드`(내용은 서식 해석 없음), \\* \\` 이스케이프를
+        지원한다. 공백 뒤의 별표는 닫지 않고 공백 앞의 별표는 열지 않으므로 `a * b * c` 같은 곱셈·각주 기호와
+        `** spaced **`는 (예전 정규식과 달리) 서식이 되지 않으며, 끝까지 닫히지 않은 구분자는 문자 그대로 남는다.
+        선형성은 tests/test_inline.py가 실행 단계 수로 검사한다.
+        """
+        # 서식 문자가 없는 일반 문장은 토큰화하지 않고 단일 세그먼트로 반환
+        if '*' not in text and '`' not in text:
+            return [InlineSegment(text, base_char_id, 0)]
+
+        BOLD, ITALIC, CODE = InlineSegment.BOLD, InlineSegment.ITALIC, InlineSegment.CODE
+        close = MDParser._close_inline
+        # 조각 [텍스트, 서식 플래그] 목록. 짝이 맞은 구분자 자리는 None (run 경계)
+        pieces = []
+        # 열린 구분자 (플래그, pieces 위치) - 굵게/기울임 각각 최대 하나라서 깊이는 2 이하. opened는 그 플래그 합
+        stack = []
+        opened = 0
         pos = 0
-        
-        # 패턴: **굵게**, *기울임*, `코드`
-        pattern = r'(\*\*(.+?)\*\*|\*(.+?)\*|`(.+?)`)'
-        
-        for match in re.finditer(pattern, text):
-            # 매치 전 일반 텍스트
-            if match.start() > pos:
-                segments.append({
-                    'text': text[pos:match.start()],
-                    'char_id': base_char_id,
-                    'bold': False,
-                    'italic': False,
-                    'code': False
-                })
-            
-            # 매치된 서식
-            full_match = match.group(0)
-            if full_match.startswith('**'):
-                segments.append({
-                    'text': match.group(2),
-                    'char_id': base_char_id,
-                    'bold': True,
-                    'italic': False,
-                    'code': False
-                })
-            elif full_match.startswith('`'):
-                segments.append({
-                    'text': match.group(4),
-                    'char_id': 44,  # 코드 스타일
-                    'bold': False,
-                    'italic': False,
-                    'code': True
-                })
-            elif full_match.startswith('*'):
-                segments.append({
-                    'text': match.group(3),
-                    'char_id': base_char_id,
-                    'bold': False,
-                    'italic': True,
-                    'code': False
-                })
-            
-            pos = match.end()
-        
-        # 남은 텍스트
+        has_code_close = True
+        search = MDParser.INLINE_TOKEN.search
+        while True:
+            match = search(text, pos)
+            if match is None:
+                break
+            start, end = match.span()
+            if start > pos:
+                pieces.append([text[pos:start], 0])
+            token = match.group()
+            pos = end
+            if token[0] == '\\':
+                pieces.append([token[1], 0])
+            elif token == '`':
+                # 내용이 한 글자 이상인 가장 가까운 닫는 백틱까지가 코드 (없으면 이후 백틱도 모두 문자 그대로)
+                close_at = text.find('`', end + 1) if has_code_close else -1
+                if close_at < 0:
+                    has_code_close = False
+                    pieces.append(['`', 0])
+                else:
+                    pieces += [None, [text[end:close_at], CODE], None]
+                    pos = close_at + 1
+            elif len(token) > 3:
+                # 구분선 등 4개 이상 연속된 별표는 서식으로 보지 않는다
+                pieces.append([token, 0])
+            else:
+                # 앞 글자가 공백이 아니면 열린 같은 서식을 닫고(그 위의 열린 구분자는 문자 그대로),
+                # 뒤 글자가 공백이 아니면 남은 별표로 열리지 않은 서식을 연다. 쓰이지 않은 별표는 문자 그대로
+                count = len(token)
+                todo = ()
+                if start > 0 and not text[start - 1].isspace():
+                    if count == 3 and opened == BOLD | ITALIC:
+                        todo = (stack[-1][0], stack[-2][0])
+                    elif count >= 2 and opened & BOLD:
+                        todo = (BOLD,)
+                    elif opened & ITALIC:
+                        todo = (ITALIC,)
+                for flag in todo:
+                    count -= 2 if flag == BOLD else 1
+                    opened = close(pieces, stack, flag)
+                rest = 0
+                if count and end < len(text) and not text[end].isspace():
+                    rest = (0, ITALIC, BOLD, BOLD | ITALIC)[count] & ~opened
+                    count -= (2 if rest & BOLD else 0) + (1 if rest & ITALIC else 0)
+                if count:
+                    pieces.append(['*' * count, 0])
+                # ***는 기울임 안에 굵게로 연다
+                if rest & ITALIC:
+                    stack.append((ITALIC, len(pieces)))
+                    pieces.append(['*', 0])
+                if rest & BOLD:
+                    stack.append((BOLD, len(pieces)))
+                    pieces.append(['**', 0])
+                opened |= rest
         if pos < len(text):
-            segments.append({
-                'text': text[pos:],
-                'char_id': base_char_id,
-                'bold': False,
-                'italic': False,
-                'code': False
-            })
-        
+            pieces.append([text[pos:], 0])
+
+        # 경계 없이 이어진 같은 서식의 조각은 한 세그먼트로 합친다 (코드는 항상 따로)
+        segments = []
+        parts, flags = [], None
+        for piece in pieces:
+            if piece is not None and not piece[0]:
+                continue
+            if piece is None or piece[1] != flags or flags & CODE:
+                if parts:
+                    segments.append(InlineSegment(''.join(parts), 44 if flags & CODE else base_char_id, flags))  # 코드 스타일
+                parts, flags = [], None
+                if piece is None:
+                    continue
+                flags = piece[1]
+            parts.append(piece[0])
+        if parts:
+            segments.append(InlineSegment(''.join(parts), 44 if flags & CODE else base_char_id, flags))
+
         # 세그먼트가 없으면 원본 텍스트 반환
         if not segments:
-            segments.append({
-                'text': text,
-                'char_id': base_char_id,
-                'bold': False,
-                'italic': False,
-                'code': False
-            })
-        
+            segments.append(InlineSegment(text, base_char_id, 0))
+
         return segments
 
+    @staticmethod
+    def _close_inline(pieces, stack, flag):
+        """process_inline_formats의 구분자 닫기: flag 구분자 이후 조각에 서식을 더하고 남은 열린 플래그 합 반환
+
+        flag 구분자 위에 열린 구분자는 짝 없이 버려져 문자 그대로 남는다.
+        각 조각은 서식마다 최대 한 번만 갱신된다 (닫힌 뒤 새로 여는 구분자는 항상 뒤쪽).
+        """
+        while True:
+            top, at = stack.pop()
+            if top == flag:
+                break
+        pieces[at] = None
+        for i in range(at + 1, len(pieces)):
+            piece = pieces[i]
+            if piece is not None:
+                piece[1] |= flag
+        pieces.append(None)
+        return stack[0][0] if stack else 0
+
+
+class FontMetrics:
+    """글꼴 하나의 글자 너비 표 (BMP 코드포인트 -> advance, 1/1000 em 단위)
+
+    tools/build_font_metrics.py로 만든 .fmet 파일은 mmap으로 열어 필요한 페이지만 읽는다.
+    파일이 없으면 문자 범주(한글/CJK/기호/라틴)별 근사 표를 쓴다.
+    .fmet 구성: MAGIC(8) | u16 기본 너비(BMP 밖 문자) | 예약(6) | u16 LE 너비 x 65536
+    """
+
+    MAGIC = b'HWPXFM\x00\x01'
+    HEADER_SIZE = 16
+    UNITS_PER_EM = 1000
+
+    # 근사 표: (시작, 끝(포함), 너비). 뒤 항목이 앞 항목을 덮어쓴다
+    APPROX_RANGES = (
+        (0x0000, 0x001F, 0),
+        (0x0020, 0x024F, 550),      # 라틴 (아래 ASCII 개별 너비로 보정)
+        (0x1100, 0x11FF, 1000),     # 한글 자모
+        (0x2000, 0x200F, 500),      # 공백류
+        (0x2010, 0x2BFF, 1000),     # 문장부호/기호/도형 (□ ◦ ◈ ※ 등, 한글 글꼴에서 전각)
+        (0x2E80, 0x9FFF, 1000),     # CJK 기호/호환 자모/한자
+        (0xAC00, 0xD7A3, 1000),     # 한글 음절
+        (0xF900, 0xFAFF, 1000),
+        (0xFE30, 0xFE4F, 1000),
+        (0xFF01, 0xFF60, 1000),     # 전각 문자
+        (0xFFE0, 0xFFE6, 1000),
+    )
+    APPROX_ASCII = (
+        (' ', 300), ('il.,:;!|\'`', 260), ('fjrt()[]{}"/\\-', 360), ('0123456789', 550),
+        ('ABCDEFGHIJKLNOPQRSTUVXYZ', 650), ('MW', 880), ('abcdeghknopqsuvxyz', 520), ('mw', 800),
+        ('#$%&*+<=>?@^_~', 600),
+    )
+
+    _loaded = {}
+
+    def __init__(self, widths, default: int = 1000, face: str | None = None, metrics_dir: str | None = None):
+        self.widths = widths
+        self.default = default
+        self.face = face
+        self.metrics_dir = metrics_dir
+        # 단어별 advance 합 (보고서 본문은 같은 단어가 반복되므로 대부분 한 번의 dict 조회로 끝난다)
+        self._words = {}
+
+    def __reduce__(self):
+        # mmap은 pickle할 수 없으므로 워커 프로세스에서는 같은 파일을 다시 연다
+        return FontMetrics.for_face, (self.face, self.metrics_dir)
+
+    @classmethod
+    def for_face(cls, face: str | None, metrics_dir: str | None = None):
+        """글꼴 이름의 너비 표 (metrics_dir/<face>.fmet가 있으면 mmap, 없으면 근사 표). 프로세스 안에서 공유된다"""
+        path = os.path.join(metrics_dir, f'{face}.fmet') if metrics_dir and face else None
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            key = (path, st.st_mtime_ns, st.st_size)
+        else:
+            path = None
+            key = ('approx', face)
+        metrics = cls._loaded.get(key)
+        if metrics is None:
+            metrics = cls.load(path, face, metrics_dir) if path else cls.approximate(face)
+            cls._loaded[key] = metrics
+        return metrics
+
+    @classmethod
+    def load(cls, path, face: str | None = None, metrics_dir: str | None = None):
+        import mmap
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:8] != cls.MAGIC or len(mm) != cls.HEADER_SIZE + 2 * 0x10000:
+            mm.close()
+            raise ValueError(f'not a font metrics file: {path}')
+        default = int.from_bytes(mm[8:10], 'little')
+        view = memoryview(mm)[cls.HEADER_SIZE:]
+        if sys.byteorder == 'little':
+            widths = view.cast('H')
+        else:
+            from array import array
+            widths = array('H', view)
+            widths.byteswap()
+        return cls(widths, default, face, metrics_dir)
+
+    @classmethod
+    def encode(cls, widths, default: int = 1000) -> bytes:
+        """너비 목록(65536개, 1/1000 em)을 .fmet 바이트로"""
+        from array import array
+        table = array('H', widths)
+        if len(table) != 0x10000:
+            raise ValueError('font metrics table must cover the whole BMP (65536 entries)')
+        if sys.byteorder != 'little':
+            table.byteswap()
+        return cls.MAGIC + default.to_bytes(2, 'little') + bytes(6) + table.tobytes()
+
+    @classmethod
+    def approximate(cls, face: str | None = None):
+        """문자 범주별 근사 너비 표"""
+        from array import array
+        widths = array('H', [1000]) * 0x10000
+        for start, end, width in cls.APPROX_RANGES:
+            widths[start:end + 1] = array('H', [width]) * (end - start + 1)
+        for chars, width in cls.APPROX_ASCII:
+            for ch in chars:
+                widths[ord(ch)] = width
+        return cls(widths, 1000, face)
+
+    def advance(self, text):
+        """text의 advance 합 (1/1000 em)"""
+        width = self._words.get(text)
+        if width is None:
+            widths = self.widths
+            try:
+                width = sum(map(widths.__getitem__, map(ord, text)))
+            except IndexError:
+                # BMP 밖 문자(이모지 등)는 기본 너비
+                width = sum(widths[o] if o < 0x10000 else self.default for o in map(ord, text))
+            if len(self._words) >= 0x10000:
+                self._words.clear()
+            self._words[text] = width
+        return width
+
+    def advances(self, pieces):
+        """조각 목록 각각의 advance (캐시 적중분은 dict 조회만)"""
+        result = list(map(self._words.get, pieces))
+        if None in result:
+            for i, width in enumerate(result):
+                if width is None:
+                    result[i] = self.advance(pieces[i])
+        return result
+
+
+class LineLayout:
+    """글자 너비 표 기반 줄 나눔 -> 여러 줄 linesegarray 계산
+
+    문단 모양의 KEEP_WORD와 같이 공백에서만 줄을 나누고, 한 줄보다 긴 단어만 글자 단위로 나눈다.
+    charPr ID -> (글자 높이, 글꼴 너비 표), paraPr ID -> 줄간격(%)은 실제로 기록할 header의 HeaderIndex에서 얻는다.
+    템플릿 header를 ID 재매핑과 함께 쓰면 id_map(생성 ID -> 템플릿 ID)으로 섹션의 생성 ID를 템플릿 정의에 연결한다.
+    vertpos는 문단 첫 줄 기준(0)이며, 쪽 나눔에 따른 위치는 한글이 정한다.
+    """
+
+    # 본문 폭 (A4 59528 - 좌우 여백 5669*2)
+    BODY_WIDTH = 48188
+    _PIECES = re.compile(r' +|[^ ]+')
+
+    def __init__(self, header_index: 'HeaderIndex', metrics_dir: str | None = None, id_map: dict | None = None):
+        self.chars = {
+            cid: (height or 1000, FontMetrics.for_face(face, metrics_dir))
+            for cid, (height, _bold, _italic, face) in header_index.char.items()
+        }
+        self.line_spacing = {pid: lsp for pid, (_align, lsp, _prev) in header_index.para.items()}
+        self._fallback = (1000, FontMetrics.for_face(None, metrics_dir))
+        if id_map:
+            chars, line_spacing = dict(self.chars), dict(self.line_spacing)
+            chars.update((ours, self.chars[theirs]) for ours, theirs in id_map.get('char', {}).items() if theirs in self.chars)
+            line_spacing.update((ours, self.line_spacing[theirs]) for ours, theirs in id_map.get('para', {}).items() if theirs in self.line_spacing)
+            self.chars, self.line_spacing = chars, line_spacing
+
+    def char(self, char_id):
+        """charPr ID -> (글자 높이(HWPUNIT), FontMetrics)"""
+        return self.chars.get(char_id, self._fallback)
+
+    def break_lines(self, runs, width: int):
+        """runs [(텍스트, charPr ID)]를 width 안에 배치 -> 줄 목록 [(textpos, 줄 높이)]
+
+        공백/단어 조각의 누적 너비에서 줄마다 이분 탐색으로 들어가는 마지막 단어를 찾는다.
+        한 줄보다 긴 단어가 있으면 글자 단위로 나누는 _break_lines_by_word()를 쓴다.
+        """
+        pieces = []
+        widths = []
+        heights = []
+        for text, char_id in runs:
+            height, metrics = self.char(char_id)
+            run_pieces = self._PIECES.findall(text)
+            pieces += run_pieces
+            # 너비 단위: 1/1000 HWPUNIT (advance * 글자 높이)
+            widths += [advance * height for advance in metrics.advances(run_pieces)]
+            heights += [height] * len(run_pieces)
+        if not pieces:
+            return [(0, self.char(runs[0][1])[0] if runs else self._fallback[0])]
+
+        limit = width * FontMetrics.UNITS_PER_EM
+        edge = [0, *itertools.accumulate(widths)]
+        if edge[-1] <= limit:
+            return [(0, max(heights))]
+        if len(runs) == 1:
+            # run 하나에서는 공백/단어 조각이 번갈아 나온다
+            first_word = 1 if pieces[0][0] == ' ' else 0
+            if first_word >= len(pieces):
+                return [(0, heights[0])]
+            if max(widths[first_word::2]) > limit:
+                return self._break_lines_by_word(runs, width)
+            starts = range(first_word, len(pieces), 2)
+            word_ends = edge[first_word + 1::2]
+        else:
+            # 단어 = 공백 없이 이어진 조각들 (run 경계를 넘을 수 있다)
+            starts = []
+            ends = []
+            prev_space = True
+            for i, piece in enumerate(pieces):
+                space = piece[0] == ' '
+                if space != prev_space:
+                    (ends if space else starts).append(i)
+                prev_space = space
+            if not prev_space:
+                ends.append(len(pieces))
+            if not starts:
+                return [(0, max(heights))]
+            word_ends = [edge[e] for e in ends]
+            if max(map(operator.sub, word_ends, (edge[b] for b in starts))) > limit:
+                return self._break_lines_by_word(runs, width)
+
+        textpos = [0, *itertools.accumulate(map(len, pieces))]
+        multi = len(runs) > 1
+        lines = []
+        first = 0       # 줄 첫 조각 (첫 줄은 앞 공백 포함)
+        word = 0        # 줄 첫 단어
+        count = len(starts)
+        while True:
+            fit = bisect.bisect_right(word_ends, edge[first] + limit, word)
+            # 앞 공백 때문에 첫 단어가 넘치더라도 한 단어는 둔다
+            fit = max(fit, word + 1)
+            if fit >= count:
+                lines.append((textpos[first], max(heights[first:]) if multi else height))
+                return lines
+            nxt = starts[fit]
+            lines.append((textpos[first], max(heights[first:nxt]) if multi else height))
+            first, word = nxt, fit
+
+    def _break_lines_by_word(self, runs, width: int):
+        """break_lines()와 같은 결과를 단어 단위로 계산 (한 줄보다 긴 단어는 글자 단위로 나눈다)"""
+        # 단어 목록: [시작 위치, 너비, 높이, 조각들 또는 None(공백)]. run 경계 사이에 공백이 없으면 한 단어로 잇는다
+        words = []
+        pos = 0
+        joinable = False
+        first_height = None
+        for text, char_id in runs:
+            height, metrics = self.char(char_id)
+            if first_height is None:
+                first_height = height
+            for piece in self._PIECES.findall(text):
+                w = metrics.advance(piece) * height // FontMetrics.UNITS_PER_EM
+                if piece[0] == ' ':
+                    words.append([pos, w, height, None])
+                    joinable = False
+                elif joinable:
+                    word = words[-1]
+                    word[1] += w
+                    word[2] = max(word[2], height)
+                    word[3].append((piece, metrics, height))
+                else:
+                    words.append([pos, w, height, [(piece, metrics, height)]])
+                    joinable = True
+                pos += len(piece)
+
+        lines = []
+        start = 0
+        line_w = line_h = 0
+        has_word = False
+        for word_start, w, h, parts in words:
+            if parts is None:
+                # 줄 끝 공백은 폭을 넘겨도 다음 줄로 넘기지 않는다
+                line_w += w
+                line_h = max(line_h, h)
+                continue
+            if has_word and line_w + w > width:
+                lines.append((start, line_h))
+                start, line_w, line_h = word_start, 0, 0
+            if w > width:
+                # 한 줄보다 긴 단어: 글자 단위로 나눈다
+                cpos = word_start
+                for piece, metrics, ph in parts:
+                    for ch in piece:
+                        cw = metrics.advance(ch) * ph // FontMetrics.UNITS_PER_EM
+                        if line_w and line_w + cw > width:
+                            lines.append((start, line_h))
+                            start, line_w, line_h = cpos, 0, 0
+                        line_w += cw
+                        line_h = max(line_h, ph)
+                        cpos += 1
+            else:
+                line_w += w
+                line_h = max(line_h, h)
+            has_word = True
+        lines.append((start, line_h or first_height or self._fallback[0]))
+        return lines
+
+    def linesegs(self, runs, para_id: int, width: int):
+        """줄별 (textpos, vertpos, 높이, baseline, spacing) 목록
+
+        spacing은 PERCENT 줄간격 기준 글자 높이 * (줄간격 - 100)% (예: 10pt, 160% -> 600).
+        """
+        percent = self.line_spacing.get(para_id) or 160
+        segs = []
+        vertpos = 0
+        for textpos, height in self.break_lines(runs, width):
+            spacing = height * (percent - 100) // 100
+            segs.append((textpos, vertpos, height, height * 85 // 100, spacing))
+            vertpos += height + spacing
+        return segs
+
+    @staticmethod
+    def extra_height(segs):
+        """첫 줄 이후 줄들이 차지하는 높이 (한 줄 기준 셀/표 높이에 더할 값)"""
+        if len(segs) < 2:
+            return 0
+        last = segs[-1]
+        first = segs[0]
+        return last[1] + last[2] - first[2]
+
+
 class HWPXGenerator:
     """HWPX XML 생성기"""
     
@@ -331,15 +1017,16 @@ class HWPXGenerator:
         return text
     
     @staticmethod
-    def create_paragraph(element_type, text, style, rulebook, parser, include_lineseg=True):
-        """단락 XML 생성 (linesegarray 옵션)"""
+    def create_paragraph(element_type, text, style, rulebook, parser, include_lineseg=True, layout=None):
+        """단락 XML 생성 (linesegarray 옵션)
+
+        layout(LineLayout)이 주어지면 글자 너비로 줄을 나눠 줄마다 lineseg를 만든다.
+        """
         char_id = style['char_id']
         para_id = style['para_id']
-        bold_char = style.get('bold_char_id', rulebook.BOLD_CHAR_ID)
-        italic_char = style.get('italic_char_id', rulebook.ITALIC_CHAR_ID)
 
-        # 인라인 서식 처리
-        segments = parser.process_inline_formats(text, char_id)
+        # 인라인 서식 처리 -> (텍스트, charPr ID) run 목록
+        runs = HWPXGenerator._run_chars(parser.process_inline_formats(text, char_id), style, rulebook)
 
         # 스타일 정보에서 글자 크기/줄간격 추출 (textbook_styles 사용)
         # rulebook.textbook_styles에서 현재 element_type의 스타일 가져오기
@@ -366,31 +1053,20 @@ class HWPXGenerator:
 
         # 문단 내부 강제 줄바꿈은 비활성화하여 스타일의 space-before(prev)만으로 앞 간격을 제어한다
 
-        for seg in segments:
-            # 빈 텍스트 스킵
-            if not seg['text']:
-                continue
-
-            # run 시작 - 인라인 서식 매핑
-            run_char_id = seg["char_id"]
-            if not seg.get('code'):
-                # 굵게 처리: 지정된 bold 스타일 사용
-                if seg.get('bold'):
-                    run_char_id = bold_char
-                # 기울임 처리: italic 전용 스타일 사용
-                elif seg.get('italic'):
-                    run_char_id = italic_char
-
+        for seg_text, run_char_id in runs:
             xml += f'      <hp:run charPrIDRef="{run_char_id}">\n'
 
             # 텍스트
-            escaped_text = HWPXGenerator.escape_xml(seg['text'])
+            escaped_text = HWPXGenerator.escape_xml(seg_text)
             xml += f'        <hp:t>{escaped_text}</hp:t>\n'
 
             # run 종료
             xml += f'      </hp:run>\n'
 
-        if include_lineseg:
+        if include_lineseg and layout is not None:
+            segs = layout.linesegs(runs or [('', char_id)], para_id, LineLayout.BODY_WIDTH)
+            xml += HWPXGenerator.lineseg_array(segs, LineLayout.BODY_WIDTH, '      ')
+        elif include_lineseg:
             # linesegarray는 줄간격/베이스라인을 고정한다. 필요 시 옵션으로 비활성화.
             xml += '      <hp:linesegarray>\n'
             xml += f'        <hp:lineseg textpos="0" vertpos="0" vertsize="{vertsize}" textheight="{textheight}" baseline="{baseline}" spacing="{spacing}" horzpos="0" horzsize="48188" flags="393216"/>\n'
@@ -433,8 +1109,54 @@ class HWPXGenerator:
         return xml
     
     @staticmethod
-    def create_title_table(text, style, rulebook, parser, include_lineseg=True):
-        """<주제목> 3행 표 생성"""
+    def _run_chars(segments, style, rulebook):
+        """인라인 세그먼트 -> [(텍스트, charPr ID)] (코드/굵게/기울임/굵게+기울임 문자 스타일 매핑, 빈 텍스트 제외)
+
+        매핑 결과 charPr가 같은 이웃 세그먼트(굵게 구간 안의 일반 텍스트가 강조 스타일과 같은 경우 등)는 한 run으로 합친다.
+        """
+        BOLD, ITALIC = InlineSegment.BOLD, InlineSegment.ITALIC
+        # 서식 플래그(BOLD|ITALIC) -> charPr ID
+        chars = {
+            BOLD: style.get('bold_char_id', rulebook.BOLD_CHAR_ID),
+            ITALIC: style.get('italic_char_id', rulebook.ITALIC_CHAR_ID),
+            BOLD | ITALIC: style.get('bold_italic_char_id', rulebook.BOLD_ITALIC_CHAR_ID),
+        }
+        runs = []
+        for seg_text, run_char_id, flags in segments:
+            if not seg_text:
+                continue
+            if flags & InlineSegment.CODE:
+                run_char_id = rulebook.CODE_CHAR_ID
+            elif flags & (BOLD | ITALIC):
+                run_char_id = chars[flags & (BOLD | ITALIC)]
+            if runs and runs[-1][1] == run_char_id:
+                runs[-1] = (runs[-1][0] + seg_text, run_char_id)
+            else:
+                runs.append((seg_text, run_char_id))
+        return runs
+
+    @staticmethod
+    def _runs_xml(runs):
+        return ''.join(f'<hp:run charPrIDRef="{char_id}"><hp:t>{HWPXGenerator.escape_xml(text)}</hp:t></hp:run>' for text, char_id in runs)
+
+    @staticmethod
+    def _inline_runs(segments, style, rulebook):
+        """표 셀용 한 줄 run 목록 생성 (코드/굵게/기울임 문자 스타일 매핑)"""
+        return HWPXGenerator._runs_xml(HWPXGenerator._run_chars(segments, style, rulebook))
+
+    @staticmethod
+    def lineseg_array(segs, horzsize: int, indent: str):
+        """LineLayout.linesegs 결과 -> hp:linesegarray XML"""
+        xml = f'{indent}<hp:linesegarray>\n'
+        for textpos, vertpos, height, baseline, spacing in segs:
+            xml += (f'{indent}  <hp:lineseg textpos="{textpos}" vertpos="{vertpos}" vertsize="{height}" textheight="{height}" '
+                    f'baseline="{baseline}" spacing="{spacing}" horzpos="0" horzsize="{horzsize}" flags="393216"/>\n')
+        xml += f'{indent}</hp:linesegarray>\n'
+        return xml
+
+    @staticmethod
+    def create_title_table(text, style, rulebook, parser, include_lineseg=True, layout=None):
+        """<주제목> 3행 표 생성 (layout이 주어지면 제목 줄 수만큼 제목 행/표 높이를 늘린다)"""
         char_id = style.get('char_id', style.get('bold_char_id', 9))
         para_id = style.get('para_id', 20)  # 중앙정렬
 
@@ -442,27 +1164,20 @@ class HWPXGenerator:
         segments = parser.process_inline_formats(text, char_id)
 
         # 텍스트 내용 생성
-        text_content = ''
-        for seg in segments:
-            if not seg['text']:
-                continue
-            run_char_id = seg.get('char_id', char_id)
-            if seg.get('code'):
-                run_char_id = rulebook.CODE_CHAR_ID
-            elif seg.get('bold'):
-                run_char_id = style.get('bold_char_id', rulebook.BOLD_CHAR_ID)
-            elif seg.get('italic'):
-                run_char_id = style.get('italic_char_id', rulebook.ITALIC_CHAR_ID)
+        runs = HWPXGenerator._run_chars(segments, style, rulebook)
+        text_content = HWPXGenerator._runs_xml(runs)
 
-            escaped_text = HWPXGenerator.escape_xml(seg['text'])
-            text_content += f'<hp:run charPrIDRef="{run_char_id}"><hp:t>{escaped_text}</hp:t></hp:run>'
+        # 제목 셀 글자 영역 폭 = 셀 폭 - 좌우 셀 여백(1417)
+        title_width = 48189 - 2 * 1417
+        segs = layout.linesegs(runs or [('', char_id)], para_id, title_width) if include_lineseg and layout is not None else None
+        extra = LineLayout.extra_height(segs) if segs else 0
 
         # 3행 표 생성 (빈행-제목-빈행)
         xml = '    <hp:p paraPrIDRef="0" styleIDRef="0">\n'
         # 표 래핑 run은 기본 문자모양(0)로 설정해 내부 텍스트 스타일을 방해하지 않도록 한다
         xml += '      <hp:run charPrIDRef="0">\n'
         xml += '        <hp:tbl id="1998390486" zOrder="0" numberingType="TABLE" textWrap="TOP_AND_BOTTOM" textFlow="BOTH_SIDES" lock="0" dropcapstyle="None" pageBreak="CELL" repeatHeader="1" rowCnt="3" colCnt="1" cellSpacing="0" borderFillIDRef="3" noAdjust="0">\n'
-        xml += '          <hp:sz width="48189" widthRelTo="ABSOLUTE" height="4216" heightRelTo="ABSOLUTE" protect="0"/>\n'
+        xml += f'          <hp:sz width="48189" widthRelTo="ABSOLUTE" height="{4216 + extra}" heightRelTo="ABSOLUTE" protect="0"/>\n'
         xml += '          <hp:pos treatAsChar="0" affectLSpacing="0" flowWithText="1" allowOverlap="0" holdAnchorAndSO="0" vertRelTo="PARA" horzRelTo="COLUMN" vertAlign="TOP" horzAlign="LEFT" vertOffset="0" horzOffset="0"/>\n'
         xml += '          <hp:outMargin left="283" right="283" top="283" bottom="283"/>\n'
         xml += '          <hp:inMargin left="510" right="510" top="141" bottom="141"/>\n'
@@ -492,7 +1207,9 @@ class HWPXGenerator:
         xml += '              <hp:subList id="" textDirection="HORIZONTAL" lineWrap="BREAK" vertAlign="CENTER" linkListIDRef="0" linkListNextIDRef="0" textWidth="0" textHeight="0" hasTextRef="0" hasNumRef="0">\n'
         xml += f'                <hp:p id="0" paraPrIDRef="{para_id}" styleIDRef="0" pageBreak="0" columnBreak="0" merged="0">\n'
         xml += f'                  {text_content}\n'
-        if include_lineseg:
+        if segs:
+            xml += HWPXGenerator.lineseg_array(segs, title_width, '                  ')
+        elif include_lineseg:
             xml += '                  <hp:linesegarray>\n'
             xml += '                    <hp:lineseg textpos="0" vertpos="0" vertsize="1500" textheight="1500" baseline="1275" spacing="452" horzpos="0" horzsize="48188" flags="393216"/>\n'
             xml += '                  </hp:linesegarray>\n'
@@ -500,7 +1217,7 @@ class HWPXGenerator:
         xml += '              </hp:subList>\n'
         xml += '              <hp:cellAddr colAddr="0" rowAddr="1"/>\n'
         xml += '              <hp:cellSpan colSpan="1" rowSpan="1"/>\n'
-        xml += '              <hp:cellSz width="48189" height="3174"/>\n'
+        xml += f'              <hp:cellSz width="48189" height="{3174 + extra}"/>\n'
         xml += '              <hp:cellMargin left="1417" right="1417" top="141" bottom="141"/>\n'
         xml += '            </hp:tc>\n'
         xml += '          </hp:tr>\n'
@@ -532,8 +1249,8 @@ class HWPXGenerator:
         return xml
 
     @staticmethod
-    def create_emphasis_table(text, style, rulebook, parser, include_lineseg=True):
-        """<강조> 1행 표 생성 (배경색)"""
+    def create_emphasis_table(text, style, rulebook, parser, include_lineseg=True, layout=None):
+        """<강조> 1행 표 생성 (배경색, layout이 주어지면 줄 수만큼 셀/표 높이를 늘린다)"""
         char_id = style.get('char_id', style.get('bold_char_id', 16))
         para_id = style.get('para_id', 20)
 
@@ -541,27 +1258,20 @@ class HWPXGenerator:
         segments = parser.process_inline_formats(text, char_id)
 
         # 텍스트 내용 생성
-        text_content = ''
-        for seg in segments:
-            if not seg['text']:
-                continue
-            run_char_id = seg.get('char_id', char_id)
-            if seg.get('code'):
-                run_char_id = rulebook.CODE_CHAR_ID
-            elif seg.get('bold'):
-                run_char_id = style.get('bold_char_id', rulebook.BOLD_CHAR_ID)
-            elif seg.get('italic'):
-                run_char_id = style.get('italic_char_id', rulebook.ITALIC_CHAR_ID)
+        runs = HWPXGenerator._run_chars(segments, style, rulebook)
+        text_content = HWPXGenerator._runs_xml(runs)
 
-            escaped_text = HWPXGenerator.escape_xml(seg['text'])
-            text_content += f'<hp:run charPrIDRef="{run_char_id}"><hp:t>{escaped_text}</hp:t></hp:run>'
+        # 셀 글자 영역 폭 = 셀 폭 - 좌우 셀 여백(566)
+        text_width = 48189 - 2 * 566
+        segs = layout.linesegs(runs or [('', char_id)], para_id, text_width) if include_lineseg and layout is not None else None
+        extra = LineLayout.extra_height(segs) if segs else 0
 
         # 1행 표 생성 (강조 배경색)
         xml = '    <hp:p paraPrIDRef="21" styleIDRef="0">\n'
         # 표 래핑 run은 기본 문자모양(0)로 설정
         xml += '      <hp:run charPrIDRef="0">\n'
         xml += '        <hp:tbl id="1998390487" zOrder="1" numberingType="TABLE" textWrap="TOP_AND_BOTTOM" textFlow="BOTH_SIDES" lock="0" dropcapstyle="None" pageBreak="CELL" repeatHeader="1" rowCnt="1" colCnt="1" cellSpacing="0" borderFillIDRef="3" noAdjust="0">\n'
-        xml += '          <hp:sz width="48189" widthRelTo="ABSOLUTE" height="2632" heightRelTo="ABSOLUTE" protect="0"/>\n'
+        xml += f'          <hp:sz width="48189" widthRelTo="ABSOLUTE" height="{2632 + extra}" heightRelTo="ABSOLUTE" protect="0"/>\n'
         xml += '          <hp:pos treatAsChar="0" affectLSpacing="0" flowWithText="1" allowOverlap="0" holdAnchorAndSO="0" vertRelTo="PARA" horzRelTo="COLUMN" vertAlign="TOP" horzAlign="LEFT" vertOffset="0" horzOffset="0"/>\n'
         xml += '          <hp:outMargin left="283" right="283" top="283" bottom="283"/>\n'
         xml += '          <hp:inMargin left="510" right="510" top="141" bottom="141"/>\n'
@@ -570,7 +1280,9 @@ class HWPXGenerator:
         xml += '              <hp:subList id="" textDirection="HORIZONTAL" lineWrap="BREAK" vertAlign="CENTER" linkListIDRef="0" linkListNextIDRef="0" textWidth="0" textHeight="0" hasTextRef="0" hasNumRef="0">\n'
         xml += f'                <hp:p id="0" paraPrIDRef="{para_id}" styleIDRef="0" pageBreak="0" columnBreak="0" merged="0">\n'
         xml += f'                  {text_content}\n'
-        if include_lineseg:
+        if segs:
+            xml += HWPXGenerator.lineseg_array(segs, text_width, '                  ')
+        elif include_lineseg:
             xml += '                  <hp:linesegarray>\n'
             xml += '                    <hp:lineseg textpos="0" vertpos="0" vertsize="1500" textheight="1500" baseline="1275" spacing="452" horzpos="0" horzsize="48188" flags="393216"/>\n'
             xml += '                  </hp:linesegarray>\n'
@@ -578,7 +1290,7 @@ class HWPXGenerator:
         xml += '              </hp:subList>\n'
         xml += '              <hp:cellAddr colAddr="0" rowAddr="0"/>\n'
         xml += '              <hp:cellSpan colSpan="1" rowSpan="1"/>\n'
-        xml += '              <hp:cellSz width="48189" height="521"/>\n'
+        xml += f'              <hp:cellSz width="48189" height="{521 + extra}"/>\n'
         xml += '              <hp:cellMargin left="566" right="566" top="566" bottom="566"/>\n'
         xml += '            </hp:tc>\n'
         xml += '          </hp:tr>\n'
@@ -589,9 +1301,83 @@ class HWPXGenerator:
 
         return xml
 
+    # GFM 표: 본문 폭(48189)을 열 수로 나누고, 행 높이는 본문 글자(15pt) 한 줄 + 셀 여백 기준
+    TABLE_WIDTH = 48189
+    TABLE_ROW_HEIGHT = 2282
+
     @staticmethod
-    def create_section(paragraphs):
-        """섹션 XML 생성 (secPr 전용 컨트롤 문단 먼저 배치)"""
+    def table_column_widths(col_count):
+        """열 너비 목록 (나머지는 마지막 열에 더해 합이 표 폭과 같게)"""
+        width = HWPXGenerator.TABLE_WIDTH // col_count
+        return [width] * (col_count - 1) + [HWPXGenerator.TABLE_WIDTH - width * (col_count - 1)]
+
+    @staticmethod
+    def create_table_open(row_count, col_count, rulebook):
+        """GFM 표 시작 (표를 감싸는 문단 + hp:tbl 속성). 머리행은 페이지마다 반복(repeatHeader)된다"""
+        border_fill = rulebook.TABLE['border_fill_id']
+        height = HWPXGenerator.TABLE_ROW_HEIGHT * row_count
+        xml = '    <hp:p paraPrIDRef="0" styleIDRef="0">\n'
+        xml += '      <hp:run charPrIDRef="0">\n'
+        xml += f'        <hp:tbl id="1998390488" zOrder="2" numberingType="TABLE" textWrap="TOP_AND_BOTTOM" textFlow="BOTH_SIDES" lock="0" dropcapstyle="None" pageBreak="CELL" repeatHeader="1" rowCnt="{row_count}" colCnt="{col_count}" cellSpacing="0" borderFillIDRef="{border_fill}" noAdjust="0">\n'
+        xml += f'          <hp:sz width="{HWPXGenerator.TABLE_WIDTH}" widthRelTo="ABSOLUTE" height="{height}" heightRelTo="ABSOLUTE" protect="0"/>\n'
+        xml += '          <hp:pos treatAsChar="0" affectLSpacing="0" flowWithText="1" allowOverlap="0" holdAnchorAndSO="0" vertRelTo="PARA" horzRelTo="COLUMN" vertAlign="TOP" horzAlign="LEFT" vertOffset="0" horzOffset="0"/>\n'
+        xml += '          <hp:outMargin left="283" right="283" top="283" bottom="283"/>\n'
+        xml += '          <hp:inMargin left="510" right="510" top="141" bottom="141"/>\n'
+        return xml
+
+    @staticmethod
+    def create_table_row(cells, row_addr, widths, alignments, style, rulebook, parser, header=False, include_lineseg=True, layout=None):
+        """GFM 표 한 행(hp:tr) 생성
+
+        cells는 열 수(len(widths))에 맞춘 셀 텍스트 목록, alignments는 열별 정렬('left'/'center'/'right'/None).
+        머리행(header=True)은 header="1" 셀과 머리행 borderFill을 쓴다.
+        layout이 주어지면 셀마다 줄을 나누고, 행 높이를 가장 많은 줄을 가진 셀에 맞춘다.
+        """
+        char_id = style['char_id']
+        align_paras = rulebook.TABLE['align_para_ids']
+        border_fill = rulebook.TABLE['header_border_fill_id' if header else 'border_fill_id']
+        laid_out = []
+        extra = 0
+        for text, width, align in zip(cells, widths, alignments):
+            para_id = align_paras[align] if align else style['para_id']
+            runs = HWPXGenerator._run_chars(parser.process_inline_formats(text, char_id), style, rulebook) if text else []
+            segs = None
+            if include_lineseg and layout is not None:
+                # 셀 글자 영역 폭 = 열 너비 - 좌우 셀 여백(510)
+                segs = layout.linesegs(runs or [('', char_id)], para_id, width - 1020)
+                extra = max(extra, LineLayout.extra_height(segs))
+            laid_out.append((para_id, runs, segs))
+        row_height = HWPXGenerator.TABLE_ROW_HEIGHT + extra
+
+        xml = '          <hp:tr>\n'
+        for col, (width, (para_id, runs, segs)) in enumerate(zip(widths, laid_out)):
+            # 빈 셀도 글자 모양을 유지하도록 빈 run을 둔다
+            runs_xml = HWPXGenerator._runs_xml(runs) or f'<hp:run charPrIDRef="{char_id}"/>'
+            xml += f'            <hp:tc name="" header="{int(header)}" hasMargin="0" protect="0" editable="0" dirty="0" borderFillIDRef="{border_fill}">\n'
+            xml += '              <hp:subList id="" textDirection="HORIZONTAL" lineWrap="BREAK" vertAlign="CENTER" linkListIDRef="0" linkListNextIDRef="0" textWidth="0" textHeight="0" hasTextRef="0" hasNumRef="0">\n'
+            xml += f'                <hp:p id="0" paraPrIDRef="{para_id}" styleIDRef="0" pageBreak="0" columnBreak="0" merged="0">\n'
+            xml += f'                  {runs_xml}\n'
+            if segs:
+                xml += HWPXGenerator.lineseg_array(segs, width - 1020, '                  ')
+            elif include_lineseg:
+                xml += '                  <hp:linesegarray>\n'
+                xml += f'                    <hp:lineseg textpos="0" vertpos="0" vertsize="1500" textheight="1500" baseline="1275" spacing="452" horzpos="0" horzsize="{width - 1020}" flags="393216"/>\n'
+                xml += '                  </hp:linesegarray>\n'
+            xml += '                </hp:p>\n'
+            xml += '              </hp:subList>\n'
+            xml += f'              <hp:cellAddr colAddr="{col}" rowAddr="{row_addr}"/>\n'
+            xml += '              <hp:cellSpan colSpan="1" rowSpan="1"/>\n'
+            xml += f'              <hp:cellSz width="{width}" height="{row_height}"/>\n'
+            xml += '              <hp:cellMargin left="510" right="510" top="141" bottom="141"/>\n'
+            xml += '            </hp:tc>\n'
+        xml += '          </hp:tr>\n'
+        return xml
+
+    TABLE_CLOSE = '        </hp:tbl>\n        <hp:t/>\n      </hp:run>\n    </hp:p>\n'
+
+    @staticmethod
+    def create_section_head():
+        """섹션 XML 머리 생성 (XML 선언 + hs:sec 시작 + secPr 전용 컨트롤 문단)"""
         xml = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
         xml += '<hs:sec xmlns:hs="http://www.hancom.co.kr/hwpml/2011/section" '
         xml += 'xmlns:hp="http://www.hancom.co.kr/hwpml/2011/paragraph">\n'
@@ -638,34 +1424,895 @@ class HWPXGenerator:
         xml += '        </hp:ctrl>\n'
         xml += '      </hp:run>\n'
         xml += '    </hp:p>\n'
+        return xml
+
+    SECTION_TAIL = '</hs:sec>\n'
 
-        # 본문 문단들
+    # 꾸밈용 줄바꿈+들여쓰기 (hp:t 텍스트는 한 줄이므로 개행 뒤 공백만 지우면 내용은 바뀌지 않는다)
+    _LAYOUT_WS = re.compile(r'\n[ \t]*')
+    _LAYOUT_WS_BYTES = re.compile(rb'\n[ \t]*')
+
+    @staticmethod
+    def minify(xml):
+        """생성 XML의 꾸밈 공백 제거 (str/bytes 모두 지원)
+
+        문단 경계로 나뉜 스트리밍 청크에도 그대로 적용할 수 있다(청크 앞의 들여쓰기도 제거).
+        """
+        if isinstance(xml, bytes):
+            return HWPXGenerator._LAYOUT_WS_BYTES.sub(b'', xml).lstrip(b' \t')
+        return HWPXGenerator._LAYOUT_WS.sub('', xml).lstrip(' \t')
+
+    @staticmethod
+    def create_section(paragraphs):
+        """섹션 XML 생성 (secPr 전용 컨트롤 문단 먼저 배치)"""
+        # 문단 수에 비례해 += 누적이 2차 비용이 되므로 join으로 한 번에 결합한다
+        return ''.join([HWPXGenerator.create_section_head(), *paragraphs, HWPXGenerator.SECTION_TAIL])
+
+    @staticmethod
+    def iter_section_bytes(paragraphs, chunk_size: int = 64 * 1024, encoding: str = 'utf-8'):
+        """섹션 XML을 인코딩된 바이트 청크로 순차 생성 (스트리밍 모드용)
+
+        paragraphs는 문단 XML 문자열의 이터러블(제너레이터 가능)이며,
+        chunk_size 바이트 단위로 모아 내보내 zip 스트림 쓰기 호출 수를 줄인다.
+        """
+        buf = [HWPXGenerator.create_section_head().encode(encoding)]
+        size = len(buf[0])
         for para_xml in paragraphs:
-            xml += para_xml
+            data = para_xml.encode(encoding)
+            buf.append(data)
+            size += len(data)
+            if size >= chunk_size:
+                yield b''.join(buf)
+                buf = []
+                size = 0
+        buf.append(HWPXGenerator.SECTION_TAIL.encode(encoding))
+        yield b''.join(buf)
+
+class HeaderIndex:
+    """header.xml의 charPr/paraPr/borderFill/style 정의 색인 (한 번 파싱)
+
+    템플릿 헤더를 사용할 때 규칙북의 고정 ID를 템플릿에서 가장 가까운 정의의 ID로 재매핑하는 데 쓴다.
+    """
+
+    # 템플릿 경로 -> (mtime_ns, size, HeaderIndex)
+    _template_cache = {}
+
+    # 섹션 XML의 헤더 참조 속성 -> 매핑 종류
+    REF_KINDS = {'charPrIDRef': 'char', 'paraPrIDRef': 'para', 'borderFillIDRef': 'border', 'styleIDRef': 'style'}
+    _REF_RE = re.compile(r'\b(charPrIDRef|paraPrIDRef|borderFillIDRef|styleIDRef)="(\d+)"')
+    _REF_RE_BYTES = re.compile(rb'\b(charPrIDRef|paraPrIDRef|borderFillIDRef|styleIDRef)="(\d+)"')
+
+    def __init__(self, header_xml: str):
+        self.header_xml = header_xml
+        root = ET.fromstring(header_xml)
+        ns = HWPX_NS
+
+        hangul_fonts = {}
+        for face in root.iterfind('.//hh:fontfaces/hh:fontface', ns):
+            if face.get('lang') == 'HANGUL':
+                for font in face.iterfind('hh:font', ns):
+                    hangul_fonts[font.get('id')] = font.get('face')
+
+        # 헤더 감사용 표시 속성 (ID 중복 시 첫 정의 기준): {'char': {id: (height, bold, italic, hangul, latin)},
+        # 'para': {id: (align, lineSpacing type, lineSpacing value)}}
+        self.audit_tables = {'char': {}, 'para': {}}
+
+        self.char = {}
+        for pr in root.iterfind('.//hh:charProperties/hh:charPr', ns):
+            fref = pr.find('hh:fontRef', ns)
+            cid = int(pr.get('id'))
+            bold = pr.find('hh:bold', ns) is not None
+            italic = pr.find('hh:italic', ns) is not None
+            self.char[cid] = (
+                int(pr.get('height') or 0),
+                bold,
+                italic,
+                hangul_fonts.get(fref.get('hangul')) if fref is not None else None,
+            )
+            self.audit_tables['char'].setdefault(cid, (
+                pr.get('height'), bold, italic,
+                fref.get('hangul') if fref is not None else '?',
+                fref.get('latin') if fref is not None else '?',
+            ))
+
+        self.para = {}
+        for pr in root.iterfind('.//hh:paraProperties/hh:paraPr', ns):
+            align = pr.find('hh:align', ns)
+            lsp = pr.find('.//hh:lineSpacing', ns)
+            prev = pr.find('.//hc:prev', ns)
+            pid = int(pr.get('id'))
+            self.para[pid] = (
+                align.get('horizontal') if align is not None else None,
+                int(lsp.get('value') or 0) if lsp is not None else 0,
+                int(prev.get('value') or 0) if prev is not None else 0,
+            )
+            self.audit_tables['para'].setdefault(pid, (
+                align.get('horizontal') if align is not None else '?',
+                lsp.get('type') if lsp is not None else '?',
+                lsp.get('value') if lsp is not None else '?',
+            ))
+
+        self.border = {}
+        for bf in root.iterfind('.//hh:borderFills/hh:borderFill', ns):
+            sides = tuple(
+                (el.get('type') if (el := bf.find(f'hh:{side}', ns)) is not None else None)
+                for side in ('leftBorder', 'rightBorder', 'topBorder', 'bottomBorder')
+            )
+            brush = bf.find('.//hc:winBrush', ns)
+            self.border[int(bf.get('id'))] = (sides, brush.get('faceColor') if brush is not None else None)
+
+        self.style = {}
+        for st in root.iterfind('.//hh:styles/hh:style', ns):
+            self.style[int(st.get('id'))] = (st.get('name'), int(st.get('paraPrIDRef') or 0), int(st.get('charPrIDRef') or 0))
+
+        # 원본 헤더 키 -> ID 매핑 결과
+        self._id_maps = {}
+        self._digest = None
+
+    @property
+    def digest(self):
+        """header.xml 내용 해시 (캐시 키용)"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.header_xml.encode('utf-8')).hexdigest()
+        return self._digest
+
+    @classmethod
+    def for_template(cls, template_hwpx_path: str):
+        """템플릿 HWPX의 header.xml 색인 (경로+mtime 기준 캐시, 변경 없으면 zip/파싱 생략)"""
+        path = os.path.abspath(template_hwpx_path)
+        st = os.stat(path)
+        cached = cls._template_cache.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        with zipfile.ZipFile(path, 'r') as tz:
+            header_xml = tz.read('Contents/header.xml').decode('utf-8', 'ignore')
+        index = cls(header_xml)
+        cls._template_cache[path] = (st.st_mtime_ns, st.st_size, index)
+        return index
+
+    @staticmethod
+    def _char_distance(a, b):
+        height_a, bold_a, italic_a, face_a = a
+        height_b, bold_b, italic_b, face_b = b
+        return abs(height_a - height_b) / 100 + 10 * (bold_a != bold_b) + 10 * (italic_a != italic_b) + 3 * (face_a != face_b)
+
+    @staticmethod
+    def _para_distance(a, b):
+        return 10 * (a[0] != b[0]) + abs(a[1] - b[1]) / 10 + abs(a[2] - b[2]) / 100
+
+    @staticmethod
+    def _border_distance(a, b):
+        return sum(x != y for x, y in zip(a[0], b[0])) + 5 * (a[1] != b[1])
+
+    @staticmethod
+    def _closest(ours, theirs, distance):
+        mapping = {}
+        for oid, feat in ours.items():
+            best_id, best = None, None
+            for tid, tfeat in theirs.items():
+                d = distance(feat, tfeat)
+                # 동점이면 같은 ID를 우선 유지
+                if best is None or d < best or (d == best and tid == oid):
+                    best_id, best = tid, d
+            if best_id is not None:
+                mapping[oid] = best_id
+        return mapping
+
+    def id_map(self, source: 'HeaderIndex', source_key: str):
+        """source(생성 헤더) ID -> 이 헤더에서 가장 가까운 정의 ID 매핑"""
+        cached = self._id_maps.get(source_key)
+        if cached is not None:
+            return cached
+        mapping = {
+            'char': self._closest(source.char, self.char, self._char_distance),
+            'para': self._closest(source.para, self.para, self._para_distance),
+            'border': self._closest(source.border, self.border, self._border_distance),
+            'style': {},
+        }
+        for sid, (name, para_ref, char_ref) in source.style.items():
+            if sid in self.style:
+                mapping['style'][sid] = sid
+                continue
+            # 같은 이름의 스타일, 없으면 바탕글(0)
+            same_name = [tid for tid, st in self.style.items() if st[0] == name]
+            mapping['style'][sid] = same_name[0] if same_name else 0
+        # 실제로 ID가 바뀌는 항목만 남긴다
+        mapping = {kind: {k: v for k, v in m.items() if k != v} for kind, m in mapping.items()}
+        self._id_maps[source_key] = mapping
+        return mapping
+
+    _SEC_CNT = re.compile(r'secCnt="\d+"')
+    _SEC_CNT_BYTES = re.compile(rb'secCnt="\d+"')
+
+    @staticmethod
+    def with_section_count(xml, count: int):
+        """hh:head의 secCnt를 섹션 수에 맞게 교체 (str/bytes 모두 지원)"""
+        if isinstance(xml, bytes):
+            return HeaderIndex._SEC_CNT_BYTES.sub(f'secCnt="{count}"'.encode('ascii'), xml, count=1)
+        return HeaderIndex._SEC_CNT.sub(f'secCnt="{count}"', xml, count=1)
+
+    @classmethod
+    def remap_refs(cls, xml, mapping):
+        """섹션 XML(str 또는 bytes)의 헤더 참조 ID를 mapping에 따라 치환"""
+        if not any(mapping.values()):
+            return xml
+        kinds = cls.REF_KINDS
+        if isinstance(xml, bytes):
+            def sub_b(m):
+                attr = m.group(1).decode('ascii')
+                new = mapping[kinds[attr]].get(int(m.group(2)))
+                return m.group(0) if new is None else f'{attr}="{new}"'.encode('ascii')
+            return cls._REF_RE_BYTES.sub(sub_b, xml)
+
+        def sub(m):
+            new = mapping[kinds[m.group(1)]].get(int(m.group(2)))
+            return m.group(0) if new is None else f'{m.group(1)}="{new}"'
+        return cls._REF_RE.sub(sub, xml)
+
+
+class MissingReferenceError(ValueError):
+    """ReferenceValidator(mode='error')가 header에 정의되지 않은 참조를 만났을 때"""
+
+
+class ReferenceValidator:
+    """섹션 XML의 헤더 참조(charPr/paraPr/borderFill/style ID)가 header.xml에 정의되어 있는지 기록 중에 검사
+
+    ID 표는 HeaderIndex에서 집합으로 한 번 만들고, 섹션 바이트 청크를 기록하기 직전에 훑는다.
+    종류별 리터럴 속성명 패턴(findall)으로 청크당 선형 시간에 값을 모으고, 처음 보는 값만 ID 표와 대조한다.
+    mode='error'이면 첫 누락 참조에서 MissingReferenceError, 'warn'이면 누락 참조를 모아 missing에 기록한다.
+    """
+
+    MODES = ('warn', 'error', 'off')
+
+    # 참조 속성 -> (ID 표 종류, 값 패턴)
+    _PATTERNS = (
+        ('charPrIDRef', 'char', re.compile(rb'charPrIDRef="(\d+)"')),
+        ('paraPrIDRef', 'para', re.compile(rb'paraPrIDRef="(\d+)"')),
+        ('borderFillIDRef', 'border', re.compile(rb'borderFillIDRef="(\d+)"')),
+        ('styleIDRef', 'style', re.compile(rb'styleIDRef="(\d+)"')),
+    )
+
+    def __init__(self, index: HeaderIndex, mode: str = 'warn'):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown reference validation mode: {mode!r} ({'/'.join(self.MODES)})")
+        self.mode = mode
+        self.defined = {'char': set(index.char), 'para': set(index.para), 'border': set(index.border), 'style': set(index.style)}
+        # 속성별 이미 대조한 원시 값(bytes)과 그중 정의되지 않은 값
+        self._seen = {attr: set() for attr, _, _ in self._PATTERNS}
+        self._undefined = {attr: set() for attr, _, _ in self._PATTERNS}
+        # (속성, ID) -> 참조 횟수
+        self.missing = collections.Counter()
+
+    def check(self, chunk: bytes):
+        """섹션 바이트 청크의 참조를 검사 (청크는 문단 경계로 나뉘어 속성 중간에서 잘리지 않는다)"""
+        for attr, kind, pattern in self._PATTERNS:
+            values = pattern.findall(chunk)
+            if not values:
+                continue
+            seen = self._seen[attr]
+            undefined = self._undefined[attr]
+            new = set(values) - seen
+            if new:
+                seen |= new
+                defined = self.defined[kind]
+                for value in new:
+                    if int(value) not in defined:
+                        if self.mode == 'error':
+                            raise MissingReferenceError(f"header에 정의되지 않은 참조: {attr}={int(value)}")
+                        undefined.add(value)
+            if undefined:
+                # 청크를 한 번만 집계한 뒤 누락 값의 횟수를 옮긴다 (누락 ID마다 다시 훑지 않는다)
+                counts = collections.Counter(values)
+                for value in undefined.intersection(counts):
+                    self.missing[(attr, int(value))] += counts[value]
+
+    def summary(self, limit: int = 10) -> str:
+        """누락 참조 요약 문자열 (예: charPrIDRef=45 (12회), ...)"""
+        items = sorted(self.missing.items())
+        text = ', '.join(f"{attr}={rid} ({count}회)" for (attr, rid), count in items[:limit])
+        if len(items) > limit:
+            text += f" 외 {len(items) - limit}종"
+        return text
+
+
+class DiskCache:
+    """디스크 캐시 공통 기능: 교체 방식 저장, 접근 시각 기준 LRU 제거, 적중/미스 통계
+
+    캐시 파일은 cache_dir 안의 '*{SUFFIX}' 파일이며, 적중 시 touch()로 접근 시각을 갱신해 두면
+    evict()가 가장 오래 사용되지 않은 파일부터 max_disk_bytes(와 max_disk_entries) 이하가 될 때까지 지운다.
+    """
+
+    SUFFIX = ''
+    LABEL = '캐시'
+
+    def __init__(self, cache_dir: str | None, max_disk_bytes: int, max_disk_entries: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def temp_path(path):
+        """path를 교체할 프로세스별 임시 파일 경로"""
+        return f"{path}.{os.getpid()}.tmp"
+
+    @staticmethod
+    def store(path, fill):
+        """fill(임시 경로)로 만든 파일을 path로 교체 (배치 워커가 동시에 기록해도 부분 파일이 보이지 않는다)"""
+        tmp = DiskCache.temp_path(path)
+        try:
+            fill(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+
+    @staticmethod
+    def store_bytes(path, data: bytes):
+        def fill(tmp):
+            with open(tmp, 'wb') as f:
+                f.write(data)
+        DiskCache.store(path, fill)
+
+    @staticmethod
+    def touch(path):
+        """디스크 LRU 순서를 위해 접근 시각 갱신"""
+        os.utime(path)
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        count = len(entries)
+        limit = self.max_disk_entries if self.max_disk_entries is not None else count
+        for _, size, path in entries:
+            if count <= limit and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                count -= 1
+            except OSError:
+                pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+        }
+
+    def format_text(self):
+        st = self.stats()
+        rate = f"{st['hit_rate'] * 100:.1f}%" if st['hit_rate'] is not None else '-'
+        return f"[INFO] {self.LABEL}: 적중 {st['hits']:,} / 미스 {st['misses']:,} (적중률 {rate})"
+
+
+class HeaderCache(DiskCache):
+    """header.xml 렌더링 결과 캐시 (메모리 LRU + 선택적 디스크)
+
+    키는 header 생성에 영향을 주는 입력(텍스트북 스타일, 스타일 JSON, pin_font_face 등)의
+    내용 해시이며, 값은 최종 인코딩된 header.xml 바이트이다.
+    """
+
+    SUFFIX = '.header.xml'
+    LABEL = '헤더 캐시'
+
+    def __init__(self, max_entries: int = 32, cache_dir: str | None = None, max_disk_bytes: int = 64 * 1024 * 1024):
+        super().__init__(cache_dir, max_disk_bytes)
+        self.max_entries = max_entries
+        self._mem = OrderedDict()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{self.SUFFIX}")
+
+    def get(self, key):
+        data = self._mem.get(key)
+        if data is not None:
+            self._mem.move_to_end(key)
+            self.hits += 1
+            return data
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.touch(path)
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    def put(self, key, data: bytes):
+        self._remember(key, data)
+        if self.cache_dir:
+            self.store_bytes(self._disk_path(key), data)
+            self.evict()
+
+    def _remember(self, key, data):
+        self._mem[key] = data
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+
+class ParagraphCache(DiskCache):
+    """렌더링된 문단 XML의 디스크 캐시 (증분 재변환용)
+
+    (입력 문서 scope, namespace)마다 직전 변환의 {(요소 타입, 라인 원문): 문단 XML} 스냅샷을 한 파일로 저장한다.
+    namespace는 규칙북 해시(스타일 JSON/텍스트북/패턴, spacer_mode 포함)와 include_lineseg이므로,
+    적용 스타일이 바뀌면 전체가 다시 렌더링되고 변환 모드별 스냅샷은 따로 유지된다.
+    재변환 시에는 바뀐 라인만 렌더링하고 나머지는 스냅샷의 조각을 그대로 이어 붙인다.
+    디스크에는 최대 max_entries개 문서, max_disk_bytes까지 보관하며 오래 사용되지 않은 문서부터 제거한다.
+
+    스냅샷 파일은 헤더(MAGIC, 버전) 뒤에 [키 해시 16바이트][XML 길이 4바이트][XML UTF-8] 레코드를 이어 쓴 것이다.
+    직전 스냅샷은 mmap으로 열고 메모리에는 키 해시 -> 레코드 위치 색인만 둔다. 이번 변환의 조각은 생성되는 즉시
+    임시 스풀 파일에 추가하고 commit()에서 스냅샷과 교체하므로, 스트리밍 변환에서도 문서 전체 XML을 메모리에 모으지 않는다.
+    """
+
+    FORMAT_VERSION = 2
+    MAGIC = b'HPCS'
+    HEADER_SIZE = 8
+    SUFFIX = '.para'
+    LABEL = '문단 캐시'
+
+    def __init__(self, cache_dir: str, max_entries: int = 256, max_disk_bytes: int = 512 * 1024 * 1024):
+        super().__init__(cache_dir, max_disk_bytes, max_disk_entries=max_entries)
+        self.max_entries = max_entries
+        self._path = None
+        # 직전 스냅샷 (mmap, 키 해시 -> 길이 필드 위치, 레코드 수)
+        self._mm = None
+        self._index = {}
+        self._previous_records = 0
+        # 이번 변환의 스풀 파일과 레코드 수, 스냅샷에 없던 라인 수
+        self._spool = None
+        self._records = 0
+        self._changed = 0
+
+    def _disk_path(self, scope, namespace):
+        digest = hashlib.blake2b(f"{namespace}\0{scope}".encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}{self.SUFFIX}")
+
+    @staticmethod
+    def _key(element_type: str, line: str) -> bytes:
+        return hashlib.blake2b(f"{element_type}\0{line}".encode('utf-8'), digest_size=16).digest()
+
+    def _header(self) -> bytes:
+        return self.MAGIC + self.FORMAT_VERSION.to_bytes(4, 'little')
+
+    def begin(self, scope: str, namespace: str):
+        """문서 하나의 변환 시작: 같은 namespace로 저장된 직전 스냅샷 색인, 이번 변환의 스풀 파일 생성"""
+        import mmap
+        self.abort()
+        self._path = self._disk_path(scope, namespace)
+        try:
+            with open(self._path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # 스냅샷이 없거나 빈 파일
+            self._mm = None
+        if self._mm is not None:
+            if self._mm[:self.HEADER_SIZE] == self._header():
+                self._load_index()
+            else:
+                # 이전 형식 또는 손상된 스냅샷
+                self._mm.close()
+                self._mm = None
+        self._spool = open(self.temp_path(self._path), 'wb')
+        self._spool.write(self._header())
+
+    def _load_index(self):
+        mm = self._mm
+        size = len(mm)
+        index = {}
+        count = 0
+        pos = self.HEADER_SIZE
+        while pos + 20 <= size:
+            length = int.from_bytes(mm[pos + 16:pos + 20], 'little')
+            if pos + 20 + length > size:
+                # 잘린 마지막 레코드는 버린다
+                break
+            index[mm[pos:pos + 16]] = pos + 16
+            count += 1
+            pos += 20 + length
+        self._index = index
+        self._previous_records = count
+
+    def get(self, element_type: str, line: str):
+        key = self._key(element_type, line)
+        pos = self._index.get(key)
+        if pos is None:
+            self.misses += 1
+            self._changed += 1
+            return None
+        length = int.from_bytes(self._mm[pos:pos + 4], 'little')
+        record = self._mm[pos:pos + 4 + length]
+        # 직전 스냅샷의 레코드(길이+XML)를 그대로 스풀에 옮긴다
+        self._spool.write(key)
+        self._spool.write(record)
+        self._records += 1
+        self.hits += 1
+        return record[4:].decode('utf-8')
+
+    def put(self, element_type: str, line: str, xml: str):
+        data = xml.encode('utf-8')
+        self._spool.write(self._key(element_type, line))
+        self._spool.write(len(data).to_bytes(4, 'little'))
+        self._spool.write(data)
+        self._records += 1
+
+    def commit(self):
+        """이번 변환에 쓰인 조각(스풀)을 스냅샷으로 저장 (바뀌어 사라진 라인은 버려짐)"""
+        if self._spool is None:
+            return
+        path = self._path
+        spool_path = self._spool.name
+        unchanged = not self._changed and self._records == self._previous_records and self._mm is not None
+        self._close()
+        if unchanged:
+            # 바뀐 라인이 없으면 스냅샷을 다시 쓰지 않고 LRU 순서만 갱신
+            os.remove(spool_path)
+            self.touch(path)
+        else:
+            # 배치 워커가 동시에 기록해도 부분 파일이 보이지 않도록 완성된 스풀을 교체 방식으로 저장
+            os.replace(spool_path, path)
+        self.evict()
+
+    def abort(self):
+        """진행 중인 변환을 저장하지 않고 스풀 파일 삭제 (변환 실패 시)"""
+        if self._spool is None:
+            return
+        spool_path = self._spool.name
+        self._close()
+        with contextlib.suppress(OSError):
+            os.remove(spool_path)
+
+    def _close(self):
+        self._spool.close()
+        if self._mm is not None:
+            self._mm.close()
+        self._path = None
+        self._mm = None
+        self._index = {}
+        self._previous_records = 0
+        self._spool = None
+        self._records = 0
+        self._changed = 0
+
+
+class OutputCache(DiskCache):
+    """완성된 .hwpx 출력의 내용 주소 디스크 캐시 (같은 입력의 재변환 생략)
+
+    키는 MD 내용, 규칙북(생성 헤더·줄 나눔 설정 포함), 템플릿 header, 변환 옵션의 해시이며,
+    zip 메타데이터가 결정적이므로 같은 키의 출력은 바이트 단위로 같다.
+    적중 시 캐시 파일을 출력 경로에 복사하고(link=True이면 하드 링크, 다른 파일 시스템이면 복사),
+    디스크에는 max_disk_bytes까지 보관하며 오래 사용되지 않은 출력부터 제거한다.
+    하드 링크된 출력을 다른 프로그램(한글 등)이 제자리에서 저장하면 캐시 항목도 바뀌므로 기본은 복사이다.
+    """
+
+    FORMAT_VERSION = 1
+    SUFFIX = '.hwpx'
+    LABEL = '출력 캐시'
+
+    def __init__(self, cache_dir: str, max_disk_bytes: int = 1024 * 1024 * 1024, link: bool = False):
+        super().__init__(cache_dir, max_disk_bytes)
+        self.link = link
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{self.SUFFIX}")
+
+    def get(self, key: str, output_path) -> bool:
+        """캐시된 출력을 output_path에 배치 (적중 여부 반환)"""
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        tmp = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            linked = False
+            if self.link:
+                try:
+                    os.link(path, tmp)
+                    linked = True
+                except OSError:
+                    pass
+            if not linked:
+                shutil.copyfile(path, tmp)
+            # 기존 출력 파일을 덮어쓰지 않고 교체하므로 다른 하드 링크(캐시 항목 포함)는 영향받지 않는다
+            os.replace(tmp, output_path)
+            self.touch(path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key: str, output_path):
+        """생성된 출력을 캐시에 복사해 저장 (출력 파일이 나중에 제자리 수정되어도 캐시 항목은 유지)"""
+        self.store(self._disk_path(key), lambda tmp: shutil.copyfile(output_path, tmp))
+        self.evict()
+
+
+class PhaseProfiler:
+    """단계별 벽시계 시간/호출 수/생성 바이트 계측기
+
+    install()한 변환기 인스턴스의 메서드만 래핑하므로, 설치하지 않으면 계측 비용이 전혀 없다.
+    중첩 호출(예: create_paragraph 안의 process_inline_formats)은 self 시간에서 제외된다.
+    """
+
+    # (소유 객체 속성, 메서드 이름) - None은 변환기 자신
+    PHASES = (
+        ('parser', 'parse_line'),
+        ('parser', 'process_inline_formats'),
+        ('generator', 'create_paragraph'),
+        ('generator', 'create_blank_paragraph'),
+        ('generator', 'create_title_table'),
+        ('generator', 'create_emphasis_table'),
+        ('generator', 'create_table_row'),
+        ('generator', 'create_section'),
+        ('generator', 'iter_section_bytes'),
+        (None, 'iter_convert'),
+        (None, '_create_header_xml'),
+        (None, '_write_audit'),
+        (None, '_write_header_audit'),
+        (None, 'create_hwpx'),
+    )
+
+    def __init__(self):
+        # name -> [calls, total_sec, self_sec, bytes]
+        self.stats = {}
+        self._stack = []
+
+    def install(self, converter):
+        for owner, name in self.PHASES:
+            target = getattr(converter, owner) if owner else converter
+            # create_hwpx의 결과는 출력 경로이므로 바이트는 파일 크기로 기록 (self 시간 = zip 압축/파일 IO)
+            measure = os.path.getsize if name == 'create_hwpx' else self._size_of
+            setattr(target, name, self._wrap(name, getattr(target, name), measure))
+        return self
+
+    @staticmethod
+    def _size_of(result):
+        if isinstance(result, str):
+            return len(result.encode('utf-8'))
+        if isinstance(result, (bytes, bytearray)):
+            return len(result)
+        return 0
+
+    def _call(self, stat, fn, *args, **kwargs):
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            child = self._stack.pop()
+            stat[1] += elapsed
+            stat[2] += elapsed - child
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def _wrap(self, name, fn, measure):
+        import inspect
+        stat = self.stats.setdefault(name, [0, 0.0, 0.0, 0])
+
+        def wrapper(*args, **kwargs):
+            stat[0] += 1
+            result = self._call(stat, fn, *args, **kwargs)
+            if inspect.isgenerator(result):
+                return self._wrap_generator(stat, result, measure)
+            stat[3] += measure(result)
+            return result
+
+        return wrapper
+
+    def _wrap_generator(self, stat, gen, measure):
+        # 제너레이터는 next() 단위로 시간을 누적한다
+        while True:
+            try:
+                item = self._call(stat, next, gen)
+            except StopIteration:
+                return
+            stat[3] += measure(item)
+            yield item
+
+    def to_dict(self):
+        return {
+            name: {'calls': c, 'total_sec': round(t, 6), 'self_sec': round(st, 6), 'bytes': b}
+            for name, (c, t, st, b) in self.stats.items() if c
+        }
+
+    def format_text(self):
+        rows = sorted(self.to_dict().items(), key=lambda kv: kv[1]['self_sec'], reverse=True)
+        out = [f"{'phase':<24} {'calls':>9} {'total(s)':>10} {'self(s)':>10} {'bytes':>12}"]
+        for name, st in rows:
+            out.append(f"{name:<24} {st['calls']:>9} {st['total_sec']:>10.4f} {st['self_sec']:>10.4f} {st['bytes']:>12}")
+        return '\n'.join(out)
+
+
+class AuditWriter:
+    """변환 감사 로그 스트리밍 기록기
+
+    항목을 메모리에 모으지 않고 생성되는 즉시 파일에 기록한다.
+    - md: 기존 Markdown 형식 (라인별 상세)
+    - jsonl: 라인별 JSON 객체 한 줄
+    - summary: 요소 타입별 개수와 경고만 유지하고 종료 시 요약 기록
+    """
+
+    FORMATS = ('md', 'jsonl', 'summary')
+    # summary 모드에서 경고 종류별로 기록해 둘 라인 번호 수
+    MAX_WARNING_LINES = 50
+
+    def __init__(self, path, fmt: str = 'md'):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"unknown audit format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self.type_counts = collections.Counter()
+        self.warning_counts = collections.Counter()
+        self.warning_lines = {}
+        self._f = open(path, 'w', encoding='utf-8')
+        if fmt == 'md':
+            self._f.write('# Conversion Audit\n\n')
+
+    def write(self, entry):
+        self.count += 1
+        if self.fmt == 'md':
+            self._write_md(entry)
+        elif self.fmt == 'jsonl':
+            self._f.write(json.dumps(entry, ensure_ascii=False))
+            self._f.write('\n')
+        else:
+            self.type_counts[entry['element_type']] += 1
+            for w in entry.get('warnings') or ():
+                self.warning_counts[w] += 1
+                lines = self.warning_lines.setdefault(w, [])
+                if len(lines) < self.MAX_WARNING_LINES:
+                    lines.append(entry['line_no'])
+
+    def _write_md(self, entry):
+        f = self._f
+        f.write(f"## Line {entry['line_no']} — {entry['element_type']}\n")
+        f.write(f"- Original: {entry['original']}\n")
+        if entry.get('marker'):
+            f.write(f"- Marker: {entry['marker']}\n")
+        if entry.get('text'):
+            f.write(f"- Text used: {entry['text']}\n")
+        if entry.get('applied_para_id') is not None:
+            f.write(f"- paraPrID: {entry['applied_para_id']}\n")
+        if entry.get('applied_char_id') is not None:
+            f.write(f"- charPrID: {entry['applied_char_id']}\n")
+        if entry.get('notes'):
+            f.write(f"- Notes: {'; '.join(entry['notes'])}\n")
+        if entry.get('warnings'):
+            f.write(f"- Warnings: {'; '.join(entry['warnings'])}\n")
+        f.write('\n')
+
+    def close(self):
+        if self._f.closed:
+            return
+        if self.fmt == 'summary':
+            f = self._f
+            f.write('# Conversion Audit Summary\n\n')
+            f.write(f"- Entries: {self.count}\n\n")
+            f.write('## Element Types\n')
+            for et, cnt in self.type_counts.most_common():
+                f.write(f"- {et}: {cnt}\n")
+            f.write('\n## Warnings\n')
+            if not self.warning_counts:
+                f.write('- (none)\n')
+            for w, cnt in self.warning_counts.most_common():
+                lines = ', '.join(str(n) for n in self.warning_lines[w])
+                more = ', ...' if cnt > len(self.warning_lines[w]) else ''
+                f.write(f"- {w}: {cnt} (lines {lines}{more})\n")
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-        xml += '</hs:sec>\n'
-        return xml
 
 class MDtoHWPXConverter:
     """메인 변환기"""
 
-    def __init__(self, styles_json_path, textbook_path=None, include_lineseg=True, spacer_mode: bool = False):
-        self.rulebook = RulebookLoader(styles_json_path, textbook_path)
+    # zip 항목 압축 방식 (--compression)
+    COMPRESSION = {'stored': zipfile.ZIP_STORED, 'deflated': zipfile.ZIP_DEFLATED}
+    LINE_LAYOUTS = ('fixed', 'metrics')
+    # zip 항목 수정 시각 (같은 입력이면 출력이 바이트 단위로 같도록 현재 시각 대신 고정값)
+    ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+    # reuse_previous의 원시 항목 복사(_write_raw_members)는 zipfile 공개 API에 없어 CPython ZipFile 내부 속성을 쓴다.
+    # 내부 구조를 확인한 버전에서만 사용하고, 그 밖의 버전에서는 모든 항목을 다시 기록한다
+    ZIP_RAW_COPY = (3, 10) <= sys.version_info[:2] <= (3, 13)
+
+    def __init__(self, styles_json_path, textbook_path=None, include_lineseg=True, spacer_mode: bool = False, header_cache: HeaderCache | None = None, rulebook: RulebookLoader | None = None, paragraph_cache: ParagraphCache | None = None,
+                 minify: bool = False, compression: str = 'stored', compress_level: int | None = None, stored_members=(),
+                 line_layout: str = 'fixed', font_metrics_dir: str | None = None, validate_refs: str = 'warn',
+                 output_cache: OutputCache | None = None):
+        self.rulebook = rulebook if rulebook is not None else RulebookLoader(styles_json_path, textbook_path)
         self.parser = MDParser()
         self.generator = HWPXGenerator()
         self.include_lineseg = include_lineseg
         self.spacer_mode = spacer_mode
+        # 출력 패키징: 꾸밈 공백 제거 여부, 압축 방식/레벨, 무압축으로 둘 항목(glob)
+        if compression not in self.COMPRESSION:
+            raise ValueError(f"unknown compression: {compression!r} (stored/deflated)")
+        self.minify = minify
+        self.compression = compression
+        self.compress_level = compress_level
+        self.stored_members = tuple(stored_members)
+        # linesegarray 계산: fixed=한 줄 고정값(기본, 가장 빠름), metrics=글자 너비 표로 줄 나눔(여러 줄 lineseg)
+        if line_layout not in self.LINE_LAYOUTS:
+            raise ValueError(f"unknown line layout: {line_layout!r} (fixed/metrics)")
+        self.line_layout = line_layout
+        self.font_metrics_dir = font_metrics_dir
+        self._layouts = {}
+        # 섹션 기록 중 헤더 참조 검사: warn=누락 ID 경고, error=첫 누락에서 중단(부분 출력 삭제), off=검사 안 함
+        if validate_refs not in ReferenceValidator.MODES:
+            raise ValueError(f"unknown reference validation mode: {validate_refs!r} (warn/error/off)")
+        self.validate_refs = validate_refs
+        # 마지막 create_hwpx에서 발견한 누락 참조 {(속성, ID): 횟수}
+        self.missing_refs = {}
+        self.header_cache = header_cache if header_cache is not None else HeaderCache()
+        self.paragraph_cache = paragraph_cache
+        self.output_cache = output_cache
+        self._paragraph_namespaces = {}
+        self._own_index = {}
+        self._audit_tables = {}
     
     def convert(self, md_content):
         """MD 내용을 HWPX XML로 변환하고 감사 로그 반환"""
-        lines = md_content.split('\n')
         paragraphs = []
         audit_entries = []
+        for para_xml, entry in self.iter_convert(md_content.split('\n')):
+            if para_xml is not None:
+                paragraphs.append(para_xml)
+            audit_entries.append(entry)
+        return paragraphs, audit_entries
+
+    def iter_convert(self, lines, cached: bool = False, start_line: int = 1, pin_font_face: str | None = None, layout_header=None):
+        """라인 이터러블을 순차 변환하여 (문단 XML 또는 None, 감사 항목) 쌍을 생성
+
+        lines는 리스트뿐 아니라 파일 객체 같은 지연 이터러블도 허용한다.
+        빈 줄처럼 문단을 만들지 않는 라인은 문단 XML 자리에 None을 돌려준다.
+        cached=True이면 호출자가 begin()한 문단 캐시에서 바뀌지 않은 라인을 가져온다.
+        start_line은 감사 로그의 첫 라인 번호이다(섹션 단위 변환용).
+        pin_font_face는 줄 나눔에 쓸 글꼴을 header와 맞추기 위해 받는다.
+        layout_header는 템플릿 header를 쓸 때 줄 나눔 기준이 될 (템플릿 HeaderIndex, ID 재매핑 또는 None)이다.
+        """
         # spacer-mode에서 입력의 빈 줄은 스페이서로 대체하기 위해 보류한다
         pending_empty = False
+        cache = self.paragraph_cache if cached else None
+        layout = self._line_layout(pin_font_face, layout_header)
 
-        for idx, line in enumerate(lines, start=1):
-            element_type, text, meta = self.parser.parse_line(line)
+        for idx, line, (element_type, text, meta), table in self._iter_blocks(lines, start_line):
+            if table is not None:
+                # GFM 표: 행 단위로 문단 XML 조각을 생성 (표 전체 문자열을 만들지 않는다)
+                yield from self._iter_table(idx, line, table, layout)
+                continue
             meta.setdefault('notes', [])
             meta.setdefault('warnings', [])
 
@@ -674,7 +2321,7 @@ class MDtoHWPXConverter:
                 if self.spacer_mode:
                     pending_empty = True
                 else:
-                    audit_entries.append({
+                    yield None, {
                         'line_no': idx,
                         'element_type': element_type,
                         'original': meta.get('original', ''),
@@ -684,7 +2331,7 @@ class MDtoHWPXConverter:
                         'text': '',
                         'notes': meta['notes'],
                         'warnings': meta['warnings']
-                    })
+                    }
                 continue
 
             style = self.rulebook.get_style(element_type)
@@ -693,53 +2340,39 @@ class MDtoHWPXConverter:
             if element_type not in self.rulebook.patterns:
                 warnings.append('style-fallback-paragraph')
 
-            # 특수 표 처리 확인
-            if 'requires-title-table' in meta['notes']:
-                # <주제목> 3행 표 생성
-                para_xml = self.generator.create_title_table(
-                    text, style, self.rulebook, self.parser,
-                    include_lineseg=self.include_lineseg
-                )
-            elif 'requires-emphasis-table' in meta['notes']:
-                # <강조> 1행 표 생성
-                para_xml = self.generator.create_emphasis_table(
-                    text, style, self.rulebook, self.parser,
-                    include_lineseg=self.include_lineseg
-                )
-            else:
-                # 전 줄간격 처리: 기본은 prev 여백 방식, 스페이서 모드가 켜지면 앞에 NBSP 빈 문단 삽입
-                if self.spacer_mode and element_type in {'sub_title', 'body_bullet', 'description_star', 'description_dash'}:
-                    spacer = self.rulebook.SPACER.get(element_type)
-                    if spacer:
-                        # 직전 입력이 빈 줄이었다면, 이를 스페이서로 대체하므로 추가 기록하지 않는다
-                        pending_empty = False
-                        paragraphs.append(
-                            self.generator.create_blank_paragraph(
-                                para_id=spacer['para_id'],
-                                char_id=spacer['char_id'],
-                                include_lineseg=True  # spacer 줄은 lineseg로 textheight를 10/8/6/4로 강제
-                            )
-                        )
-                        # 감사 로깅: 삽입된 스페이서 문단을 명시적으로 기록
-                        audit_entries.append({
-                            'line_no': f"{idx}.spacer",
-                            'element_type': 'spacer',
-                            'original': '',
-                            'marker': meta.get('marker'),
-                            'applied_para_id': spacer['para_id'],
-                            'applied_char_id': spacer['char_id'],
-                            'text': '\u00A0',
-                            'notes': ['spacer-inserted', element_type],
-                            'warnings': []
-                        })
-                # 일반 단락 생성
-                para_xml = self.generator.create_paragraph(
-                    element_type, text, style, self.rulebook, self.parser,
-                    include_lineseg=self.include_lineseg
-                )
-            paragraphs.append(para_xml)
-
-            audit_entries.append({
+            # 전 줄간격 처리: 기본은 prev 여백 방식, 스페이서 모드가 켜지면 앞에 NBSP 빈 문단 삽입 (표 요소 제외)
+            is_table = 'requires-title-table' in meta['notes'] or 'requires-emphasis-table' in meta['notes']
+            if not is_table and self.spacer_mode and element_type in {'sub_title', 'body_bullet', 'description_star', 'description_dash'}:
+                spacer = self.rulebook.SPACER.get(element_type)
+                if spacer:
+                    # 직전 입력이 빈 줄이었다면, 이를 스페이서로 대체하므로 추가 기록하지 않는다
+                    pending_empty = False
+                    spacer_xml = self.generator.create_blank_paragraph(
+                        para_id=spacer['para_id'],
+                        char_id=spacer['char_id'],
+                        include_lineseg=True  # spacer 줄은 lineseg로 textheight를 10/8/6/4로 강제
+                    )
+                    # 감사 로깅: 삽입된 스페이서 문단을 명시적으로 기록
+                    yield spacer_xml, {
+                        'line_no': f"{idx}.spacer",
+                        'element_type': 'spacer',
+                        'original': '',
+                        'marker': meta.get('marker'),
+                        'applied_para_id': spacer['para_id'],
+                        'applied_char_id': spacer['char_id'],
+                        'text': '\u00A0',
+                        'notes': ['spacer-inserted', element_type],
+                        'warnings': []
+                    }
+
+            # 문단 캐시: 바뀌지 않은 라인은 이전 렌더링 결과를 그대로 사용
+            para_xml = cache.get(element_type, line) if cache is not None else None
+            if para_xml is None:
+                para_xml = self._render_element(element_type, text, style, meta['notes'], layout)
+                if cache is not None:
+                    cache.put(element_type, line, para_xml)
+
+            yield para_xml, {
                 'line_no': idx,
                 'element_type': element_type,
                 'original': meta.get('original', ''),
@@ -749,50 +2382,362 @@ class MDtoHWPXConverter:
                 'text': text,
                 'notes': meta['notes'],
                 'warnings': warnings
-            })
+            }
 
-        return paragraphs, audit_entries
+    # 표 본문 행을 모아 두는 버퍼 크기 (넘으면 임시 파일로 넘긴다)
+    TABLE_SPOOL_BYTES = 1024 * 1024
+
+    def _iter_blocks(self, lines, start_line: int = 1):
+        """라인을 분류해 (라인 번호, 라인, parse_line 결과, 표) 단위로 생성
+
+        머리행 + 정렬 행으로 시작하는 연속된 표 라인은 GFM 표 하나로 묶여 마지막 항목(dict)으로 전달된다.
+        본문 행은 SpooledTemporaryFile에 모아 두므로 표의 행 수와 무관하게 메모리 사용이 일정하다.
+        정렬 행이 없는 표 라인은 일반 라인(table_raw)으로 전달된다.
+        """
+        numbered = enumerate(lines, start=start_line)
+        pushed = None
+        while True:
+            if pushed is not None:
+                item, pushed = pushed, None
+            else:
+                item = next(numbered, None)
+                if item is None:
+                    return
+            idx, line = item
+            parsed = self.parser.parse_line(line)
+            if parsed[0] != 'table_raw':
+                yield idx, line, parsed, None
+                continue
 
-    def create_hwpx(self, md_file_path, output_path, template_hwpx_path: str = None, audit_path: str = None, pin_font_face: str = None, header_audit_path: str = None, packaging: str = 'opf'):
-        """MD 파일을 읽어 HWPX 생성"""
-        # MD 파일 읽기
+            header = MDParser.split_table_row(line)
+            delimiter = next(numbered, None)
+            alignments = None
+            if delimiter is not None and self.parser.parse_line(delimiter[1])[0] == 'table_raw':
+                alignments = MDParser.parse_table_alignments(delimiter[1])
+            if alignments is None or len(alignments) != len(header):
+                parsed[2]['warnings'].append('table-without-delimiter')
+                yield idx, line, parsed, None
+                pushed = delimiter
+                continue
+
+            rows = tempfile.SpooledTemporaryFile(max_size=self.TABLE_SPOOL_BYTES, mode='w+', encoding='utf-8', newline='\n')
+            row_count = 0
+            for item in numbered:
+                if self.parser.parse_line(item[1])[0] != 'table_raw':
+                    pushed = item
+                    break
+                rows.write(item[1])
+                rows.write('\n')
+                row_count += 1
+            yield idx, line, parsed, {
+                'header': header,
+                'alignments': alignments,
+                'delimiter': delimiter[1],
+                'rows': rows,
+                'row_count': row_count,
+            }
+
+    def _iter_table(self, idx, line, table, layout=None):
+        """_iter_blocks가 묶은 GFM 표를 행 단위 (XML 조각 또는 None, 감사 항목)으로 생성
+
+        첫 조각은 hp:tbl 시작과 머리행, 이후 본문 행이 하나씩 이어지며 마지막 조각이 표를 닫는다.
+        """
+        header = table['header']
+        alignments = table['alignments']
+        col_count = len(header)
+        row_count = table['row_count'] + 1
+        widths = self.generator.table_column_widths(col_count)
+        header_style = self.rulebook.get_style('table_header')
+        cell_style = self.rulebook.get_style('table_cell')
+
+        def entry(line_no, element_type, original, style, text, notes, warnings=()):
+            return {
+                'line_no': line_no,
+                'element_type': element_type,
+                'original': original,
+                'marker': 'table',
+                'applied_para_id': style.get('para_id') if style else None,
+                'applied_char_id': style.get('char_id') if style else None,
+                'text': text,
+                'notes': notes,
+                'warnings': list(warnings)
+            }
+
+        xml = self.generator.create_table_open(row_count, col_count, self.rulebook)
+        xml += self.generator.create_table_row(
+            header, 0, widths, alignments, header_style, self.rulebook, self.parser,
+            header=True, include_lineseg=self.include_lineseg, layout=layout
+        )
+        if row_count == 1:
+            xml += self.generator.TABLE_CLOSE
+        yield xml, entry(idx, 'table_header', line, header_style, ' | '.join(header), ['table-start', f'table-size:{row_count}x{col_count}'])
+        yield None, entry(idx + 1, 'table_delimiter', table['delimiter'], None, '', ['table-alignment'])
+
+        with table['rows'] as rows:
+            rows.seek(0)
+            for row_addr, row_line in enumerate(rows, start=1):
+                row_line = row_line[:-1]
+                cells = MDParser.split_table_row(row_line)
+                warnings = []
+                if len(cells) != col_count:
+                    # GFM과 같이 모자란 셀은 비우고 넘치는 셀은 버린다
+                    warnings.append('table-cell-count-mismatch')
+                    cells = (cells + [''] * col_count)[:col_count]
+                xml = self.generator.create_table_row(
+                    cells, row_addr, widths, alignments, cell_style, self.rulebook, self.parser,
+                    include_lineseg=self.include_lineseg, layout=layout
+                )
+                if row_addr == row_count - 1:
+                    xml += self.generator.TABLE_CLOSE
+                yield xml, entry(idx + 1 + row_addr, 'table_row', row_line, cell_style, ' | '.join(cells), ['table-row'], warnings)
+
+    def _render_element(self, element_type, text, style, notes, layout=None):
+        """요소 하나의 문단 XML 렌더링 (특수 표 포함)"""
+        if 'requires-title-table' in notes:
+            # <주제목> 3행 표 생성
+            return self.generator.create_title_table(
+                text, style, self.rulebook, self.parser,
+                include_lineseg=self.include_lineseg, layout=layout
+            )
+        if 'requires-emphasis-table' in notes:
+            # <강조> 1행 표 생성
+            return self.generator.create_emphasis_table(
+                text, style, self.rulebook, self.parser,
+                include_lineseg=self.include_lineseg, layout=layout
+            )
+        # 일반 단락 생성
+        return self.generator.create_paragraph(
+            element_type, text, style, self.rulebook, self.parser,
+            include_lineseg=self.include_lineseg, layout=layout
+        )
+
+    def _line_layout(self, pin_font_face: str | None = None, layout_header=None):
+        """기록할 header 기준 줄 나눔 엔진 (linesegarray를 만들지 않거나 fixed 모드면 None)
+
+        layout_header=(템플릿 HeaderIndex, id_map)이면 템플릿의 글꼴·크기·줄간격으로 계산한다.
+        """
+        if not self.include_lineseg or self.line_layout != 'metrics':
+            return None
+        index, key = self._own_header_index(pin_font_face)
+        id_map = None
+        if layout_header is not None:
+            index, id_map = layout_header
+            key = (key, index.digest, id_map is not None)
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = LineLayout(index, self.font_metrics_dir, id_map)
+            self._layouts[key] = layout
+        return layout
+
+    def _layout_signature(self):
+        """문단 XML에 영향을 주는 줄 나눔 설정 (글자 너비 표 파일이 바뀌면 달라진다)"""
+        if not self.include_lineseg or self.line_layout != 'metrics':
+            return 'fixed'
+        stamps = []
+        if self.font_metrics_dir and os.path.isdir(self.font_metrics_dir):
+            for name in sorted(os.listdir(self.font_metrics_dir)):
+                if name.endswith('.fmet'):
+                    st = os.stat(os.path.join(self.font_metrics_dir, name))
+                    stamps.append(f'{name}:{st.st_size}:{st.st_mtime_ns}')
+        return 'metrics:' + hashlib.sha256('\n'.join(stamps).encode('utf-8')).hexdigest()[:16]
+
+    def _output_cache_key(self, md_file_path, md_content, template_hwpx_path, pin_font_face, options: dict):
+        """출력 캐시 키: MD 내용, 규칙북(생성 헤더·줄 나눔 설정), 템플릿 header, 출력에 영향을 주는 옵션의 해시"""
+        md_hash = hashlib.sha256()
+        if md_content is not None:
+            md_hash.update(md_content.encode('utf-8'))
+        else:
+            with open(md_file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    md_hash.update(block)
+        template = None
+        if template_hwpx_path and os.path.exists(template_hwpx_path):
+            try:
+                template = HeaderIndex.for_template(template_hwpx_path).digest
+            except Exception:
+                template = None
+        payload = {
+            'version': OutputCache.FORMAT_VERSION,
+            'md': md_hash.hexdigest(),
+            'rulebook': self._paragraph_cache_namespace(pin_font_face),
+            'template': template,
+            'options': dict(options, minify=self.minify, compression=self.compression, compress_level=self.compress_level,
+                            stored_members=self.stored_members, validate_refs=self.validate_refs),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _paragraph_cache_namespace(self, pin_font_face: str | None = None, layout_header=None):
+        """문단 캐시 키 공간: 규칙북 해시(spacer_mode, 고정 글꼴 포함) + include_lineseg + 줄 나눔 설정
+
+        metrics 줄 나눔이 템플릿 header 기준이면(layout_header) 템플릿 header 해시와 재매핑 여부도 포함한다.
+        """
+        layout_key = None
+        if layout_header is not None and self.include_lineseg and self.line_layout == 'metrics':
+            layout_key = (layout_header[0].digest, layout_header[1] is not None)
+        namespace = self._paragraph_namespaces.get((pin_font_face, layout_key))
+        if namespace is None:
+            namespace = f"{self._header_cache_key(pin_font_face)}:{int(self.include_lineseg)}:{self._layout_signature()}"
+            if layout_key is not None:
+                namespace += f":{layout_key[0][:16]}:{int(layout_key[1])}"
+            self._paragraph_namespaces[(pin_font_face, layout_key)] = namespace
+        return namespace
+
+    @staticmethod
+    def _iter_source_lines(f):
+        """파일 객체를 라인 단위로 지연 읽기 (str.split('\\n')과 동일한 라인 시퀀스)"""
+        last = '\n'
+        for line in f:
+            last = line
+            yield line.rstrip('\n')
+        # split('\n')은 마지막 개행 뒤의 빈 문자열도 라인으로 돌려주므로 동일하게 맞춘다
+        if last.endswith('\n'):
+            yield ''
+
+    def create_hwpx(self, md_file_path, output_path, template_hwpx_path: str = None, audit_path: str = None, pin_font_face: str = None, header_audit_path: str = None, packaging: str = 'opf', streaming: bool = False, template_remap: bool = True, audit_format: str = 'md', md_content: str | None = None, reuse_previous: bool = False,
+                    section_split: str | None = None, section_max_bytes: int | None = None, section_jobs: int = 1):
+        """MD 파일을 읽어 HWPX 생성
+
+        streaming=True이면 입력을 라인 단위로 지연 읽기하고, 문단 XML을 바이트 청크로
+        Contents/section0.xml에 바로 기록한다(Zip64). 입력 크기와 무관하게 메모리 사용이 일정하다.
+        template_remap=True이면 템플릿 헤더에 맞춰 섹션의 char/para/borderFill/style 참조 ID를 재매핑한다.
+        audit_format은 감사 로그 형식(md/jsonl/summary)이며, 감사 로그는 변환과 동시에 스트리밍 기록된다.
+        md_content가 주어지면 md_file_path 대신 그 내용을 변환하며, output_path에는 파일 객체(BytesIO 등)도 쓸 수 있다.
+        reuse_previous=True이면 직전 출력과 내용이 같은 앞쪽 항목(mimetype~header.xml)을 재압축 없이 복사한다.
+        section_split='heading'이면 최상위 제목(<주제목>, #) 앞에서, section_max_bytes가 주어지면 MD 원문 기준
+        크기를 넘을 때 본문을 Contents/section0..N.xml로 나눈다. 섹션은 하나씩 생성·기록되어 메모리 사용이
+        섹션 단위로 제한되며, deflated 압축에서 section_jobs>1이면 섹션 압축·기록을 스레드에서 다음 섹션 생성과 겹쳐 수행한다.
+        기록하는 섹션의 헤더 참조는 validate_refs 설정에 따라 header의 ID 표와 대조한다(missing_refs에 결과).
+        """
+        # MD 파일 읽기 (스트리밍 모드는 섹션 기록 시점에 라인 단위로 읽는다)
+        md_file = None
+        # 메모리의 MD 내용이 주어지면 파일을 읽지 않는다 (상주 서버 모드)
+        if md_content is not None:
+            streaming = False
         try:
-            with open(md_file_path, 'r', encoding='utf-8') as f:
-                md_content = f.read()
+            if streaming:
+                md_file = open(md_file_path, 'r', encoding='utf-8')
+            elif md_content is None:
+                with open(md_file_path, 'r', encoding='utf-8') as f:
+                    md_content = f.read()
         except FileNotFoundError:
             print(f"❌ 파일을 찾을 수 없습니다: {md_file_path}")
             raise
-        
-        # 변환
-        paragraphs, audit_entries = self.convert(md_content)
-        section_xml = self.generator.create_section(paragraphs)
-        
-        # 템플릿 헤더 로딩 (있다면 사용)
-        template_header_xml = None
-        if template_hwpx_path and os.path.exists(template_hwpx_path):
-            try:
-                with zipfile.ZipFile(template_hwpx_path, 'r') as tz:
-                    template_header_xml = tz.read('Contents/header.xml').decode('utf-8', 'ignore')
-            except Exception:
-                template_header_xml = None
 
-        # HWPX 파일 생성
-        with zipfile.ZipFile(output_path, 'w') as hwpx:
+        audit = None
+        try:
+            # 출력 캐시: 같은 입력·규칙북·템플릿·옵션의 출력이 있으면 재생성하지 않는다.
+            # 적중 시 만들 수 없는 감사 로그가 요청되었거나 파일 객체로 출력하면 사용하지 않는다
+            output_key = None
+            if self.output_cache is not None and isinstance(output_path, (str, os.PathLike)) and not audit_path and not header_audit_path:
+                output_key = self._output_cache_key(md_file_path, md_content, template_hwpx_path, pin_font_face, {
+                    'packaging': packaging, 'streaming': streaming, 'template_remap': template_remap,
+                    'section_split': section_split, 'section_max_bytes': section_max_bytes, 'section_jobs': section_jobs,
+                })
+                if self.output_cache.get(output_key, output_path):
+                    if md_file is not None:
+                        md_file.close()
+                    self.missing_refs = {}
+                    print(f"[OK] HWPX 생성 완료: {output_path}")
+                    print("   출력 캐시 적중: 재생성 생략")
+                    return output_path
+
+            # 감사 로그는 항목이 생성되는 즉시 파일로 기록하고, 헤더 감사용으로는 사용 ID 집합만 유지한다
+            audit = AuditWriter(audit_path, audit_format) if audit_path else None
+            used_para, used_char = set(), set()
+
+            def _record(entry):
+                if audit is not None:
+                    audit.write(entry)
+                if header_audit_path:
+                    if entry.get('applied_para_id') is not None:
+                        used_para.add(entry['applied_para_id'])
+                    if entry.get('applied_char_id') is not None:
+                        used_char.add(entry['applied_char_id'])
+
+            # 템플릿 헤더 로딩 (있다면 사용). 색인은 경로+mtime으로 캐시되어 반복 변환 시 재파싱하지 않는다.
+            # metrics 줄 나눔도 실제로 기록할 템플릿 header의 글꼴·크기 기준으로 계산하므로 변환 전에 읽는다
+            template_header_xml = None
+            template_index = None
+            id_map = None
+            if template_hwpx_path and os.path.exists(template_hwpx_path):
+                try:
+                    template_index = HeaderIndex.for_template(template_hwpx_path)
+                    template_header_xml = template_index.header_xml
+                    if template_remap:
+                        id_map = template_index.id_map(*self._own_header_index(pin_font_face))
+                except Exception:
+                    template_header_xml = None
+                    template_index = None
+                    id_map = None
+            if id_map is not None and not any(id_map.values()):
+                id_map = None
+            layout_header = (template_index, id_map) if template_index is not None else None
+
+            # 문단 캐시는 입력 파일 경로 단위로 직전 변환 결과를 재사용
+            cached = self.paragraph_cache is not None and md_file_path is not None
+            if cached:
+                self.paragraph_cache.begin(os.path.abspath(md_file_path), self._paragraph_cache_namespace(pin_font_face, layout_header))
+
+            # 섹션 분할 계획 (섹션별 라인 수). 스트리밍 입력은 한 번 훑어 경계만 찾고 처음으로 되돌린다
+            multi_section = section_split is not None or bool(section_max_bytes)
+            section_sizes = [None]
+            if multi_section:
+                if streaming:
+                    section_sizes = self.plan_sections(self._iter_source_lines(md_file), section_split, section_max_bytes)
+                    md_file.seek(0)
+                else:
+                    source_lines = md_content.split('\n')
+                    section_sizes = self.plan_sections(source_lines, section_split, section_max_bytes)
+            section_count = len(section_sizes)
+
+            # 변환
+            if streaming or multi_section:
+                section_xml = None
+                para_count = 0
+            else:
+                paragraphs = []
+                for para_xml, entry in self.iter_convert(md_content.split('\n'), cached=cached, pin_font_face=pin_font_face, layout_header=layout_header):
+                    _record(entry)
+                    if para_xml is not None:
+                        paragraphs.append(para_xml)
+                section_xml = self.generator.create_section(paragraphs)
+                if self.minify:
+                    section_xml = self.generator.minify(section_xml)
+                para_count = len(paragraphs)
+
+            if id_map is not None and section_xml is not None:
+                # 규칙북 고정 ID를 템플릿에 존재하는 가장 가까운 정의로 재매핑
+                section_xml = HeaderIndex.remap_refs(section_xml, id_map)
+
+            # 헤더 참조 검사기: 실제로 기록할 header(템플릿 또는 생성 헤더)의 ID 표 기준
+            validator = None
+            if self.validate_refs != 'off':
+                ref_index = template_index if template_header_xml else self._own_header_index(pin_font_face)[0]
+                validator = ReferenceValidator(ref_index, self.validate_refs)
+            if section_xml is not None:
+                section_xml = section_xml.encode('utf-8')
+                if validator is not None:
+                    validator.check(section_xml)
+
+            # HWPX 패키지 항목 (section0.xml 제외, 기록 순서대로)
+            members = []
+
+            def put(name, data):
+                members.append((name, data.encode('utf-8') if isinstance(data, str) else data))
+
             # mimetype - 반드시 무압축/첫 항목
-            info = zipfile.ZipInfo('mimetype')
-            info.compress_type = zipfile.ZIP_STORED
-            hwpx.writestr(info, 'application/hwp+zip')
-            
+            put('mimetype', 'application/hwp+zip')
+
             # version.xml
-            hwpx.writestr('version.xml', 
+            put('version.xml', 
                 '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
                 '<version>5.0.0.0</version>'
             )
-            
+
             # META-INF (패키징 방식에 따라 생성)
             if packaging == 'opf':
                 # OCF 컨테이너
-                hwpx.writestr('META-INF/container.xml',
+                put('META-INF/container.xml',
                     '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n'
                     '<ocf:container xmlns:ocf="urn:oasis:names:tc:opendocument:xmlns:container" xmlns:hpf="http://www.hancom.co.kr/schema/2011/hpf">'
                     '<ocf:rootfiles>'
@@ -801,7 +2746,7 @@ class MDtoHWPXConverter:
                     '</ocf:container>'
                 )
                 # ODF 매니페스트(최소)
-                hwpx.writestr('META-INF/manifest.xml',
+                put('META-INF/manifest.xml',
                     '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>'
                     '<odf:manifest xmlns:odf="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0"/>'
                 )
@@ -809,7 +2754,7 @@ class MDtoHWPXConverter:
 
             # META-INF/container.rdf (헤더/섹션 파트 매핑)
             if packaging == 'opf':
-                hwpx.writestr('META-INF/container.rdf',
+                put('META-INF/container.rdf',
                     '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>'
                     '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
                     '<rdf:Description rdf:about="">'
@@ -818,21 +2763,24 @@ class MDtoHWPXConverter:
                     '<rdf:Description rdf:about="Contents/header.xml">'
                     '<rdf:type rdf:resource="http://www.hancom.co.kr/hwpml/2016/meta/pkg#HeaderFile"/>'
                     '</rdf:Description>'
-                    '<rdf:Description rdf:about="">'
-                    '<ns0:hasPart xmlns:ns0="http://www.hancom.co.kr/hwpml/2016/meta/pkg#" rdf:resource="Contents/section0.xml"/>'
-                    '</rdf:Description>'
-                    '<rdf:Description rdf:about="Contents/section0.xml">'
-                    '<rdf:type rdf:resource="http://www.hancom.co.kr/hwpml/2016/meta/pkg#SectionFile"/>'
-                    '</rdf:Description>'
+                    + ''.join(
+                        '<rdf:Description rdf:about="">'
+                        f'<ns0:hasPart xmlns:ns0="http://www.hancom.co.kr/hwpml/2016/meta/pkg#" rdf:resource="Contents/section{i}.xml"/>'
+                        '</rdf:Description>'
+                        f'<rdf:Description rdf:about="Contents/section{i}.xml">'
+                        '<rdf:type rdf:resource="http://www.hancom.co.kr/hwpml/2016/meta/pkg#SectionFile"/>'
+                        '</rdf:Description>'
+                        for i in range(section_count)
+                    ) +
                     '<rdf:Description rdf:about="">'
                     '<rdf:type rdf:resource="http://www.hancom.co.kr/hwpml/2016/meta/pkg#Document"/>'
                     '</rdf:Description>'
                     '</rdf:RDF>'
                 )
-            
+
             # Contents/content.hpf - 패키징 모드에 따라 생성
             if packaging == 'opf':
-                hwpx.writestr('Contents/content.hpf',
+                put('Contents/content.hpf',
                     '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>'
                     '<opf:package '
                     'xmlns:hp="http://www.hancom.co.kr/hwpml/2011/paragraph" '
@@ -849,28 +2797,28 @@ class MDtoHWPXConverter:
                     '</opf:metadata>'
                     '<opf:manifest>'
                     '<opf:item id="header" href="Contents/header.xml" media-type="application/xml"/>'
-                    '<opf:item id="section0" href="Contents/section0.xml" media-type="application/xml"/>'
+                    + ''.join(f'<opf:item id="section{i}" href="Contents/section{i}.xml" media-type="application/xml"/>' for i in range(section_count)) +
                     '<opf:item id="settings" href="settings.xml" media-type="application/xml"/>'
                     '</opf:manifest>'
                     '<opf:spine>'
                     '<opf:itemref idref="header" linear="yes"/>'
-                    '<opf:itemref idref="section0"/>'
+                    + ''.join(f'<opf:itemref idref="section{i}"/>' for i in range(section_count)) +
                     '</opf:spine>'
                     '</opf:package>'
                 )
             else:
-                hwpx.writestr('Contents/content.hpf',
+                put('Contents/content.hpf',
                     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
                     '<hpf:HwpDoc xmlns:hpf="http://www.hancom.co.kr/schema/2011/hpf" version="1.4">\n'
                     '  <hpf:HeadRef href="header.xml"/>\n'
                     '  <hpf:Body>\n'
-                    '    <hpf:SectionRef href="section0.xml"/>\n'
+                    + ''.join(f'    <hpf:SectionRef href="section{i}.xml"/>\n' for i in range(section_count)) +
                     '  </hpf:Body>\n'
                     '</hpf:HwpDoc>'
                 )
 
             # settings.xml (최소 애플리케이션 설정)
-            hwpx.writestr('settings.xml',
+            put('settings.xml',
                 '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>'
                 '<ha:HWPApplicationSetting '
                 'xmlns:ha="http://www.hancom.co.kr/hwpml/2011/app" '
@@ -884,66 +2832,340 @@ class MDtoHWPXConverter:
                 '</config:config-item-set>'
                 '</ha:HWPApplicationSetting>'
             )
-            
-            # Contents/header.xml (템플릿 우선)
-            header_xml = template_header_xml if template_header_xml else self._create_header_xml(pin_font_face=pin_font_face)
-            hwpx.writestr('Contents/header.xml', header_xml)
-            
-            # Contents/section0.xml (본문)
-            hwpx.writestr('Contents/section0.xml', section_xml)
-        
-        print(f"[OK] HWPX 생성 완료: {output_path}")
-        print(f"   단락 수: {len(paragraphs)}개")
-
-        if audit_path:
-            self._write_audit(audit_entries, audit_path)
+
+            # Contents/header.xml (템플릿 우선, 생성 헤더는 캐시된 바이트 재사용)
+            if template_header_xml:
+                header_xml = template_header_xml
+                put('Contents/header.xml', HeaderIndex.with_section_count(header_xml, section_count) if multi_section else header_xml)
+            else:
+                header_bytes = self.get_header_bytes(pin_font_face=pin_font_face)
+                header_xml = None
+                if multi_section:
+                    header_bytes = HeaderIndex.with_section_count(header_bytes, section_count)
+                put('Contents/header.xml', self.generator.minify(header_bytes) if self.minify else header_bytes)
+
+            # HWPX 파일 생성
+            # reuse_previous이면 직전 출력에서 내용이 같은 앞쪽 항목을 압축된 바이트 그대로 복사한다 (watch 모드)
+            reused = self._reusable_prefix(output_path, members) if reuse_previous else None
+            # 경로 출력은 임시 파일에 기록한 뒤 교체한다. 기존 파일을 제자리에서 덮어쓰지 않으므로
+            # 그 파일의 다른 하드 링크(출력 캐시 항목 등)는 바뀌지 않고, 중단 시 부분 출력도 남지 않는다
+            write_path = output_path
+            if isinstance(output_path, (str, os.PathLike)):
+                write_path = f"{os.fspath(output_path)}.{os.getpid()}.tmp"
+            # ZipFile 기본 압축 설정은 section0.xml(스트리밍 open 포함)에 적용되고, 나머지는 항목별로 지정한다
+            try:
+                with zipfile.ZipFile(write_path, 'w', compression=self._member_compression('Contents/section0.xml'), compresslevel=self.compress_level) as hwpx:
+                    start = self._write_raw_members(hwpx, *reused) if reused else 0
+                    for name, data in members[start:]:
+                        if name == 'mimetype':
+                            info = zipfile.ZipInfo('mimetype')
+                            info.compress_type = zipfile.ZIP_STORED
+                            hwpx.writestr(info, data)
+                        else:
+                            hwpx.writestr(self._zip_info(name), data, compress_type=self._member_compression(name), compresslevel=self.compress_level)
+
+                    # Contents/section0.xml (본문)
+                    if multi_section:
+                        source = self._iter_source_lines(md_file) if streaming else iter(source_lines)
+                        with (md_file or contextlib.nullcontext()):
+                            para_count = self._write_sections(hwpx, source, section_sizes, _record, id_map, cached, section_jobs, pin_font_face, validator, layout_header)
+                    elif streaming:
+                        def _paragraphs():
+                            nonlocal para_count
+                            for para_xml, entry in self.iter_convert(self._iter_source_lines(md_file), cached=cached, pin_font_face=pin_font_face, layout_header=layout_header):
+                                _record(entry)
+                                if para_xml is not None:
+                                    para_count += 1
+                                    yield para_xml
+
+                        with md_file, hwpx.open('Contents/section0.xml', 'w', force_zip64=True) as sec:
+                            for chunk in self.generator.iter_section_bytes(_paragraphs()):
+                                # 청크는 문단 경계로 나뉘므로 태그 중간에서 잘리지 않는다
+                                if id_map is not None:
+                                    chunk = HeaderIndex.remap_refs(chunk, id_map)
+                                if self.minify:
+                                    chunk = self.generator.minify(chunk)
+                                if validator is not None:
+                                    validator.check(chunk)
+                                sec.write(chunk)
+                    else:
+                        # 스트리밍 경로와 같은 방식(zip64 헤더 포함)으로 열어 --stream 여부와 무관하게 출력 바이트가 같다
+                        with hwpx.open('Contents/section0.xml', 'w', force_zip64=True) as sec:
+                            sec.write(section_xml)
+                if write_path is not output_path:
+                    os.replace(write_path, output_path)
+            except BaseException:
+                if write_path is not output_path:
+                    with contextlib.suppress(OSError):
+                        os.remove(write_path)
+                raise
+
+            if cached:
+                self.paragraph_cache.commit()
+
+            print(f"[OK] HWPX 생성 완료: {output_path}")
+            print(f"   단락 수: {para_count}개")
+            if multi_section:
+                print(f"   섹션 수: {section_count}개")
+            if reused:
+                print(f"   재사용 항목: {len(reused[1])}/{len(members)}개 (직전 출력의 압축 바이트 그대로)")
+            self.missing_refs = dict(validator.missing) if validator is not None else {}
+            if self.missing_refs:
+                print(f"   ⚠️ header에 정의되지 않은 참조 {len(self.missing_refs)}종: {validator.summary()}")
+            elif output_key is not None:
+                # 누락 참조가 있는 출력은 캐시하지 않는다 (적중 시 경고를 다시 보여줄 수 없음)
+                self.output_cache.put(output_key, output_path)
+        except BaseException as e:
+            if md_file is not None:
+                md_file.close()
+            if self.paragraph_cache is not None:
+                # 중단된 변환의 문단 스풀은 스냅샷으로 저장하지 않는다
+                self.paragraph_cache.abort()
+            # 참조 검사(error)로 중단되면 기록 전(버퍼 모드)이든 기록 중(스트리밍/다중 섹션)이든
+            # 이전 출력을 지워 성공한 변환으로 오인되지 않게 한다
+            if isinstance(e, MissingReferenceError) and isinstance(output_path, (str, os.PathLike)):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(output_path)
+            # 변환이 중단되면 출력과 함께 미완성 감사 로그도 남기지 않는다
+            if audit is not None:
+                audit.close()
+                with contextlib.suppress(OSError):
+                    os.remove(audit_path)
+            raise
+
+        if audit is not None:
+            audit.close()
             print(f"   감사 로그: {audit_path}")
         if header_audit_path:
-            used_para = {e['applied_para_id'] for e in audit_entries if e.get('applied_para_id') is not None}
-            used_char = {e['applied_char_id'] for e in audit_entries if e.get('applied_char_id') is not None}
-            self._write_header_audit(header_xml, used_para, used_char, header_audit_path)
+            if id_map is not None:
+                used_para = {id_map['para'].get(i, i) for i in used_para}
+                used_char = {id_map['char'].get(i, i) for i in used_char}
+            if header_xml is None:
+                # 생성 헤더는 렌더링 시 기록한 스타일 표를 그대로 사용한다 (XML 재파싱 없음)
+                tables = self._header_audit_tables(pin_font_face)
+            else:
+                tables = template_index.audit_tables
+            self._write_header_audit(header_xml, used_para, used_char, header_audit_path, tables=tables)
             print(f"   헤더 감사: {header_audit_path}")
         return output_path
 
+    # section_split='heading'에서 새 섹션을 시작하는 최상위 제목 요소
+    SECTION_BREAK_TYPES = ('main_title', 'h1')
+
+    def plan_sections(self, lines, split: str | None = None, max_bytes: int | None = None):
+        """본문을 나눌 섹션별 라인 수 목록 계산 (라인 이터러블을 한 번만 훑는다)
+
+        split='heading'이면 최상위 제목 라인 앞에서, max_bytes가 주어지면 섹션의 MD 원문(UTF-8)이
+        max_bytes를 넘은 뒤 다음 라인에서 새 섹션을 시작한다. 빈 섹션은 만들지 않으며,
+        연속된 표 라인(GFM 표) 중간에서는 나누지 않는다.
+        """
+        if split not in (None, 'heading'):
+            raise ValueError(f"unknown section split: {split!r} (heading)")
+        sizes = []
+        count = 0
+        size = 0
+        has_content = False
+        in_table = False
+        for line in lines:
+            boundary = False
+            was_table = in_table
+            in_table = line[:1] == '|' and self.parser.parse_line(line)[0] == 'table_raw'
+            if has_content and not (was_table and in_table):
+                if max_bytes and size >= max_bytes:
+                    boundary = True
+                elif split == 'heading' and line.lstrip()[:1] in ('<', '#'):
+                    boundary = self.parser.parse_line(line)[0] in self.SECTION_BREAK_TYPES
+            if boundary:
+                sizes.append(count)
+                count = size = 0
+                has_content = False
+            count += 1
+            size += len(line.encode('utf-8')) + 1
+            has_content = has_content or bool(line.strip())
+        if count or not sizes:
+            sizes.append(count)
+        return sizes
+
+    def _write_sections(self, hwpx, lines, section_sizes, record, id_map=None, cached=False, jobs: int = 1, pin_font_face: str | None = None, validator: ReferenceValidator | None = None, layout_header=None):
+        """라인 이터레이터를 section_sizes대로 나눠 Contents/section{i}.xml로 기록하고 문단 수 반환
+
+        섹션은 서로 독립적으로(각자 secPr 컨트롤 문단 포함) 생성된다. deflated 압축에서 jobs>1이면
+        생성된 섹션을 기록 스레드가 순서대로 압축·기록(ZipFile.open, zlib은 GIL을 해제)하는 동안
+        다음 섹션을 생성한다. 동시에 메모리에 있는 섹션은 최대 jobs개이다. validator가 주어지면 기록 전 청크의 헤더 참조를 검사한다.
+        layout_header는 줄 나눔 기준 템플릿 header이다 (iter_convert 참고).
+        """
+        para_count = 0
+
+        def section_paragraphs(count, first_line):
+            nonlocal para_count
+            for para_xml, entry in self.iter_convert(itertools.islice(lines, count), cached=cached, start_line=first_line, pin_font_face=pin_font_face, layout_header=layout_header):
+                record(entry)
+                if para_xml is not None:
+                    para_count += 1
+                    yield para_xml
+
+        def section_bytes(count, first_line):
+            for chunk in self.generator.iter_section_bytes(section_paragraphs(count, first_line)):
+                if id_map is not None:
+                    chunk = HeaderIndex.remap_refs(chunk, id_map)
+                if self.minify:
+                    chunk = self.generator.minify(chunk)
+                if validator is not None:
+                    validator.check(chunk)
+                yield chunk
+
+        starts = list(itertools.accumulate([1] + section_sizes[:-1]))
+        if jobs <= 1 or self._member_compression('Contents/section0.xml') != zipfile.ZIP_DEFLATED:
+            for i, (count, first_line) in enumerate(zip(section_sizes, starts)):
+                with hwpx.open(f'Contents/section{i}.xml', 'w', force_zip64=True) as sec:
+                    for chunk in section_bytes(count, first_line):
+                        sec.write(chunk)
+            return para_count
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        def write(name, data):
+            # jobs=1 경로와 같은 방식으로 열어 출력 바이트가 jobs와 무관하게 같다
+            with hwpx.open(name, 'w', force_zip64=True) as sec:
+                sec.write(data)
+
+        # 기록 스레드는 하나뿐이므로 zip 항목 순서가 유지되고, ZipFile에 동시에 쓰지 않는다
+        pending = collections.deque()
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            for i, (count, first_line) in enumerate(zip(section_sizes, starts)):
+                data = b''.join(section_bytes(count, first_line))
+                pending.append(writer.submit(write, f'Contents/section{i}.xml', data))
+                while len(pending) >= jobs:
+                    pending.popleft().result()
+            while pending:
+                pending.popleft().result()
+        return para_count
+
+    @classmethod
+    def _zip_info(cls, name):
+        """고정 수정 시각의 zip 항목 정보 (writestr 기본값과 같은 권한)"""
+        info = zipfile.ZipInfo(name, date_time=cls.ZIP_DATE_TIME)
+        info.external_attr = 0o600 << 16
+        return info
+
+    def _member_compression(self, name):
+        """zip 항목별 압축 방식 (mimetype과 stored_members에 해당하는 항목은 항상 무압축)"""
+        if name == 'mimetype' or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.stored_members):
+            return zipfile.ZIP_STORED
+        return self.COMPRESSION[self.compression]
+
+    def _reusable_prefix(self, output_path, members):
+        """직전 출력 파일에서 members와 이름·내용(CRC/크기)·순서가 같은 앞쪽 항목들의 원본 바이트와 ZipInfo 반환
+
+        재사용할 항목이 없거나 직전 출력이 없으면(또는 원시 항목 복사를 지원하지 않는 Python이면) None.
+        """
+        if not self.ZIP_RAW_COPY or not isinstance(output_path, (str, os.PathLike)) or not os.path.exists(output_path):
+            return None
+        try:
+            with zipfile.ZipFile(output_path) as prev:
+                infos = prev.infolist()
+        except (OSError, zipfile.BadZipFile):
+            return None
+        matched = []
+        for info, (name, data) in zip(infos, members):
+            if info.filename != name or info.file_size != len(data) or info.CRC != zlib.crc32(data):
+                break
+            # 압축 설정이 바뀐 항목은 새 설정으로 다시 기록
+            if info.compress_type != self._member_compression(name):
+                break
+            matched.append(info)
+        # 첫 불일치 항목의 로컬 헤더 앞까지가 재사용할 바이트 구간
+        if not matched or len(infos) <= len(matched):
+            return None
+        with open(output_path, 'rb') as f:
+            raw = f.read(infos[len(matched)].header_offset)
+        return raw, matched
+
+    @staticmethod
+    def _write_raw_members(hwpx, raw, infos):
+        """재압축 없이 직전 출력의 로컬 헤더+데이터를 그대로 기록하고 중앙 디렉터리에 등록, 기록한 항목 수 반환
+
+        ZipFile 내부 속성(fp, start_dir, filelist, NameToInfo)을 쓰는 유일한 곳이다 (ZIP_RAW_COPY 버전에서만 호출).
+        raw는 직전 출력의 파일 앞부분이라 항목 오프셋이 그대로 맞으므로, 새로 연 빈 zip의 첫 기록으로만 허용한다.
+        """
+        if hwpx.filelist or hwpx.start_dir != 0 or hwpx.fp.tell() != 0:
+            raise RuntimeError("원시 항목 복사는 빈 zip의 첫 기록이어야 함")
+        hwpx.fp.write(raw)
+        hwpx.start_dir = hwpx.fp.tell()
+        for info in infos:
+            hwpx.filelist.append(info)
+            hwpx.NameToInfo[info.filename] = info
+        return len(infos)
+
     @staticmethod
-    def _write_audit(audit_entries, audit_path):
-        with open(audit_path, 'w', encoding='utf-8') as f:
-            f.write('# Conversion Audit\n\n')
+    def _write_audit(audit_entries, audit_path, fmt: str = 'md'):
+        with AuditWriter(audit_path, fmt) as audit:
             for entry in audit_entries:
-                f.write(f"## Line {entry['line_no']} — {entry['element_type']}\n")
-                f.write(f"- Original: {entry['original']}\n")
-                if entry.get('marker'):
-                    f.write(f"- Marker: {entry['marker']}\n")
-                if entry.get('text'):
-                    f.write(f"- Text used: {entry['text']}\n")
-                if entry.get('applied_para_id') is not None:
-                    f.write(f"- paraPrID: {entry['applied_para_id']}\n")
-                if entry.get('applied_char_id') is not None:
-                    f.write(f"- charPrID: {entry['applied_char_id']}\n")
-                if entry.get('notes'):
-                    f.write(f"- Notes: {'; '.join(entry['notes'])}\n")
-                if entry.get('warnings'):
-                    f.write(f"- Warnings: {'; '.join(entry['warnings'])}\n")
-                f.write('\n')
+                audit.write(entry)
     
-    def _create_header_xml(self, pin_font_face: str | None = None):
+    def _header_cache_key(self, pin_font_face: str | None = None):
+        """header.xml 생성 입력의 내용 해시"""
+        rb = self.rulebook
+        payload = {
+            'textbook_styles': rb.textbook_styles,
+            'char_styles': rb.char_styles,
+            'para_styles': rb.para_styles,
+            'patterns': rb.patterns,
+            'spacer': rb.SPACER,
+            'table': rb.TABLE,
+            'fixed_ids': [rb.BOLD_CHAR_ID, rb.ITALIC_CHAR_ID, rb.BOLD_ITALIC_CHAR_ID, rb.CODE_CHAR_ID],
+            'font_ids': rb.FONT_IDS,
+            'pin_font_face': pin_font_face,
+            'spacer_mode': self.spacer_mode,
+        }
+        if rb.char_overrides or rb.para_overrides:
+            payload['style_guide'] = [rb.char_overrides, rb.para_overrides]
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def _own_header_index(self, pin_font_face: str | None = None):
+        """생성 헤더의 색인과 캐시 키 반환 (템플릿 ID 재매핑 기준)"""
+        key = self._header_cache_key(pin_font_face)
+        index = self._own_index.get(key)
+        if index is None:
+            index = HeaderIndex(self.get_header_bytes(pin_font_face).decode('utf-8'))
+            self._own_index[key] = index
+        return index, key
+
+    def get_header_bytes(self, pin_font_face: str | None = None, log=None):
+        """인코딩된 header.xml 바이트 반환 (캐시 적중 시 생성 생략, log는 생성 메시지 스트림)"""
+        key = self._header_cache_key(pin_font_face)
+        data = self.header_cache.get(key)
+        if data is None and key in self.rulebook.prerendered_headers:
+            # 규칙북 번들에 사전 렌더링된 헤더
+            data = self.rulebook.prerendered_headers[key]
+            self.header_cache.put(key, data)
+        if data is None:
+            tables = {'char': {}, 'para': {}}
+            data = self._create_header_xml(pin_font_face=pin_font_face, tables=tables, log=log).encode('utf-8')
+            self.header_cache.put(key, data)
+            self._audit_tables[key] = tables
+        return data
+
+    def _header_audit_tables(self, pin_font_face: str | None = None):
+        """생성 헤더의 감사용 스타일 표 (렌더링 시 기록한 표, 디스크 캐시 적중 등으로 없으면 한 번 파싱)"""
+        key = self._header_cache_key(pin_font_face)
+        tables = self._audit_tables.get(key)
+        if tables is None:
+            tables = self._own_header_index(pin_font_face)[0].audit_tables
+            self._audit_tables[key] = tables
+        return tables
+
+    def _create_header_xml(self, pin_font_face: str | None = None, tables: dict | None = None, log=None):
         """header.xml 생성 (멀티 폰트 지원, textbook_styles 반영)"""
 
         # textbook_styles 사용 여부 확인
         use_textbook = self.rulebook.textbook_styles is not None
 
         if use_textbook:
-            print("[INFO] style_textbook.md 규칙을 사용하여 header 생성")
+            print("[INFO] style_textbook.md 규칙을 사용하여 header 생성", file=log)
 
-        # 폰트 매핑 (ID 기반) - Windows 호환 폰트 사용
-        # id 0: 맑은 고딕 (제목/고딕 계열)
-        # id 1: 휴먼명조 (본문 명조 계열)
-        # id 2: 보조 고딕 (코드 등)
-        fonts = {
-            'HY헤드라인M': 0,    # 맑은 고딕으로 대체
-            '휴먼명조': 1,
-            '맑은 고딕': 0
-        }
+        fonts = self.rulebook.FONT_IDS
 
         header = []
         header.append('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>')
@@ -1061,10 +3283,10 @@ class MDtoHWPXConverter:
         # 동적으로 생성하므로 정합성을 위해 항목을 먼저 수집한 뒤 itemCnt를 계산한다.
         char_items = []
 
-        def _charpr_xml(cid, height, font_id, bold=False, italic=False):
+        def _charpr_xml(cid, height, font_id, bold=False, italic=False, color='#000000'):
             lines = []
             lines.append(
-                f'      <hh:charPr id="{cid}" height="{height}" textColor="#000000" '
+                f'      <hh:charPr id="{cid}" height="{height}" textColor="{color}" '
                 'shadeColor="none" useFontSpace="0" useKerning="0" symMark="NONE" borderFillIDRef="0">'
             )
             lines.append(
@@ -1086,8 +3308,24 @@ class MDtoHWPXConverter:
             lines.append('      </hh:charPr>')
             return lines
 
+        # 스타일 가이드가 정의한 ID는 가이드 속성이 우선한다
+        char_overrides = self.rulebook.char_overrides
+        emitted_chars = set()
+
         def charpr(cid, height, font_id, bold=False, italic=False):
-            char_items.extend(_charpr_xml(cid, height, font_id, bold=bold, italic=italic))
+            color = '#000000'
+            override = char_overrides.get(cid)
+            if override:
+                height = override.get('height', height)
+                font_id = override.get('font_id', font_id)
+                bold = override.get('bold', bold)
+                italic = override.get('italic', italic)
+                color = override.get('color', color)
+            emitted_chars.add(cid)
+            char_items.extend(_charpr_xml(cid, height, font_id, bold=bold, italic=italic, color=color))
+            if tables is not None:
+                # 헤더 감사용 표 (ID 중복 시 첫 정의 기준)
+                tables['char'].setdefault(cid, (str(height), bold, italic, str(font_id), str(font_id)))
 
         # 기본 charPr (0-6, Model 호환)
         charpr(0, 1000, 1)      # 기본
@@ -1127,6 +3365,7 @@ class MDtoHWPXConverter:
             body_height = body_cfg.get('size', 15) * 100
             charpr(self.rulebook.BOLD_CHAR_ID, body_height, body_font, bold=True)
             charpr(self.rulebook.ITALIC_CHAR_ID, body_height, body_font, italic=True)
+            charpr(self.rulebook.BOLD_ITALIC_CHAR_ID, body_height, body_font, bold=True, italic=True)
 
             style_char('main_title', 'HY헤드라인M', 15, force_bold=True)
             style_char('sub_title', 'HY헤드라인M', 15)
@@ -1143,6 +3382,7 @@ class MDtoHWPXConverter:
             default_body_height = 1500
             charpr(self.rulebook.BOLD_CHAR_ID, default_body_height, default_body_font, bold=True)
             charpr(self.rulebook.ITALIC_CHAR_ID, default_body_height, default_body_font, italic=True)
+            charpr(self.rulebook.BOLD_ITALIC_CHAR_ID, default_body_height, default_body_font, bold=True, italic=True)
             charpr(self.rulebook.patterns['main_title']['char_id'], 1500, fonts.get('HY헤드라인M', 0), bold=True)
             charpr(self.rulebook.patterns['sub_title']['char_id'], 1500, fonts.get('HY헤드라인M', 0))
             charpr(self.rulebook.patterns['body_bullet']['char_id'], default_body_height, default_body_font)
@@ -1163,6 +3403,10 @@ class MDtoHWPXConverter:
         charpr(203, 600, spacer_font)
         charpr(204, 400, spacer_font)
 
+        # 스타일 가이드에만 있는 charPr (본문 글꼴·크기 기준에 가이드 속성 적용)
+        for cid in sorted(set(char_overrides) - emitted_chars):
+            charpr(cid, 1500, fonts.get('휴먼명조', 1))
+
         # 수집된 문자 스타일을 itemCnt에 맞춰 출력
         header.append(f'    <hh:charProperties itemCnt="{sum(1 for l in char_items if l.strip().startswith("<hh:charPr "))}">')
         header.extend(char_items)
@@ -1195,7 +3439,8 @@ class MDtoHWPXConverter:
         # 문단 스타일도 itemCnt 고정값을 쓰지 않고 먼저 수집 후 실제 개수를 기록한다.
         para_items = []
 
-        def _parapr_xml(pid, align, lsp):
+        def _parapr_xml(pid, align, lsp, margins=None):
+            margins = margins or {}
             lines = []
             # 기본 snapToGrid는 1이지만, 커스텀 본문 계열(22~27)은 0으로 하여 겹침/줄바꿈 이슈를 회피한다
             snap = '0' if pid in {22,23,24,25,26,27} else '1'
@@ -1216,25 +3461,21 @@ class MDtoHWPXConverter:
             else:
                 prev_map = {23: 1000, 24: 800, 25: 600, 26: 400}
                 prev_margin = prev_map.get(pid, 0)
+            # 스타일 가이드의 들여쓰기/여백(HWPUNIT)이 있으면 그 값을 쓴다
+            margin = {'intent': 0, 'left': 0, 'right': 0, 'prev': prev_margin, 'next': 0}
+            margin.update(margins)
+            margin_lines = [f'              <hc:{name} value="{value}" unit="HWPUNIT"/>' for name, value in margin.items()]
             lines.append('        <hp:switch>')
             lines.append('          <hp:case hp:required-namespace="http://www.hancom.co.kr/hwpml/2016/HwpUnitChar">')
             lines.append('            <hh:margin>')
-            lines.append('              <hc:intent value="0" unit="HWPUNIT"/>')
-            lines.append('              <hc:left value="0" unit="HWPUNIT"/>')
-            lines.append('              <hc:right value="0" unit="HWPUNIT"/>')
-            lines.append(f'              <hc:prev value="{prev_margin}" unit="HWPUNIT"/>')
-            lines.append('              <hc:next value="0" unit="HWPUNIT"/>')
+            lines.extend(margin_lines)
             lines.append('            </hh:margin>')
             # PERCENT 타입인 경우 unit 속성은 생략한다
             lines.append(f'            <hh:lineSpacing type="PERCENT" value="{lsp}"/>')
             lines.append('          </hp:case>')
             lines.append('          <hp:default>')
             lines.append('            <hh:margin>')
-            lines.append('              <hc:intent value="0" unit="HWPUNIT"/>')
-            lines.append('              <hc:left value="0" unit="HWPUNIT"/>')
-            lines.append('              <hc:right value="0" unit="HWPUNIT"/>')
-            lines.append(f'              <hc:prev value="{prev_margin}" unit="HWPUNIT"/>')
-            lines.append('              <hc:next value="0" unit="HWPUNIT"/>')
+            lines.extend(margin_lines)
             lines.append('            </hh:margin>')
             lines.append(f'            <hh:lineSpacing type="PERCENT" value="{lsp}"/>')
             lines.append('          </hp:default>')
@@ -1243,8 +3484,17 @@ class MDtoHWPXConverter:
             lines.append('      </hh:paraPr>')
             return lines
 
+        para_overrides = self.rulebook.para_overrides
+        emitted_paras = set()
+
         def parapr(pid, align, lsp):
-            para_items.extend(_parapr_xml(pid, align, lsp))
+            override = para_overrides.get(pid) or {}
+            align = override.get('align', align)
+            lsp = override.get('line_spacing', lsp)
+            emitted_paras.add(pid)
+            para_items.extend(_parapr_xml(pid, align, lsp, override.get('margins')))
+            if tables is not None:
+                tables['para'].setdefault(pid, (align, 'PERCENT', str(lsp)))
 
         # 기본 paraPr (0-21, Model 호환)
         parapr(0, 'JUSTIFY', '160')     # 기본
@@ -1333,6 +3583,17 @@ class MDtoHWPXConverter:
         para_items.extend(_parapr_spacer_xml(29))  # body_bullet spacer
         para_items.extend(_parapr_spacer_xml(30))  # description_dash spacer
         para_items.extend(_parapr_spacer_xml(31))  # description_star spacer
+        if tables is not None:
+            for pid in (28, 29, 30, 31):
+                tables['para'].setdefault(pid, ('LEFT', 'PERCENT', '160'))
+
+        # GFM 표 셀 정렬용 paraPr (32: 왼쪽, 33: 가운데, 34: 오른쪽)
+        for align, pid in self.rulebook.TABLE['align_para_ids'].items():
+            parapr(pid, align.upper(), '130')
+
+        # 스타일 가이드에만 있는 paraPr (기본 문단 기준에 가이드 속성 적용)
+        for pid in sorted(set(para_overrides) - emitted_paras):
+            parapr(pid, 'JUSTIFY', '160')
 
         header.append(f'    <hh:paraProperties itemCnt="{sum(1 for l in para_items if l.strip().startswith("<hh:paraPr "))}">')
         header.extend(para_items)
@@ -1374,52 +3635,667 @@ class MDtoHWPXConverter:
         return '\n'.join(header)
 
     @staticmethod
-    def _write_header_audit(header_xml: str, used_para_ids, used_char_ids, path: str):
-        import xml.etree.ElementTree as ET
-        NS = {
-            'hh': 'http://www.hancom.co.kr/hwpml/2011/head',
-            'hc': 'http://www.hancom.co.kr/hwpml/2011/core'
-        }
-        root = ET.fromstring(header_xml)
+    def _write_header_audit(header_xml: str, used_para_ids, used_char_ids, path: str, tables=None):
+        """사용된 char/para ID의 정의 요약 기록
+
+        tables(HeaderIndex.audit_tables 형식)가 주어지면 XML을 다시 파싱하지 않는다.
+        없으면 header_xml을 한 번만 훑어 ID 색인을 만든 뒤 ID별로 조회한다.
+        """
+        if tables is None:
+            tables = HeaderIndex(header_xml).audit_tables
+        char_table = tables['char']
+        para_table = tables['para']
         with open(path, 'w', encoding='utf-8') as f:
             f.write('# Header Audit\n\n')
             f.write('## Character Styles\n')
             for cid in sorted(used_char_ids):
-                pr = root.find(f".//hh:charPr[@id='{cid}']", NS)
+                pr = char_table.get(cid)
                 if pr is None:
                     f.write(f'- id {cid}: MISSING\n')
                     continue
-                height = pr.get('height')
-                bold = pr.find('hh:bold', NS) is not None
-                italic = pr.find('hh:italic', NS) is not None
-                fref = pr.find('hh:fontRef', NS)
-                hangul = fref.get('hangul') if fref is not None else '?'
-                latin = fref.get('latin') if fref is not None else '?'
+                height, bold, italic, hangul, latin = pr
                 f.write(f'- id {cid}: height={height}, bold={bold}, italic={italic}, fontRef(hangul={hangul}, latin={latin})\n')
             f.write('\n## Paragraph Styles\n')
             for pid in sorted(used_para_ids):
-                pr = root.find(f".//hh:paraPr[@id='{pid}']", NS)
+                pr = para_table.get(pid)
                 if pr is None:
                     f.write(f'- id {pid}: MISSING\n')
                     continue
-                align = pr.find('hh:align', NS)
-                lsp = pr.find('.//hh:lineSpacing', NS)
-                f.write(f"- id {pid}: align={align.get('horizontal') if align is not None else '?'}, "
-                        f"lineSpacing={lsp.get('type') if lsp is not None else '?'}/{lsp.get('value') if lsp is not None else '?'}\n")
+                align, lsp_type, lsp_value = pr
+                f.write(f"- id {pid}: align={align}, lineSpacing={lsp_type}/{lsp_value}\n")
+
+# ========== 규칙북 컴파일 ==========
+def load_style_guide(path):
+    """YAML 스타일 가이드 로딩 (PyYAML 필요)"""
+    try:
+        import yaml
+    except ImportError:
+        raise RuntimeError('스타일 가이드(YAML)를 읽으려면 PyYAML이 필요합니다: pip install pyyaml')
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def compile_rulebook(styles_json_path, textbook_path, output_path, style_guide_path=None):
+    """스타일 JSON + 텍스트북 + (선택) YAML 스타일 가이드를 검증된 규칙북 번들로 컴파일
+
+    해석된 char/para ID, 폰트 표, 사전 렌더링된 header.xml(일반/스페이서 모드)을 담는다.
+    규칙북이 참조하는 ID가 생성 헤더에 정의되어 있지 않으면 ValueError.
+    """
+    rulebook = RulebookLoader(styles_json_path, textbook_path)
+    if style_guide_path:
+        rulebook.apply_style_guide(load_style_guide(style_guide_path))
+
+    headers = {}
+    used_chars, used_paras = rulebook.referenced_ids()
+    for spacer_mode in (False, True):
+        converter = MDtoHWPXConverter(None, include_lineseg=True, spacer_mode=spacer_mode, rulebook=rulebook)
+        header_bytes = converter.get_header_bytes()
+        index, key = converter._own_header_index()
+        missing_chars = sorted(used_chars - set(index.char))
+        missing_paras = sorted(used_paras - set(index.para))
+        if missing_chars or missing_paras:
+            raise ValueError(f"규칙북 검증 실패: header에 없는 charPr {missing_chars}, paraPr {missing_paras}")
+        headers[key] = header_bytes
+
+    data = {
+        'char_styles': list(rulebook.char_styles.values()),
+        'para_styles': list(rulebook.para_styles.values()),
+        'textbook_styles': rulebook.textbook_styles,
+        'patterns': rulebook.patterns,
+        'font_ids': rulebook.FONT_IDS,
+        'style_guide': rulebook.style_guide,
+        'sources': {
+            'styles': os.path.abspath(styles_json_path),
+            'textbook': os.path.abspath(textbook_path) if textbook_path else None,
+            'style_guide': os.path.abspath(style_guide_path) if style_guide_path else None,
+        },
+    }
+    with open(output_path, 'wb') as f:
+        f.write(RulebookBundle.encode(data, headers))
+    return output_path
+
+
+# ========== 배치 변환 (프로세스 풀) ==========
+# 워커 프로세스마다 한 번만 설정되는 변환기 (규칙북이 이미 로딩된 상태로 전달됨)
+_WORKER_CONVERTER = None
+
+
+def _worker_init(converter):
+    global _WORKER_CONVERTER
+    _WORKER_CONVERTER = converter
+
+
+AUDIT_SUFFIXES = {'md': '.audit.md', 'jsonl': '.audit.jsonl', 'summary': '.audit.summary.md'}
+
+
+def _side_output_paths(output_file, audit=False, header_audit=False, audit_format='md'):
+    """출력 경로 기준 감사 로그/헤더 감사 경로 계산"""
+    base, _ = os.path.splitext(output_file)
+    audit_path = f"{base}{AUDIT_SUFFIXES[audit_format]}" if audit else None
+    header_audit_path = f"{base}.header.audit.md" if header_audit else None
+    return audit_path, header_audit_path
+
+
+def _batch_convert_one(md_path, output_path, options):
+    """배치 작업 1건 변환 후 상태/소요 시간 기록 반환 (워커에서 실행)"""
+    converter = _WORKER_CONVERTER
+    audit_format = options.get('audit_format', 'md')
+    audit_path, header_audit_path = _side_output_paths(
+        output_path, options.get('audit', False), options.get('header_audit', False), audit_format
+    )
+    record = {'input': md_path, 'output': output_path, 'status': 'ok', 'error': None}
+    cache = converter.paragraph_cache
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+    output_hits = converter.output_cache.hits if converter.output_cache is not None else None
+    start = time.perf_counter()
+    try:
+        # 파일별 진행 메시지는 매니페스트로 대체하므로 워커 출력은 버린다
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.create_hwpx(
+                md_path,
+                output_path,
+                template_hwpx_path=options.get('template'),
+                audit_path=audit_path,
+                pin_font_face=options.get('pin_font'),
+                header_audit_path=header_audit_path,
+                packaging=options.get('packaging', 'opf'),
+                streaming=options.get('streaming', False),
+                template_remap=options.get('template_remap', True),
+                audit_format=audit_format,
+                section_split=options.get('section_split'),
+                section_max_bytes=options.get('section_max_bytes'),
+                section_jobs=options.get('section_jobs', 1)
+            )
+        record['bytes'] = os.path.getsize(output_path)
+        if converter.missing_refs:
+            record['missing_refs'] = {f"{attr}={rid}": count for (attr, rid), count in sorted(converter.missing_refs.items())}
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['elapsed_sec'] = round(time.perf_counter() - start, 4)
+    if cache is not None:
+        record['paragraph_cache'] = {'hits': cache.hits - hits, 'misses': cache.misses - misses}
+    if output_hits is not None:
+        record['output_cache'] = 'hit' if converter.output_cache.hits > output_hits else 'miss'
+    return record
+
+
+def resolve_batch_inputs(source):
+    """디렉터리(내부 *.md) 또는 glob 패턴을 입력 MD 파일 목록으로 변환"""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.md'))
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def batch_output_paths(inputs, output_dir):
+    """입력 MD 경로별 출력 HWPX 경로 계산
+
+    입력들의 공통 상위 디렉터리 기준 상대 경로를 output_dir 아래에 그대로 옮기므로
+    재귀 glob에서 a/x.md와 b/x.md는 <output_dir>/a/x.hwpx, <output_dir>/b/x.hwpx가 된다.
+    그래도 출력 경로가 겹치면(x.md와 x.markdown 등) 변환 전에 ValueError를 낸다.
+    """
+    if not inputs:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in inputs])
+    outputs = []
+    owners = {}
+    for md_path in inputs:
+        rel = os.path.splitext(os.path.relpath(os.path.abspath(md_path), root))[0]
+        out_path = os.path.join(output_dir, f"{rel}.hwpx")
+        key = os.path.normcase(os.path.abspath(out_path))
+        if key in owners:
+            raise ValueError(f"출력 경로 중복: {owners[key]}, {md_path} → {out_path}")
+        owners[key] = md_path
+        outputs.append(out_path)
+    return outputs
+
+
+def convert_batch(converter, inputs, output_dir, jobs=None, manifest_path=None, **options):
+    """여러 MD 파일을 프로세스 풀로 병렬 변환하고 매니페스트(JSON) 기록
+
+    converter는 규칙북이 로딩된 상태로 각 워커에 한 번만 전달되므로
+    파일마다 스타일 JSON/텍스트북을 다시 파싱하지 않는다.
+    출력 경로는 batch_output_paths()로 입력의 디렉터리 구조를 유지한다.
+    options는 create_hwpx 옵션(template, audit, audit_format, header_audit, pin_font, packaging, streaming, template_remap,
+    section_split, section_max_bytes, section_jobs)이다.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    tasks = list(zip(inputs, batch_output_paths(inputs, output_dir)))
+    os.makedirs(output_dir, exist_ok=True)
+    for out_dir in sorted({os.path.dirname(out_path) for _, out_path in tasks}):
+        os.makedirs(out_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+
+    # 워커에 전달하기 전에 헤더를 미리 렌더링해 두면 모든 워커가 캐시 적중으로 시작한다
+    if not options.get('template'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.get_header_bytes(pin_font_face=options.get('pin_font'))
+
+    start = time.perf_counter()
+    records = []
+    if jobs == 1:
+        _worker_init(converter)
+        for md_path, out_path in tasks:
+            records.append(_batch_convert_one(md_path, out_path, options))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=(converter,)) as pool:
+            futures = [pool.submit(_batch_convert_one, md_path, out_path, options) for md_path, out_path in tasks]
+            for fut in as_completed(futures):
+                records.append(fut.result())
+        records.sort(key=lambda r: r['input'])
+    wall = time.perf_counter() - start
+
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'jobs': jobs,
+        'total': len(records),
+        'ok': sum(1 for r in records if r['status'] == 'ok'),
+        'failed': sum(1 for r in records if r['status'] != 'ok'),
+        'wall_sec': round(wall, 4),
+        'files': records,
+    }
+    if converter.paragraph_cache is not None:
+        hits = sum(r['paragraph_cache']['hits'] for r in records)
+        misses = sum(r['paragraph_cache']['misses'] for r in records)
+        manifest['paragraph_cache'] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    if converter.output_cache is not None:
+        hits = sum(1 for r in records if r.get('output_cache') == 'hit')
+        manifest['output_cache'] = {
+            'hits': hits,
+            'misses': len(records) - hits,
+            'hit_rate': round(hits / len(records), 4) if records else None,
+        }
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, 'batch_manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+# ========== 감시 모드 (저장 시 재생성) ==========
+def _file_stamps(paths):
+    """파일별 (mtime_ns, 크기) 튜플 (없는 파일은 None)"""
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def watch_and_rebuild(converter, converter_factory, md_path, output_path, watch_paths=(), interval: float = 0.2, debounce: float = 0.3, **options):
+    """입력 MD와 규칙북 파일을 감시하다가 변경이 멎으면(debounce) HWPX 재생성
+
+    규칙북(watch_paths)이 바뀌면 converter_factory()로 변환기를 새로 만든다.
+    재생성은 reuse_previous=True로 실행되어 바뀌지 않은 zip 항목(mimetype, version.xml, META-INF/*,
+    settings.xml, content.hpf, header.xml)은 직전 출력의 압축 바이트를 그대로 복사하고 section0.xml만 새로 기록한다.
+    options는 create_hwpx 인자이다. Ctrl+C로 종료.
+    """
+    rule_paths = [p for p in watch_paths if p]
+
+    def rebuild():
+        start = time.perf_counter()
+        try:
+            converter.create_hwpx(md_path, output_path, reuse_previous=True, **options)
+        except Exception as e:
+            # 편집 중 일시적인 오류(파일 잠금 등)로 감시가 끝나지 않도록 보고만 한다
+            print(f"❌ 재생성 실패: {type(e).__name__}: {e}")
+            return
+        print(f"[OK] {datetime.now():%H:%M:%S} 재생성 {time.perf_counter() - start:.3f}초")
+
+    rebuild()
+    last = (_file_stamps([md_path]), _file_stamps(rule_paths))
+    print(f"[INFO] 감시 중: {md_path} (+규칙북 {len(rule_paths)}개), Ctrl+C로 종료")
+    try:
+        while True:
+            time.sleep(interval)
+            current = (_file_stamps([md_path]), _file_stamps(rule_paths))
+            if current == last:
+                continue
+            # 저장이 여러 번의 쓰기로 나뉘어도 한 번만 재생성하도록 변경이 멎을 때까지 대기
+            while True:
+                time.sleep(debounce)
+                settled = (_file_stamps([md_path]), _file_stamps(rule_paths))
+                if settled == current:
+                    break
+                current = settled
+            if current[1] != last[1]:
+                print("[INFO] 규칙북 변경 감지: 다시 로딩")
+                try:
+                    converter = converter_factory()
+                except Exception as e:
+                    print(f"❌ 규칙북 로딩 실패: {type(e).__name__}: {e}")
+                    last = current
+                    continue
+            last = current
+            rebuild()
+    except KeyboardInterrupt:
+        print("[INFO] 감시 종료")
+
+
+# ========== 상주 서버 모드 (HTTP / stdin JSON-RPC) ==========
+# 요청 옵션 중 서버가 받아들이는 키 -> create_hwpx 인자
+SERVER_OPTION_KEYS = {'packaging': 'packaging', 'pin_font': 'pin_font_face', 'template': 'template_hwpx_path'}
+
+
+def _worker_convert_bytes(md_text, options):
+    """메모리의 MD 텍스트를 HWPX 바이트로 변환 (워커에서 실행)"""
+    buf = io.BytesIO()
+    kwargs = {SERVER_OPTION_KEYS[k]: v for k, v in options.items() if k in SERVER_OPTION_KEYS and v is not None}
+    with contextlib.redirect_stdout(io.StringIO()):
+        _WORKER_CONVERTER.create_hwpx(None, buf, md_content=md_text, **kwargs)
+    return buf.getvalue()
+
+
+class ConversionService:
+    """변환기를 워커 풀에 상주시키는 변환 서비스
+
+    규칙북(스타일 JSON/텍스트북)은 파일이 바뀌면 자동으로 다시 로딩하며,
+    재로딩 시 새 워커 풀로 교체하고 기존 풀은 그 풀에 제출된 요청이 모두 끝난 뒤 종료된다.
+    규칙북 로딩과 풀 생성은 이벤트 루프 밖(스레드)에서 실행하고, 풀 교체는 요청 제출과 같은 이벤트 루프 스레드에서 한다.
+    로딩에 실패하면(저장 도중의 JSON 등) 기존 generation을 유지한다.
+    요청의 template은 template_dir 안의 파일 이름만 허용한다 (template_dir 미지정 시 거부).
+    """
+
+    def __init__(self, styles_path, textbook_path=None, jobs=None, template_dir: str | None = None, max_body_bytes: int = 16 * 1024 * 1024, **converter_options):
+        import asyncio
+        self.styles_path = styles_path
+        self.textbook_path = textbook_path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.template_dir = os.path.realpath(template_dir) if template_dir else None
+        self.max_body_bytes = max_body_bytes
+        self.converter_options = converter_options
+        self.generation = 0
+        self.pool = None
+        # 워커 풀 -> 제출 후 끝나지 않은 요청 수 (교체된 풀은 0이 되면 종료)
+        self._inflight = collections.Counter()
+        self._stamp = None
+        self._failed_stamp = None
+        self._reload_lock = asyncio.Lock()
+        self.reload()
+
+    def _rulebook_stamp(self):
+        stamp = []
+        for path in (self.styles_path, self.textbook_path):
+            try:
+                st = os.stat(path) if path else None
+                stamp.append((st.st_mtime_ns, st.st_size) if st else None)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _load(self):
+        """규칙북을 로딩해 새 워커 풀 생성 -> (풀, 규칙북 파일 상태)
+
+        stdout은 JSON-RPC 용도일 수 있으므로 로딩 메시지는 stderr로 기록한다 (스레드에서 실행되므로 sys.stdout은 건드리지 않는다).
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        stamp = self._rulebook_stamp()
+        rulebook = RulebookLoader(self.styles_path, self.textbook_path, log=sys.stderr)
+        converter = MDtoHWPXConverter(self.styles_path, self.textbook_path, rulebook=rulebook, **self.converter_options)
+        converter.get_header_bytes(log=sys.stderr)
+        pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_worker_init, initargs=(converter,))
+        return pool, stamp
+
+    def _install(self, pool, stamp):
+        """새 워커 풀로 교체. 기존 풀은 진행 중인 요청이 없을 때 바로, 있으면 마지막 요청이 끝날 때 종료한다"""
+        old_pool = self.pool
+        self.pool = pool
+        self._stamp = stamp
+        self._failed_stamp = None
+        self.generation += 1
+        if old_pool is not None and not self._inflight[old_pool]:
+            old_pool.shutdown(wait=False)
+        print(f"[INFO] 규칙북 로딩 (generation {self.generation})", file=sys.stderr)
+
+    def reload(self):
+        """규칙북을 로딩해 새 워커 풀 시작 (이벤트 루프 밖에서의 동기 호출용)"""
+        self._install(*self._load())
+
+    def reload_if_changed(self):
+        if self._rulebook_stamp() != self._stamp:
+            self.reload()
+            return True
+        return False
+
+    async def reload_async(self, force: bool = False):
+        """규칙북이 바뀌었으면(force면 항상) 스레드에서 재로딩
+
+        이미 재로딩 중이면 기다리지 않고 기존 풀로 처리한다. 실패는 stderr에 남기고 기존 generation을 유지하며,
+        같은 파일 상태로는 다시 시도하지 않는다 (force 제외).
+        """
+        import asyncio
+        if self._reload_lock.locked() and not force:
+            return False
+        async with self._reload_lock:
+            stamp = self._rulebook_stamp()
+            if not force and stamp in (self._stamp, self._failed_stamp):
+                return False
+            try:
+                pool, stamp = await asyncio.get_running_loop().run_in_executor(None, self._load)
+            except Exception as e:
+                self._failed_stamp = stamp
+                print(f"❌ 규칙북 재로딩 실패 (generation {self.generation} 유지): {type(e).__name__}: {e}", file=sys.stderr)
+                if force:
+                    raise
+                return False
+            self._install(pool, stamp)
+        return True
+
+    def resolve_options(self, options):
+        """요청 옵션 검증: template은 template_dir 안의 기존 파일로만 해석 (아니면 ValueError)"""
+        options = dict(options or {})
+        name = options.get('template')
+        if name:
+            if self.template_dir is None:
+                raise ValueError("template 옵션이 허용되지 않음 (서버 --template-dir 미지정)")
+            path = os.path.realpath(os.path.join(self.template_dir, name))
+            if os.path.commonpath([self.template_dir, path]) != self.template_dir or not os.path.isfile(path):
+                raise ValueError(f"템플릿을 찾을 수 없음: {name}")
+            options['template'] = path
+        return options
+
+    async def convert(self, md_text, options=None):
+        import asyncio
+        options = self.resolve_options(options)
+        await self.reload_async()
+        loop = asyncio.get_running_loop()
+        # 풀을 읽고 제출하는 사이에 await가 없으므로 _install(같은 루프 스레드)과 겹치지 않는다
+        pool = self.pool
+        self._inflight[pool] += 1
+        try:
+            return await loop.run_in_executor(pool, _worker_convert_bytes, md_text, options)
+        finally:
+            self._inflight[pool] -= 1
+            if not self._inflight[pool]:
+                del self._inflight[pool]
+                if pool is not self.pool:
+                    # 교체된 풀의 마지막 요청
+                    pool.shutdown(wait=False)
+
+    async def watch(self, interval: float = 1.0):
+        """요청이 없어도 규칙북 변경을 주기적으로 반영 (재로딩 실패 시에도 계속 감시)"""
+        import asyncio
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload_async()
+            except Exception as e:
+                print(f"❌ 규칙북 감시 오류: {type(e).__name__}: {e}", file=sys.stderr)
+
+    def close(self):
+        for pool in list(self._inflight):
+            if pool is not self.pool:
+                pool.shutdown(wait=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+    # ---- JSON-RPC 2.0 ----
+    async def handle_rpc(self, request):
+        import base64
+        req_id = request.get('id') if isinstance(request, dict) else None
+
+        def error(code, message):
+            return {'jsonrpc': '2.0', 'id': req_id, 'error': {'code': code, 'message': message}}
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return error(-32600, 'invalid request')
+        method = request['method']
+        params = request.get('params') or {}
+        try:
+            if method == 'ping':
+                result = {'generation': self.generation}
+            elif method == 'reload':
+                await self.reload_async(force=True)
+                result = {'generation': self.generation}
+            elif method == 'convert':
+                if not isinstance(params, dict) or not isinstance(params.get('markdown'), str):
+                    return error(-32602, "params.markdown (string) is required")
+                try:
+                    params = self.resolve_options(params)
+                except ValueError as e:
+                    return error(-32602, str(e))
+                start = time.perf_counter()
+                data = await self.convert(params['markdown'], params)
+                result = {
+                    'hwpx_base64': base64.b64encode(data).decode('ascii'),
+                    'bytes': len(data),
+                    'elapsed_sec': round(time.perf_counter() - start, 4),
+                }
+            else:
+                return error(-32601, f'method not found: {method}')
+        except Exception as e:
+            return error(-32603, f"{type(e).__name__}: {e}")
+        return {'jsonrpc': '2.0', 'id': req_id, 'result': result}
+
+    async def serve_stdio(self):
+        """stdin의 JSON-RPC 요청(한 줄에 하나)을 동시 처리하고 응답을 stdout에 한 줄씩 기록"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        out_lock = asyncio.Lock()
+        tasks = set()
+        out = sys.stdout.buffer
+
+        async def respond(line):
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'parse error'}}
+            else:
+                response = await self.handle_rpc(request)
+            async with out_lock:
+                out.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                out.flush()
+
+        while True:
+            # 플랫폼 독립적으로 동작하도록 블로킹 readline은 스레드에서 수행
+            line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.ensure_future(respond(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _handle_http(self, reader, writer):
+        """최소 HTTP/1.1 처리: GET /health, POST /convert (MD 본문 -> HWPX), POST /rpc (JSON-RPC)
+
+        본문이 max_body_bytes를 넘으면 읽지 않고 413, 잘못된 요청(템플릿·인코딩·JSON 등)은 400을 반환한다.
+        """
+        import urllib.parse
+        status, ctype, body = 500, 'application/json', b''
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            method, target, _ = request_line.split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get('content-length') or 0)
+            if length < 0:
+                raise ValueError(f"잘못된 Content-Length: {length}")
+            # 상한을 넘는 본문은 읽지 않는다 (연결은 응답 후 닫힘)
+            payload = await reader.readexactly(length) if length <= self.max_body_bytes else None
+            path, _, query = target.partition('?')
+            if payload is None:
+                status, body = 413, json.dumps({'error': f'body exceeds {self.max_body_bytes} bytes'}).encode('utf-8')
+            elif method == 'GET' and path == '/health':
+                status, body = 200, json.dumps({'status': 'ok', 'generation': self.generation}).encode('utf-8')
+            elif method == 'POST' and path == '/convert':
+                options = dict(urllib.parse.parse_qsl(query))
+                data = await self.convert(payload.decode('utf-8'), options)
+                status, ctype, body = 200, 'application/hwp+zip', data
+            elif method == 'POST' and path == '/rpc':
+                response = await self.handle_rpc(json.loads(payload))
+                status, body = 200, json.dumps(response, ensure_ascii=False).encode('utf-8')
+            else:
+                status, body = 404, json.dumps({'error': 'not found'}).encode('utf-8')
+        except Exception as e:
+            status, ctype = (400 if isinstance(e, ValueError) else 500), 'application/json'
+            body = json.dumps({'error': f"{type(e).__name__}: {e}"}, ensure_ascii=False).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error'}[status]
+        writer.write(
+            f'HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_http(self, host='127.0.0.1', port=8765):
+        import asyncio
+        server = await asyncio.start_server(self._handle_http, host, port)
+        print(f"[OK] 변환 서버 시작: http://{host}:{port} (workers={self.jobs})", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def run_server(service, stdio=False, host='127.0.0.1', port=8765):
+    """상주 서버 실행 (HTTP 또는 stdin JSON-RPC)"""
+    import asyncio
+    async def _main():
+        watcher = asyncio.ensure_future(service.watch())
+        try:
+            if stdio:
+                await service.serve_stdio()
+            else:
+                await service.serve_http(host, port)
+        finally:
+            watcher.cancel()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
 
 def _build_arg_parser():
     parser = argparse.ArgumentParser(description='Markdown to HWPX converter (정부 문서 스타일 대응)')
     parser.add_argument('input', nargs='?', help='입력 Markdown 파일 경로')
     parser.add_argument('output', nargs='?', help='출력 HWPX 파일 경로 (기본: output.hwpx)')
     parser.add_argument('--audit', action='store_true', help='감사 로그(.audit.md) 생성')
+    parser.add_argument('--audit-format', dest='audit_format', choices=AuditWriter.FORMATS, help='감사 로그 형식: md(기본), jsonl, summary(타입별 개수+경고만). 지정 시 --audit 포함')
     parser.add_argument('--template', help='헤더를 복사할 HWPX 템플릿 경로')
+    parser.add_argument('--no-template-remap', dest='template_remap', action='store_false', help='템플릿 사용 시 스타일 ID 재매핑 없이 헤더만 복사')
     parser.add_argument('--styles', help='스타일 JSON 경로 (기본: extracted_styles_v2.json)')
+    parser.add_argument('--rulebook', help='컴파일된 규칙북 번들 경로 (--compile-rulebook 결과, --styles/--textbook 대신 사용)')
+    parser.add_argument('--compile-rulebook', dest='compile_rulebook', metavar='OUT', help='스타일 JSON+텍스트북(+스타일 가이드)을 검증된 규칙북 번들로 컴파일 후 종료')
+    parser.add_argument('--style-guide', dest='style_guide', help='규칙북 컴파일 시 적용할 YAML 스타일 가이드 (PyYAML 필요): mappings로 요소별 ID 지정, char_styles/para_styles 속성은 header의 해당 ID에 반영')
     parser.add_argument('--textbook', help='스타일 텍스트북 경로 (기본: style_textbook.md)')
     parser.add_argument('--pin-font', dest='pin_font', help='모든 문자 스타일을 지정 폰트로 고정 (예: 맑은 고딕)')
     parser.add_argument('--header-audit', action='store_true', help='사용된 para/char 정의 요약 파일 생성(.header.audit.md)')
     parser.add_argument('--packaging', choices=['opf','headref'], default='opf', help='content.hpf 패키징 방식 선택')
     parser.add_argument('--no-lineseg', action='store_true', help='linesegarray를 생성하지 않아 한글에서 줄간격을 자동 계산하도록 강제')
+    parser.add_argument('--line-layout', dest='line_layout', choices=MDtoHWPXConverter.LINE_LAYOUTS, default='fixed', help='linesegarray 계산: fixed=한 줄 고정값(기본, 가장 빠름), metrics=기록할 header(템플릿 포함)의 글꼴·크기로 줄 나눔')
+    parser.add_argument('--validate-refs', dest='validate_refs', choices=ReferenceValidator.MODES, default='warn', help='섹션 기록 중 header에 없는 char/para/borderFill/style 참조 검사: warn=경고(기본), error=중단 후 출력 삭제, off=검사 안 함')
+    parser.add_argument('--font-metrics', dest='font_metrics', metavar='DIR', help='글꼴별 너비 표(<글꼴 이름>.fmet, tools/build_font_metrics.py로 생성) 디렉터리. 없으면 문자 범주별 근사값')
     parser.add_argument('--spacer-mode', action='store_true', help='중기부 표준: 각 스타일 앞에 스페이서 빈 문단(NBSP) 삽입 모드')
+    parser.add_argument('--section-split', dest='section_split', choices=['heading'], help='본문을 최상위 제목(<주제목>, #)마다 section0..N.xml로 분할')
+    parser.add_argument('--section-max-bytes', dest='section_max_bytes', type=int, help='섹션당 MD 원문 크기 상한(바이트). 넘으면 다음 라인에서 새 섹션 시작')
+    parser.add_argument('--section-jobs', dest='section_jobs', type=int, default=1, help='섹션 분할 + deflated 압축 시 기록 대기할 섹션 수 (2 이상이면 압축·기록을 다음 섹션 생성과 겹쳐 수행)')
+    parser.add_argument('--minify', action='store_true', help='생성 XML(header/section)의 들여쓰기·줄바꿈 제거')
+    parser.add_argument('--compression', choices=list(MDtoHWPXConverter.COMPRESSION), default='stored', help='zip 항목 압축 방식 (기본: stored=무압축, 가장 빠름)')
+    parser.add_argument('--compress-level', dest='compress_level', type=int, choices=range(10), metavar='0-9', help='deflated 압축 레벨 (1=빠름, 9=최소 크기, 기본 6)')
+    parser.add_argument('--store-member', dest='stored_members', action='append', default=[], metavar='NAME', help='압축하지 않을 zip 항목 이름/glob (반복 지정, 예: Contents/section0.xml)')
+    parser.add_argument('--stream', action='store_true', help='대용량 입력용 스트리밍 변환 (라인 단위 읽기, section0.xml 직접 기록)')
+    parser.add_argument('--header-cache', dest='header_cache', help='생성된 header.xml을 디스크에 캐시할 디렉터리')
+    parser.add_argument('--para-cache', dest='para_cache', help='렌더링된 문단 XML을 캐시할 디렉터리 (재변환 시 바뀐 라인만 렌더링, 적중률 출력)')
+    parser.add_argument('--output-cache', dest='output_cache', help='완성된 HWPX를 캐시할 디렉터리 (MD·규칙북·템플릿 header·옵션이 같으면 재생성 없이 복사, 감사 로그 요청 시 미사용)')
+    parser.add_argument('--output-cache-link', dest='output_cache_link', action='store_true', help='출력 캐시 적중 시 복사 대신 하드 링크 (출력 파일을 다른 프로그램에서 제자리 저장하면 캐시 항목도 바뀌므로 읽기 전용 출력에만 사용)')
+    parser.add_argument('--output-cache-max-mb', dest='output_cache_max_mb', type=int, default=1024, help='출력 캐시 최대 크기(MB, 초과 시 오래 사용되지 않은 출력부터 제거)')
+    parser.add_argument('--para-cache-max', dest='para_cache_max', type=int, default=256, help='문단 캐시에 보관할 최대 문서 수 (초과 시 오래 사용되지 않은 문서부터 제거)')
+    parser.add_argument('--profile', action='store_true', help='단계별 시간/호출 수/생성 바이트 요약 출력')
+    parser.add_argument('--profile-json', dest='profile_json', help='단계별 계측 결과를 JSON 파일로 기록')
+    parser.add_argument('--profile-pstats', dest='profile_pstats', help='전체 실행 cProfile 통계(pstats) 파일 경로')
+    parser.add_argument('--batch', help='배치 변환: 입력 디렉터리(*.md) 또는 glob 패턴')
+    parser.add_argument('--out-dir', dest='out_dir', help='배치 출력 디렉터리 (기본: batch_output)')
+    parser.add_argument('--jobs', type=int, default=None, help='배치/서버 워커 프로세스 수 (기본: CPU 코어 수)')
+    parser.add_argument('--manifest', help='배치 매니페스트 JSON 경로 (기본: <out-dir>/batch_manifest.json)')
+    parser.add_argument('--watch', action='store_true', help='입력 MD와 규칙북 파일을 감시하다가 저장 시 재생성 (변경 없는 zip 항목은 재압축 없이 재사용)')
+    parser.add_argument('--serve', action='store_true', help='상주 변환 서버 실행 (localhost HTTP: POST /convert, POST /rpc, GET /health)')
+    parser.add_argument('--serve-stdio', dest='serve_stdio', action='store_true', help='상주 변환 서버를 stdin/stdout JSON-RPC(한 줄당 요청 하나)로 실행')
+    parser.add_argument('--host', default='127.0.0.1', help='서버 바인드 주소 (기본: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='서버 포트 (기본: 8765)')
+    parser.add_argument('--template-dir', dest='template_dir', help='서버 요청의 template 옵션으로 지정할 수 있는 HWPX 템플릿 디렉터리 (미지정 시 template 요청 거부)')
+    parser.add_argument('--max-body-mb', dest='max_body_mb', type=int, default=16, help='서버 HTTP 요청 본문 최대 크기(MB, 초과 시 413)')
     parser.add_argument('--test', action='store_true', help='샘플 문서로 테스트 실행')
     return parser
 
@@ -1438,28 +4314,159 @@ def main():
 
     styles_path = args.styles if args.styles else _default_styles_path()
     textbook_path = args.textbook if args.textbook else _default_textbook_path()
+    if args.compile_rulebook:
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                compile_rulebook(styles_path, textbook_path, args.compile_rulebook, args.style_guide)
+        except (ValueError, RuntimeError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"[OK] 규칙북 번들 생성: {args.compile_rulebook} ({os.path.getsize(args.compile_rulebook):,} bytes)")
+        return
+    if args.rulebook:
+        # 번들에 텍스트북이 포함되어 있으므로 별도 로딩 불필요
+        styles_path, textbook_path = args.rulebook, None
     include_lineseg = not args.no_lineseg
-    converter = MDtoHWPXConverter(styles_path, textbook_path, include_lineseg=include_lineseg, spacer_mode=args.spacer_mode)
+    header_cache = HeaderCache(cache_dir=args.header_cache) if args.header_cache else None
+    packaging_options = {
+        'minify': args.minify,
+        'compression': args.compression,
+        'compress_level': args.compress_level,
+        'stored_members': args.stored_members,
+        'validate_refs': args.validate_refs,
+    }
+    layout_options = {
+        'line_layout': args.line_layout,
+        'font_metrics_dir': args.font_metrics,
+    }
+
+    if args.serve or args.serve_stdio:
+        service = ConversionService(
+            styles_path, textbook_path, jobs=args.jobs,
+            template_dir=args.template_dir, max_body_bytes=args.max_body_mb * 1024 * 1024,
+            include_lineseg=include_lineseg, spacer_mode=args.spacer_mode, header_cache=header_cache,
+            **packaging_options, **layout_options
+        )
+        run_server(service, stdio=args.serve_stdio, host=args.host, port=args.port)
+        return
+
+    paragraph_cache = ParagraphCache(args.para_cache, max_entries=args.para_cache_max) if args.para_cache else None
+    output_cache = OutputCache(args.output_cache, max_disk_bytes=args.output_cache_max_mb * 1024 * 1024, link=args.output_cache_link) if args.output_cache else None
+
+    def _make_converter():
+        return MDtoHWPXConverter(styles_path, textbook_path, include_lineseg=include_lineseg, spacer_mode=args.spacer_mode, header_cache=header_cache, paragraph_cache=paragraph_cache, output_cache=output_cache, **packaging_options, **layout_options)
+
+    converter = _make_converter()
+
+    audit_format = args.audit_format or 'md'
+    section_options = {
+        'section_split': args.section_split,
+        'section_max_bytes': args.section_max_bytes,
+        'section_jobs': args.section_jobs,
+    }
+    audit_enabled = args.audit or args.audit_format is not None
+
+    if args.batch:
+        inputs = resolve_batch_inputs(args.batch)
+        if not inputs:
+            print(f"❌ 변환할 MD 파일이 없습니다: {args.batch}")
+            return
+        out_dir = args.out_dir if args.out_dir else 'batch_output'
+        try:
+            manifest = convert_batch(
+                converter, inputs, out_dir,
+                jobs=args.jobs,
+                manifest_path=args.manifest,
+                template=args.template,
+                audit=audit_enabled,
+                audit_format=audit_format,
+                header_audit=args.header_audit,
+                pin_font=args.pin_font,
+                packaging=args.packaging,
+                streaming=args.stream,
+                template_remap=args.template_remap,
+                **section_options
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"[OK] 배치 변환 완료: {manifest['ok']}/{manifest['total']}개 성공 "
+              f"({manifest['wall_sec']}초, jobs={manifest['jobs']})")
+        if 'paragraph_cache' in manifest:
+            pc = manifest['paragraph_cache']
+            rate = f"{pc['hit_rate'] * 100:.1f}%" if pc['hit_rate'] is not None else '-'
+            print(f"[INFO] 문단 캐시: 적중 {pc['hits']:,} / 미스 {pc['misses']:,} (적중률 {rate})")
+        if 'output_cache' in manifest:
+            oc = manifest['output_cache']
+            rate = f"{oc['hit_rate'] * 100:.1f}%" if oc['hit_rate'] is not None else '-'
+            print(f"[INFO] 출력 캐시: 적중 {oc['hits']:,} / 미스 {oc['misses']:,} (적중률 {rate})")
+        for r in manifest['files']:
+            if r['status'] != 'ok':
+                print(f"   실패: {r['input']} — {r['error']}")
+        if manifest['failed']:
+            sys.exit(1)
+        return
 
     if args.input:
         output_file = args.output if args.output else 'output.hwpx'
-        audit_path = None
-        if args.audit:
-            base, _ = os.path.splitext(output_file)
-            audit_path = f"{base}.audit.md"
-        header_audit_path = None
-        if args.header_audit:
-            base, _ = os.path.splitext(output_file)
-            header_audit_path = f"{base}.header.audit.md"
-        converter.create_hwpx(
-            args.input,
-            output_file,
-            template_hwpx_path=args.template,
-            audit_path=audit_path,
-            pin_font_face=args.pin_font,
-            header_audit_path=header_audit_path,
-            packaging=args.packaging
-        )
+        audit_path, header_audit_path = _side_output_paths(output_file, audit_enabled, args.header_audit, audit_format)
+        if args.watch:
+            watch_and_rebuild(
+                converter, _make_converter, args.input, output_file,
+                watch_paths=(styles_path, textbook_path, args.template),
+                template_hwpx_path=args.template,
+                audit_path=audit_path,
+                pin_font_face=args.pin_font,
+                header_audit_path=header_audit_path,
+                packaging=args.packaging,
+                streaming=args.stream,
+                template_remap=args.template_remap,
+                audit_format=audit_format,
+                **section_options
+            )
+            return
+        profiler = None
+        if args.profile or args.profile_json:
+            profiler = PhaseProfiler().install(converter)
+        cprof = None
+        if args.profile_pstats:
+            import cProfile
+            cprof = cProfile.Profile()
+            cprof.enable()
+        start = time.perf_counter()
+        try:
+            converter.create_hwpx(
+                args.input,
+                output_file,
+                template_hwpx_path=args.template,
+                audit_path=audit_path,
+                pin_font_face=args.pin_font,
+                header_audit_path=header_audit_path,
+                packaging=args.packaging,
+                streaming=args.stream,
+                template_remap=args.template_remap,
+                audit_format=audit_format,
+                **section_options
+            )
+        except ValueError as e:
+            # --validate-refs error: 누락 참조로 중단 (부분 출력은 삭제됨)
+            print(f"❌ {e}")
+            sys.exit(1)
+        wall = time.perf_counter() - start
+        if cprof:
+            cprof.disable()
+            cprof.dump_stats(args.profile_pstats)
+            print(f"   cProfile 통계: {args.profile_pstats}")
+        if paragraph_cache is not None:
+            print(paragraph_cache.format_text())
+        if profiler:
+            if args.profile:
+                print(f"\n[PROFILE] 전체 {wall:.4f}초")
+                print(profiler.format_text())
+            if args.profile_json:
+                with open(args.profile_json, 'w', encoding='utf-8') as f:
+                    json.dump({'wall_sec': round(wall, 6), 'phases': profiler.to_dict()}, f, ensure_ascii=False, indent=2)
+                print(f"   계측 결과: {args.profile_json}")
         return
 
     if args.test:
@@ -1470,7 +4477,7 @@ def main():
 
 ## 주요 내용
 
-다음은 *강조된 텍스트*와 `코드`를 포함한 본문입니다.
+다음은 *강조된 텍스트*와 `코드`, ***굵은 기울임***을 포함한 본문입니다.
 
 ### 세부 항목
 
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import md_to_hwpx_v2 as conv  # noqa: E402
+
+STYLES = os.path.join(ROOT, 'extracted_styles_v2.json')
+TEXTBOOK = os.path.join(ROOT, 'style_textbook.md')
+
+
+@pytest.fixture
+def make_converter():
+    """Factory for converters with the repo's default styles JSON and style textbook."""
+    def make(**options):
+        return conv.MDtoHWPXConverter(STYLES, TEXTBOOK, **options)
+    return make
+
+
+@pytest.fixture
+def converter(make_converter):
+    return make_converter()
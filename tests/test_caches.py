@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+import md_to_hwpx_v2 as conv
+from conftest import ROOT
+
+
+def age(path, seconds):
+    """Move a cache file's access/modification time into the past."""
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def test_header_cache_disk_hit_and_lru_eviction(tmp_path):
+    cache = conv.HeaderCache(max_entries=1, cache_dir=str(tmp_path), max_disk_bytes=250)
+    assert cache.get('a') is None
+    cache.put('a', b'A' * 100)
+    age(cache._disk_path('a'), 20)
+    cache.put('b', b'B' * 100)
+    age(cache._disk_path('b'), 10)
+    # 'a' only survives on disk (memory holds one entry); reading it refreshes its LRU position
+    assert cache.get('a') == b'A' * 100
+    cache.put('c', b'C' * 100)
+    assert sorted(os.listdir(tmp_path)) == ['a.header.xml', 'c.header.xml']
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+    assert not [n for n in os.listdir(tmp_path) if n.endswith('.tmp')]
+
+
+def test_output_cache_hit_miss_and_copy(tmp_path, make_converter):
+    md = tmp_path / 'in.md'
+    md.write_text('□ 항목 **굵게**\n', encoding='utf-8')
+    out = tmp_path / 'out.hwpx'
+    cache = conv.OutputCache(str(tmp_path / 'cache'))
+    converter = make_converter(output_cache=cache)
+
+    converter.create_hwpx(str(md), str(out))
+    first = out.read_bytes()
+    converter.create_hwpx(str(md), str(out))
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert out.read_bytes() == first
+    # the default copy mode never shares an inode with the cache entry
+    assert os.stat(out).st_nlink == 1
+
+    md.write_text('□ 항목 *바뀜*\n', encoding='utf-8')
+    converter.create_hwpx(str(md), str(out))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert out.read_bytes() != first
+
+
+def test_paragraph_cache_reuses_unchanged_lines(tmp_path, make_converter):
+    md = tmp_path / 'in.md'
+    lines = [f'□ 항목 {i} **굵게**' for i in range(20)]
+    md.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    cache = conv.ParagraphCache(str(tmp_path / 'cache'))
+    converter = make_converter(paragraph_cache=cache)
+
+    converter.create_hwpx(str(md), str(tmp_path / 'a.hwpx'))
+    assert (cache.hits, cache.misses) == (0, 20)
+    lines[5] = '□ 바뀐 항목'
+    md.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    converter.create_hwpx(str(md), str(tmp_path / 'b.hwpx'))
+    assert (cache.hits, cache.misses) == (19, 21)
+
+    # cached output is identical to a cold conversion
+    make_converter().create_hwpx(str(md), str(tmp_path / 'c.hwpx'))
+    assert (tmp_path / 'b.hwpx').read_bytes() == (tmp_path / 'c.hwpx').read_bytes()
+
+
+def test_paragraph_cache_evicts_oldest_documents(tmp_path):
+    cache = conv.ParagraphCache(str(tmp_path), max_entries=2)
+    for i, doc in enumerate(('a', 'b', 'c')):
+        cache.begin(doc, 'ns')
+        cache.put('body_bullet', 'line', '<p/>')
+        cache.commit()
+        age(cache._disk_path(doc, 'ns'), 30 - i * 10)
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(cache._disk_path(d, 'ns')) for d in ('b', 'c'))
+
+
+def test_paragraph_cache_discards_spool_of_failed_conversion(tmp_path, make_converter):
+    md = tmp_path / 'in.md'
+    md.write_text('□ 항목\n', encoding='utf-8')
+    cache_dir = tmp_path / 'cache'
+    cache = conv.ParagraphCache(str(cache_dir))
+    converter = make_converter(paragraph_cache=cache, validate_refs='error')
+    converter.create_hwpx(str(md), str(tmp_path / 'a.hwpx'))
+    snapshot = sorted(os.listdir(cache_dir))
+
+    # without remapping, the template header lacks the rulebook's charPr IDs and the write aborts midway
+    md.write_text('□ 다른 항목\n', encoding='utf-8')
+    with pytest.raises(conv.MissingReferenceError):
+        converter.create_hwpx(str(md), str(tmp_path / 'b.hwpx'), streaming=True,
+                              template_hwpx_path=os.path.join(ROOT, 'basictest1.hwpx'), template_remap=False)
+    assert sorted(os.listdir(cache_dir)) == snapshot
@@ -0,0 +1,72 @@
+import sys
+
+import pytest
+
+from bench_md_to_hwpx import PATHOLOGICAL_INLINE
+from md_to_hwpx_v2 import HWPXGenerator, InlineSegment, MDParser
+
+BOLD, ITALIC, CODE = InlineSegment.BOLD, InlineSegment.ITALIC, InlineSegment.CODE
+
+
+def inline_steps(line):
+    """Number of Python lines executed by the tokenizer for one input line."""
+    codes = {MDParser.process_inline_formats.__code__, MDParser._close_inline.__code__}
+    steps = 0
+
+    def local(frame, event, arg):
+        nonlocal steps
+        if event == 'line':
+            steps += 1
+        return local
+
+    def tracer(frame, event, arg):
+        return local if frame.f_code in codes else None
+
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        MDParser.process_inline_formats(line, 0)
+    finally:
+        sys.settrace(previous)
+    return steps
+
+
+@pytest.mark.parametrize('build', [b for _, b in PATHOLOGICAL_INLINE], ids=[n for n, _ in PATHOLOGICAL_INLINE])
+def test_tokenizer_steps_grow_linearly(build):
+    short, long = inline_steps(build(100)), inline_steps(build(1600))
+    # a rescanning tokenizer would need about 16x more steps per character here
+    assert long <= short * 16 * 1.1
+
+
+def flags(text):
+    return [(seg.text, seg.flags) for seg in MDParser.process_inline_formats(text, 11)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('plain', [('plain', 0)]),
+    ('a **b** c', [('a ', 0), ('b', BOLD), (' c', 0)]),
+    ('***x***', [('x', BOLD | ITALIC)]),
+    ('**a *b* c**', [('a ', BOLD), ('b', BOLD | ITALIC), (' c', BOLD)]),
+    ('`**x**`', [('**x**', CODE)]),
+    (r'\*x\*', [('*x*', 0)]),
+    # flanking rules: spaced stars are literal
+    ('a * b * c', [('a * b * c', 0)]),
+    ('** spaced **', [('** spaced **', 0)]),
+    ('**unclosed', [('**unclosed', 0)]),
+])
+def test_inline_segments(text, expected):
+    assert flags(text) == expected
+
+
+def test_run_chars_maps_bold_italic_and_merges_same_char(converter):
+    rulebook = converter.rulebook
+    style = rulebook.get_style('paragraph')
+    runs = HWPXGenerator._run_chars(MDParser.process_inline_formats('a **b *c* d** e `x``y`', style['char_id']), style, rulebook)
+    assert runs == [
+        ('a ', style['char_id']),
+        ('b ', style['bold_char_id']),
+        ('c', rulebook.BOLD_ITALIC_CHAR_ID),
+        (' d', style['bold_char_id']),
+        (' e ', style['char_id']),
+        ('xy', rulebook.CODE_CHAR_ID),
+    ]
@@ -0,0 +1,48 @@
+import zipfile
+
+
+def sample_lines(n_sections=4, lines_per_section=40):
+    lines = []
+    for s in range(n_sections):
+        lines.append(f'# 제목 {s}')
+        for i in range(lines_per_section):
+            lines.append(f'□ 항목 {s}-{i} **굵게** 본문')
+            lines.append(f' ◦ 세부 {i} *기울임*')
+    return '\n'.join(lines) + '\n'
+
+
+def test_parallel_section_write_is_byte_identical(make_converter, tmp_path):
+    md = tmp_path / 'in.md'
+    md.write_text(sample_lines(), encoding='utf-8')
+    outputs = []
+    for jobs in (1, 3):
+        out = tmp_path / f'out{jobs}.hwpx'
+        make_converter(compression='deflated').create_hwpx(str(md), str(out), section_split='heading', section_jobs=jobs)
+        with zipfile.ZipFile(out) as z:
+            assert z.testzip() is None
+            assert [n for n in z.namelist() if n.startswith('Contents/section')] == [f'Contents/section{i}.xml' for i in range(4)]
+        outputs.append(out.read_bytes())
+    assert outputs[0] == outputs[1]
+
+
+def test_reuse_previous_matches_fresh_output(make_converter, tmp_path, monkeypatch, capsys):
+    md = tmp_path / 'in.md'
+    out = tmp_path / 'out.hwpx'
+    fresh = tmp_path / 'fresh.hwpx'
+    converter = make_converter(compression='deflated')
+    md.write_text(sample_lines(1), encoding='utf-8')
+    converter.create_hwpx(str(md), str(out))
+    md.write_text(sample_lines(1) + '□ 추가된 항목\n', encoding='utf-8')
+
+    capsys.readouterr()
+    converter.create_hwpx(str(md), str(out), reuse_previous=True)
+    assert ('재사용 항목' in capsys.readouterr().out) == converter.ZIP_RAW_COPY
+    converter.create_hwpx(str(md), str(fresh))
+    with zipfile.ZipFile(out) as z:
+        assert z.testzip() is None
+    assert out.read_bytes() == fresh.read_bytes()
+
+    # without raw copy support every member is written again, with the same result
+    monkeypatch.setattr(type(converter), 'ZIP_RAW_COPY', False)
+    converter.create_hwpx(str(md), str(out), reuse_previous=True)
+    assert out.read_bytes() == fresh.read_bytes()
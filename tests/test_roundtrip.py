@@ -0,0 +1,30 @@
+import io
+import zipfile
+
+import pytest
+
+from conftest import ROOT, STYLES, TEXTBOOK, conv
+from hwpx_to_md import iter_markdown
+
+DOCUMENTS = ['test_input.md', 'test_input2.md', 'sample1.md', 'test_simple.md']
+
+
+def section_xml(path):
+    with zipfile.ZipFile(path) as z:
+        return {n: z.read(n) for n in z.namelist() if n.startswith('Contents/section')}
+
+
+@pytest.mark.parametrize('name', DOCUMENTS)
+def test_markdown_round_trip_reproduces_sections(converter, tmp_path, name):
+    first = tmp_path / 'first.hwpx'
+    back = tmp_path / 'back.md'
+    second = tmp_path / 'second.hwpx'
+    converter.create_hwpx(f'{ROOT}/{name}', str(first))
+
+    rulebook = conv.RulebookLoader(STYLES, TEXTBOOK, log=io.StringIO())
+    back.write_text(''.join(line + '\n' for line in iter_markdown(str(first), rulebook)), encoding='utf-8')
+    converter.create_hwpx(str(back), str(second))
+
+    expected = section_xml(first)
+    assert expected
+    assert section_xml(second) == expected
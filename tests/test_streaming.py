@@ -0,0 +1,27 @@
+import pytest
+
+from conftest import ROOT
+from test_packaging import sample_lines
+
+DOCUMENTS = ['test_input.md', 'test_input2.md', 'sample1.md', 'test_simple.md']
+
+
+@pytest.mark.parametrize('name', DOCUMENTS)
+def test_streaming_output_matches_buffered(converter, tmp_path, name):
+    outputs = []
+    for streaming in (False, True):
+        out = tmp_path / f'out{int(streaming)}.hwpx'
+        converter.create_hwpx(f'{ROOT}/{name}', str(out), streaming=streaming)
+        outputs.append(out.read_bytes())
+    assert outputs[0] == outputs[1]
+
+
+def test_streaming_section_split_matches_buffered(converter, tmp_path):
+    md = tmp_path / 'in.md'
+    md.write_text(sample_lines(), encoding='utf-8')
+    outputs = []
+    for streaming in (False, True):
+        out = tmp_path / f'out{int(streaming)}.hwpx'
+        converter.create_hwpx(str(md), str(out), streaming=streaming, section_split='heading')
+        outputs.append(out.read_bytes())
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MD -> HWPX converter on synthetic government-style documents.
+
+Generates documents with the real marker mix (<주제목>, □, ◦, -, *, <강조>,
+inline **bold** / *italic* / `code`) and times each pipeline phase separately:
+parse, inline formatting, section build, header build, zip write, audit and a
+streaming end-to-end run. Results are written as JSON so they can be compared
+against a stored baseline.
+
+With --packaging, each size is also converted under a matrix of output
+settings (STORED vs DEFLATED at several levels, pretty vs minified XML) and
+the write time and archive size of each are recorded, so the archival vs
+interactive trade-off can be chosen from measurements.
+
+Every run also times the inline tokenizer on pathological lines (runs of
+unmatched `*`, unclosed `**`, stray backticks, escapes) at two lengths and
+fails when the time grows faster than linearly with line length.
+
+Usage:
+  python tools/bench_md_to_hwpx.py --sizes 1000,10000,100000 -o bench.json
+  python tools/bench_md_to_hwpx.py --sizes 10000 --packaging
+  python tools/bench_md_to_hwpx.py --sizes 10000 --line-layout metrics
+  # compare against a baseline (exit code 1 on regression)
+  python tools/bench_md_to_hwpx.py --baseline bench_baseline.json --tolerance 0.2
+  # only the pathological inline lines (exit code 1 on super-linear scaling)
+  python tools/bench_md_to_hwpx.py --sizes 0 --max-inline-scaling 2.0
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import md_to_hwpx_v2 as conv  # noqa: E402
+
+WORDS = [
+    '정부', '지원', '사업', '추진', '계획', '예산', '집행', '현황', '중소기업', '기술',
+    '개발', '성과', '관리', '강화', '확대', '운영', '제도', '개선', '협력', '체계',
+    '2025년', '10억원', '30%', '분기', '평가', '지역', '산업', 'R&D', '플랫폼', '데이터',
+]
+
+# (weight, template) - roughly the marker distribution of consolidated reports
+LINE_KINDS = [
+    (1, '<주제목> {t}'),
+    (6, '□ {t}'),
+    (20, ' ◦ {t}'),
+    (18, '   - {t}'),
+    (8, '    * {t}'),
+    (1, '<강조> {t}'),
+    (10, '{t}'),
+    (14, ''),
+]
+
+
+def _sentence(rng, lo=4, hi=18):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(lo, hi))]
+    r = rng.random()
+    # sprinkle inline markup on a minority of lines
+    if r < 0.10:
+        i = rng.randrange(len(words))
+        words[i] = f'**{words[i]}**'
+    elif r < 0.15:
+        i = rng.randrange(len(words))
+        words[i] = f'*{words[i]}*'
+    elif r < 0.18:
+        i = rng.randrange(len(words))
+        words[i] = f'`{words[i]}`'
+    return ' '.join(words)
+
+
+def generate_lines(n_lines, seed=0):
+    """Yield n_lines synthetic Markdown lines (deterministic for a given seed)."""
+    rng = random.Random(seed)
+    weights = [w for w, _ in LINE_KINDS]
+    templates = [t for _, t in LINE_KINDS]
+    for _ in range(n_lines):
+        tpl = rng.choices(templates, weights)[0]
+        yield tpl.format(t=_sentence(rng)) if tpl else ''
+
+
+def write_corpus(path, n_lines, seed=0):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in generate_lines(n_lines, seed):
+            f.write(line)
+            f.write('\n')
+
+
+def _timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_size(converter, n_lines, repeat=3, seed=0):
+    lines = list(generate_lines(n_lines, seed))
+    parser = converter.parser
+    rulebook = converter.rulebook
+    phases = {}
+
+    def parse():
+        return [parser.parse_line(line) for line in lines]
+    phases['parse'], parsed = _timed(parse, repeat)
+
+    inline_inputs = [(text, rulebook.get_style(et)['char_id']) for et, text, _ in parsed if et != 'empty']
+
+    def inline():
+        for text, char_id in inline_inputs:
+            parser.process_inline_formats(text, char_id)
+    phases['inline'], _ = _timed(inline, repeat)
+
+    # the line layout reads header.xml once; build it here so its [INFO] line stays off stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter._line_layout(None)
+
+    def section():
+        paragraphs, audit_entries = converter.convert('\n'.join(lines))
+        return converter.generator.create_section(paragraphs), audit_entries
+    phases['section_build'], (section_xml, audit_entries) = _timed(section, repeat)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        phases['header_build'], header_xml = _timed(converter._create_header_xml, repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, 'bench.hwpx')
+        section_bytes = section_xml.encode('utf-8')
+        header_bytes = header_xml.encode('utf-8')
+
+        def zip_write():
+            with zipfile.ZipFile(out_path, 'w') as zf:
+                zf.writestr('Contents/header.xml', header_bytes)
+                zf.writestr('Contents/section0.xml', section_bytes)
+        phases['zip_write'], _ = _timed(zip_write, repeat)
+
+        audit_path = os.path.join(tmp, 'bench.audit.md')
+        phases['audit'], _ = _timed(lambda: converter._write_audit(audit_entries, audit_path), repeat)
+
+        md_path = os.path.join(tmp, 'bench.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+        def end_to_end():
+            with contextlib.redirect_stdout(io.StringIO()):
+                converter.create_hwpx(md_path, out_path, streaming=True)
+        phases['end_to_end_stream'], _ = _timed(end_to_end, repeat)
+        output_bytes = os.path.getsize(out_path)
+
+    return {
+        'lines': n_lines,
+        'phases_sec': {k: round(v, 6) for k, v in phases.items()},
+        'lines_per_sec': round(n_lines / phases['end_to_end_stream'], 1) if phases['end_to_end_stream'] else None,
+        'section_bytes': len(section_bytes),
+        'output_bytes': output_bytes,
+    }
+
+
+# (name, converter packaging options) for the --packaging matrix
+PACKAGING_PRESETS = [
+    ('stored', {}),
+    ('stored+minify', {'minify': True}),
+    ('deflate1', {'compression': 'deflated', 'compress_level': 1}),
+    ('deflate1+minify', {'compression': 'deflated', 'compress_level': 1, 'minify': True}),
+    ('deflate6+minify', {'compression': 'deflated', 'compress_level': 6, 'minify': True}),
+    ('deflate9', {'compression': 'deflated', 'compress_level': 9}),
+    ('deflate9+minify', {'compression': 'deflated', 'compress_level': 9, 'minify': True}),
+]
+
+
+def bench_packaging(converter, n_lines, repeat=3, seed=0):
+    """Time create_hwpx and record the archive size for every packaging preset."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        md_path = os.path.join(tmp, 'bench.md')
+        write_corpus(md_path, n_lines, seed)
+        out_path = os.path.join(tmp, 'bench.hwpx')
+        for name, options in PACKAGING_PRESETS:
+            variant = conv.MDtoHWPXConverter(
+                None, include_lineseg=converter.include_lineseg, spacer_mode=converter.spacer_mode,
+                header_cache=converter.header_cache, rulebook=converter.rulebook,
+                line_layout=converter.line_layout, font_metrics_dir=converter.font_metrics_dir, **options
+            )
+
+            def run():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    variant.create_hwpx(md_path, out_path)
+            elapsed, _ = _timed(run, repeat)
+            results[name] = {'sec': round(elapsed, 6), 'bytes': os.path.getsize(out_path)}
+    return results
+
+
+# (name, line builder) - marker soup that makes backtracking tokenizers rescan the line
+PATHOLOGICAL_INLINE = [
+    ('spaced-stars', lambda n: '* ' * n),
+    ('star-words', lambda n: 'a*' * n),
+    ('unclosed-bold', lambda n: '**a ' * n),
+    ('stray-backticks', lambda n: '`a' * n),
+    ('mixed', lambda n: 'x** y* `z ' * n),
+    ('escaped', lambda n: '\\*a\\` ' * n),
+    ('nested', lambda n: '***a** b* ' * n),
+]
+
+
+def bench_inline_stress(parser, char_id, lengths=(2000, 32000), repeat=3):
+    """Time process_inline_formats on pathological lines at a short and a long length.
+
+    'scaling' is the time ratio divided by the length ratio: about 1 for a
+    linear tokenizer, growing with the length ratio for a quadratic one.
+    """
+    short, long = lengths
+    results = {}
+    for name, build in PATHOLOGICAL_INLINE:
+        times = []
+        for n in (short, long):
+            line = build(n)
+            sec, _ = _timed(lambda: parser.process_inline_formats(line, char_id), repeat)
+            times.append(sec)
+        results[name] = {
+            'chars': len(line),
+            'sec': round(times[1], 6),
+            'chars_per_sec': round(len(line) / times[1]) if times[1] else None,
+            'scaling': round(times[1] / times[0] / (long / short), 3) if times[0] else None,
+        }
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """Return a list of (size, phase, base, cur, ratio) entries slower than baseline * (1 + tolerance)."""
+    regressions = []
+    for size, res in current['results'].items():
+        base = baseline.get('results', {}).get(size)
+        if not base:
+            continue
+        for phase, cur in res['phases_sec'].items():
+            old = base['phases_sec'].get(phase)
+            if not old:
+                continue
+            ratio = cur / old
+            if ratio > 1 + tolerance:
+                regressions.append((size, phase, old, cur, ratio))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', default='1000,10000,100000', help='Comma separated line counts (e.g. 1000,10000,1000000)')
+    ap.add_argument('--repeat', type=int, default=3, help='Repetitions per phase (best time is kept)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--styles', default=os.path.join(ROOT, 'extracted_styles_v2.json'))
+    ap.add_argument('--textbook', default=os.path.join(ROOT, 'style_textbook.md'))
+    ap.add_argument('-o', '--output', help='Write results JSON here (default: print to stdout)')
+    ap.add_argument('--baseline', help='Baseline results JSON to compare against')
+    ap.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown ratio before flagging (0.2 = 20%%)')
+    ap.add_argument('--packaging', action='store_true', help='Also measure write time / archive size per compression+minify preset')
+    ap.add_argument('--max-inline-scaling', type=float, default=3.0, help='Fail when inline tokenizer time on pathological lines grows this many times faster than line length')
+    ap.add_argument('--generate', metavar='PATH', help='Only write a synthetic corpus of the first size to PATH')
+    ap.add_argument('--line-layout', dest='line_layout', choices=conv.MDtoHWPXConverter.LINE_LAYOUTS, default='fixed', help='linesegarray layout to benchmark (default: fixed, the converter default)')
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip() and int(s) > 0]
+    if args.generate:
+        write_corpus(args.generate, sizes[0], args.seed)
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter = conv.MDtoHWPXConverter(args.styles, args.textbook, line_layout=args.line_layout)
+
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'line_layout': args.line_layout,
+        },
+        'results': {},
+    }
+    for n in sizes:
+        res = bench_size(converter, n, repeat=args.repeat, seed=args.seed)
+        results['results'][str(n)] = res
+        phases = ', '.join(f"{k}={v:.4f}s" for k, v in res['phases_sec'].items())
+        print(f"[{n} lines] {phases}", file=sys.stderr)
+        if args.packaging:
+            res['packaging'] = bench_packaging(converter, n, repeat=args.repeat, seed=args.seed)
+            for name, r in res['packaging'].items():
+                print(f"[{n} lines] packaging {name}: {r['sec']:.4f}s, {r['bytes']:,} bytes", file=sys.stderr)
+
+    results['inline_stress'] = bench_inline_stress(
+        converter.parser, converter.rulebook.get_style('paragraph')['char_id'], repeat=args.repeat
+    )
+    nonlinear = []
+    for name, r in results['inline_stress'].items():
+        print(f"[inline] {name}: {r['chars']:,} chars in {r['sec']:.4f}s ({r['chars_per_sec']:,} chars/s, scaling {r['scaling']:.2f})", file=sys.stderr)
+        if r['scaling'] is not None and r['scaling'] > args.max_inline_scaling:
+            nonlinear.append(name)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for size, phase, old, cur, ratio in regressions:
+            print(f"REGRESSION [{size} lines] {phase}: {old:.4f}s -> {cur:.4f}s ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+    for name in nonlinear:
+        print(f"NONLINEAR [inline] {name}: scaling {results['inline_stress'][name]['scaling']:.2f} > {args.max_inline_scaling}", file=sys.stderr)
+    if nonlinear:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Build per-font advance-width tables (.fmet) for the converter's line layout.
+
+Each table holds the horizontal advance of every BMP code point in 1/1000 em,
+so md_to_hwpx_v2.py can memory-map it and break paragraphs into lines the same
+way Hancom does (word wrap at spaces, character wrap only for over-long words).
+The file is named after the font face used in header.xml (e.g. 휴먼명조.fmet) and
+looked up with --font-metrics DIR.
+
+Reading TrueType/OpenType fonts requires fontTools (pip install fonttools).
+--approximate writes the built-in per-category approximation instead, which is
+useful as a starting point or when the font files are not available.
+
+Usage:
+  python tools/build_font_metrics.py /usr/share/fonts/HMKMMAG.TTF --face 휴먼명조 -o fonts/metrics
+  python tools/build_font_metrics.py malgun.ttf --face "맑은 고딕" -o fonts/metrics
+  python tools/build_font_metrics.py --approximate --face HY헤드라인M -o fonts/metrics
+  python md_to_hwpx_v2.py report.md out.hwpx --font-metrics fonts/metrics
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from md_to_hwpx_v2 import FontMetrics  # noqa: E402
+
+
+def widths_from_font(font_path, fallback=None):
+    """Return a 65536-entry list of advances (1/1000 em) read from a TTF/OTF/TTC font.
+
+    Code points the font has no glyph for take the value from `fallback`
+    (a FontMetrics), so symbols rendered through font substitution still get a
+    sensible width.
+    """
+    try:
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        raise RuntimeError('reading font files requires fontTools (pip install fonttools)')
+
+    font = TTFont(font_path, fontNumber=0, lazy=True)
+    units = font['head'].unitsPerEm
+    hmtx = font['hmtx']
+    cmap = font.getBestCmap() or {}
+    widths = list(fallback.widths) if fallback is not None else [FontMetrics.UNITS_PER_EM] * 0x10000
+    for cp, glyph in cmap.items():
+        if cp < 0x10000:
+            advance, _lsb = hmtx[glyph]
+            widths[cp] = min(0xFFFF, round(advance * FontMetrics.UNITS_PER_EM / units))
+    font.close()
+    return widths
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('font', nargs='?', help='TrueType/OpenType font file')
+    ap.add_argument('--face', required=True, help='Font face name as written in header.xml (file is saved as <face>.fmet)')
+    ap.add_argument('-o', '--output-dir', default=os.path.join(ROOT, 'fonts', 'metrics'), help='Directory for .fmet files')
+    ap.add_argument('--approximate', action='store_true', help='Write the built-in per-category approximation instead of reading a font')
+    args = ap.parse_args()
+
+    approx = FontMetrics.approximate(args.face)
+    if args.approximate:
+        widths = list(approx.widths)
+    elif args.font:
+        try:
+            widths = widths_from_font(args.font, fallback=approx)
+        except RuntimeError as e:
+            print(f'error: {e}', file=sys.stderr)
+            sys.exit(1)
+    else:
+        ap.error('a font file or --approximate is required')
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out_path = os.path.join(args.output_dir, f'{args.face}.fmet')
+    with open(out_path, 'wb') as f:
+        f.write(FontMetrics.encode(widths, default=FontMetrics.UNITS_PER_EM))
+    print(f'wrote {out_path} ({os.path.getsize(out_path):,} bytes)')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,18 +4,33 @@ Extract core styles from an HWPX package into a concise Markdown report.
 
 Reads:
 - Contents/header.xml (char/para styles, fonts)
-- Contents/section*.xml (usage counts)
+- Contents/section*.xml (usage counts, streamed with iterparse)
+
+Given a directory instead of a file, every *.hwpx below it is analysed on a
+process pool and the per-file counters are merged into one corpus report:
+style frequencies (by definition, since IDs differ between documents), ID usage
+for rulebook decisions, font usage and outlier documents.
 
 Usage:
   python tools/extract_hwpx_styles.py target1.hwpx > style_report_target1.md
   # or
   python tools/extract_hwpx_styles.py target1.hwpx -o style_report_target1.md
+  # corpus mode
+  python tools/extract_hwpx_styles.py archive/ --jobs 8 -o corpus_styles.md
+  python tools/extract_hwpx_styles.py archive/ --format json -o corpus_styles.json
+  # reuse parsed header/usage results for unchanged packages (keyed by zip CRC32s)
+  python tools/extract_hwpx_styles.py target1.hwpx --cache .style_report_cache
 """
 
 import argparse
 import collections
+import functools
+import hashlib
 import io
+import json
+import os
 import sys
+import time
 import zipfile
 import xml.etree.ElementTree as ET
 
@@ -114,30 +129,129 @@ def extract_para_styles(head_root: ET.Element):
     return results
 
 
+_P = f"{{{NS['hp']}}}p"
+_RUN = f"{{{NS['hp']}}}run"
+
+
+def _section_names(zf: zipfile.ZipFile):
+    return [name for name in zf.namelist()
+            if name.startswith('Contents/') and name.lower().endswith('.xml') and 'section' in name.lower()]
+
+
 def extract_usage(zf: zipfile.ZipFile):
+    """Count paraPrIDRef per hp:p and charPrIDRef per hp:run over all sections.
+
+    Sections are streamed with iterparse straight from the zip member; every
+    element is counted once on its start event (so runs of paragraphs nested in
+    table cells are not counted again for the enclosing paragraph) and removed
+    from its parent when it ends, keeping memory flat for very large sections.
+    """
     para_count = collections.Counter()
     char_count = collections.Counter()
-    for name in zf.namelist():
-        if name.startswith('Contents/') and name.lower().endswith('.xml') and 'section' in name.lower():
-            root = _read_xml_from_zip(zf, name)
-            for p in root.findall('.//hp:p', NS):
-                pid = p.get('paraPrIDRef')
-                if pid:
-                    para_count[int(pid)] += 1
-                for run in p.findall('.//hp:run', NS):
-                    cid = run.get('charPrIDRef')
-                    if cid:
-                        char_count[int(cid)] += 1
+    for name in _section_names(zf):
+        with zf.open(name) as f:
+            stack = []
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    tag = elem.tag
+                    if tag == _RUN:
+                        cid = elem.get('charPrIDRef')
+                        if cid:
+                            char_count[int(cid)] += 1
+                    elif tag == _P:
+                        pid = elem.get('paraPrIDRef')
+                        if pid:
+                            para_count[int(pid)] += 1
+                    stack.append(elem)
+                else:
+                    stack.pop()
+                    if stack:
+                        stack[-1].remove(elem)
     return para_count, char_count
 
 
-def generate_report(hwpx_path: str) -> str:
+class ReportCache:
+    """On-disk cache of parsed header and usage results.
+
+    Keys come from the CRC32 and size the zip central directory already stores
+    for Contents/header.xml and the section members, so an unchanged package is
+    recognised without decompressing or parsing anything. Header and usage are
+    cached separately: a package with a new body but the same header still
+    reuses the parsed styles.
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def header_key(cls, zf: zipfile.ZipFile) -> str:
+        info = zf.getinfo('Contents/header.xml')
+        return f"header-v{cls.VERSION}-{info.CRC:08x}-{info.file_size}"
+
+    @classmethod
+    def usage_key(cls, zf: zipfile.ZipFile) -> str:
+        h = hashlib.sha1()
+        for name in sorted(_section_names(zf)):
+            info = zf.getinfo(name)
+            h.update(f"{name}:{info.CRC:08x}:{info.file_size}\n".encode('utf-8'))
+        return f"usage-v{cls.VERSION}-{h.hexdigest()}"
+
+    def get(self, key: str):
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value) -> None:
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        # parallel corpus workers may write the same entry; never expose a partial file
+        os.replace(tmp, path)
+
+
+def load_header(zf: zipfile.ZipFile, cache: ReportCache | None = None):
+    """(fonts, char styles, para styles) of Contents/header.xml, from the cache when its CRC matches."""
+    key = cache.header_key(zf) if cache is not None else None
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return {int(k): v for k, v in cached['fonts'].items()}, cached['chars'], cached['paras']
+    head_root = _read_xml_from_zip(zf, 'Contents/header.xml')
+    fonts = extract_fonts(head_root)
+    chars = extract_char_styles(head_root, fonts)
+    paras = extract_para_styles(head_root)
+    if cache is not None:
+        cache.put(key, {'fonts': fonts, 'chars': chars, 'paras': paras})
+    return fonts, chars, paras
+
+
+def load_usage(zf: zipfile.ZipFile, cache: ReportCache | None = None):
+    """extract_usage() result, from the cache when every section CRC matches."""
+    key = cache.usage_key(zf) if cache is not None else None
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return (collections.Counter({int(k): v for k, v in cached['para'].items()}),
+                collections.Counter({int(k): v for k, v in cached['char'].items()}))
+    para_use, char_use = extract_usage(zf)
+    if cache is not None:
+        cache.put(key, {'para': para_use, 'char': char_use})
+    return para_use, char_use
+
+
+def generate_report(hwpx_path: str, cache: ReportCache | None = None) -> str:
     with zipfile.ZipFile(hwpx_path) as zf:
-        head_root = _read_xml_from_zip(zf, 'Contents/header.xml')
-        fonts = extract_fonts(head_root)
-        chars = extract_char_styles(head_root, fonts)
-        paras = extract_para_styles(head_root)
-        para_use, char_use = extract_usage(zf)
+        _fonts, chars, paras = load_header(zf, cache)
+        para_use, char_use = load_usage(zf, cache)
 
     out = io.StringIO()
     out.write(f"# Style Report for {hwpx_path}\n\n")
@@ -171,17 +285,204 @@ def generate_report(hwpx_path: str) -> str:
     return out.getvalue()
 
 
+# ---------- corpus mode ----------
+
+def char_signature(c):
+    """Definition of a charPr independent of its ID (comparable across documents)."""
+    return (c['height'], c['textColor'], c['bold'], c['italic'], c['underline'], c['font_hangul'], c['font_latin'])
+
+
+def para_signature(p):
+    lsp = p['lineSpacing'] or {}
+    return (p['align'], lsp.get('type'), lsp.get('value'), p['indent'], p['spaceBefore'], p['spaceAfter'])
+
+
+def format_char_signature(sig):
+    height, color, bold, italic, underline, hangul, latin = sig
+    flags = ''.join(f for f, on in (('B', bold), ('I', italic)) if on)
+    return f"height={height} color={color}{' ' + flags if flags else ''} underline={underline} font={hangul}/{latin}"
+
+
+def format_para_signature(sig):
+    align, lsp_type, lsp_value, indent, before, after = sig
+    return f"align={align} lineSpacing={lsp_type}/{lsp_value} indent={indent} spaceBefore={before} spaceAfter={after}"
+
+
+def analyze_package(hwpx_path: str, cache_dir: str | None = None) -> dict:
+    """Compact per-file statistics for corpus mode (only Counters, cheap to pickle back from a worker)."""
+    cache = ReportCache(cache_dir) if cache_dir else None
+    try:
+        with zipfile.ZipFile(hwpx_path) as zf:
+            _fonts, chars, paras = load_header(zf, cache)
+            para_use, char_use = load_usage(zf, cache)
+    except (KeyError, OSError, zipfile.BadZipFile, ET.ParseError, UnicodeDecodeError) as e:
+        return {'path': hwpx_path, 'error': f'{type(e).__name__}: {e}'}
+
+    char_sigs = {c['id']: char_signature(c) for c in chars}
+    para_sigs = {p['id']: para_signature(p) for p in paras}
+    char_styles = collections.Counter()
+    font_use = collections.Counter()
+    for cid, n in char_use.items():
+        sig = char_sigs.get(cid)
+        if sig is not None:
+            char_styles[sig] += n
+            font_use[sig[5]] += n
+    para_styles = collections.Counter()
+    for pid, n in para_use.items():
+        sig = para_sigs.get(pid)
+        if sig is not None:
+            para_styles[sig] += n
+    return {
+        'path': hwpx_path,
+        'para_use': para_use,
+        'char_use': char_use,
+        'char_styles': char_styles,
+        'para_styles': para_styles,
+        'fonts': font_use,
+        'undefined_chars': sorted(set(char_use) - set(char_sigs)),
+        'undefined_paras': sorted(set(para_use) - set(para_sigs)),
+    }
+
+
+def find_packages(source: str):
+    if os.path.isdir(source):
+        paths = []
+        for dirpath, _dirs, files in os.walk(source):
+            paths.extend(os.path.join(dirpath, f) for f in files if f.lower().endswith('.hwpx'))
+        return sorted(paths)
+    return [source]
+
+
+def analyze_corpus(paths, jobs=None, cache_dir=None):
+    """Run analyze_package over paths (process pool when jobs != 1), results in input order."""
+    jobs = jobs or os.cpu_count() or 1
+    analyze = functools.partial(analyze_package, cache_dir=cache_dir)
+    if jobs == 1 or len(paths) < 2:
+        return [analyze(p) for p in paths]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # small chunks keep workers busy when file sizes vary a lot
+        return list(pool.map(analyze, paths, chunksize=max(1, min(32, len(paths) // (jobs * 8)))))
+
+
+def merge_corpus(results, rare: float = 0.05, top: int = 20) -> dict:
+    """Merge per-file counters into totals, document frequencies and outliers.
+
+    A style/font is rare when fewer than `rare` (fraction) of the analysed documents use it;
+    outlier documents are the ones with the largest share of runs in rare character styles,
+    plus every document that references IDs its header does not define.
+    """
+    ok = [r for r in results if 'error' not in r]
+    totals = {key: collections.Counter() for key in ('para_use', 'char_use', 'char_styles', 'para_styles', 'fonts')}
+    docs = {key: collections.Counter() for key in totals}
+    for r in ok:
+        for key, total in totals.items():
+            total.update(r[key])
+            docs[key].update(r[key].keys())
+
+    min_docs = max(1, rare * len(ok))
+    rare_styles = {sig for sig, n in docs['char_styles'].items() if n < min_docs}
+    outliers = []
+    for r in ok:
+        runs = sum(r['char_styles'].values())
+        rare_runs = sum(n for sig, n in r['char_styles'].items() if sig in rare_styles)
+        if rare_runs:
+            outliers.append({'path': r['path'], 'rare_run_share': round(rare_runs / runs, 4), 'rare_runs': rare_runs})
+    outliers.sort(key=lambda o: (-o['rare_run_share'], o['path']))
+
+    return {
+        'files': len(results),
+        'analyzed': len(ok),
+        'failed': [{'path': r['path'], 'error': r['error']} for r in results if 'error' in r],
+        'rare_threshold': rare,
+        'char_styles': [
+            {'style': format_char_signature(sig), 'runs': n, 'docs': docs['char_styles'][sig]}
+            for sig, n in totals['char_styles'].most_common(top)
+        ],
+        'para_styles': [
+            {'style': format_para_signature(sig), 'paras': n, 'docs': docs['para_styles'][sig]}
+            for sig, n in totals['para_styles'].most_common(top)
+        ],
+        'char_ids': [{'id': cid, 'runs': n, 'docs': docs['char_use'][cid]} for cid, n in totals['char_use'].most_common(top)],
+        'para_ids': [{'id': pid, 'paras': n, 'docs': docs['para_use'][pid]} for pid, n in totals['para_use'].most_common(top)],
+        'fonts': [{'font': face, 'runs': n, 'docs': docs['fonts'][face]} for face, n in totals['fonts'].most_common()],
+        'rare_fonts': sorted(face for face, n in docs['fonts'].items() if n < min_docs),
+        'outliers': outliers[:top],
+        'undefined_refs': [
+            {'path': r['path'], 'char_ids': r['undefined_chars'], 'para_ids': r['undefined_paras']}
+            for r in ok if r['undefined_chars'] or r['undefined_paras']
+        ],
+    }
+
+
+def format_corpus_report(source: str, corpus: dict) -> str:
+    out = io.StringIO()
+    out.write(f"# Corpus Style Report for {source}\n\n")
+    out.write(f"- files: {corpus['files']} (analyzed {corpus['analyzed']}, failed {len(corpus['failed'])})\n")
+    out.write(f"- rare = used by fewer than {corpus['rare_threshold']:.0%} of documents\n")
+
+    out.write("\n## Character Styles (by definition)\n")
+    for c in corpus['char_styles']:
+        out.write(f"- {c['style']}: {c['runs']} runs in {c['docs']} docs\n")
+    out.write("\n## Paragraph Styles (by definition)\n")
+    for p in corpus['para_styles']:
+        out.write(f"- {p['style']}: {p['paras']} paras in {p['docs']} docs\n")
+
+    out.write("\n## ID Usage\n")
+    out.write("- charPr: " + ", ".join(f"{c['id']}({c['runs']}/{c['docs']} docs)" for c in corpus['char_ids']) + "\n")
+    out.write("- paraPr: " + ", ".join(f"{p['id']}({p['paras']}/{p['docs']} docs)" for p in corpus['para_ids']) + "\n")
+
+    out.write("\n## Fonts (hangul face, by runs)\n")
+    for f in corpus['fonts']:
+        rare = ' (rare)' if f['font'] in corpus['rare_fonts'] else ''
+        out.write(f"- {f['font']}: {f['runs']} runs in {f['docs']} docs{rare}\n")
+
+    out.write("\n## Outliers\n")
+    if not corpus['outliers'] and not corpus['undefined_refs']:
+        out.write("- none\n")
+    for o in corpus['outliers']:
+        out.write(f"- {o['path']}: {o['rare_run_share']:.1%} of runs in rare character styles ({o['rare_runs']} runs)\n")
+    for u in corpus['undefined_refs']:
+        out.write(f"- {u['path']}: references undefined charPr {u['char_ids']} paraPr {u['para_ids']}\n")
+    if corpus['failed']:
+        out.write("\n## Failed\n")
+        for f in corpus['failed']:
+            out.write(f"- {f['path']}: {f['error']}\n")
+    return out.getvalue()
+
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('hwpx', help='Path to .hwpx file')
+    ap.add_argument('hwpx', help='Path to .hwpx file, or a directory of them for a corpus report')
     ap.add_argument('-o', '--output', help='Output report path (md). If omitted, prints to stdout')
+    ap.add_argument('--jobs', type=int, default=None, help='Corpus mode: worker processes (default: CPU count)')
+    ap.add_argument('--format', choices=['md', 'json'], default='md', help='Corpus mode: report format')
+    ap.add_argument('--top', type=int, default=20, help='Corpus mode: entries per frequency list')
+    ap.add_argument('--rare', type=float, default=0.05, help='Corpus mode: document share below which a style/font is rare')
+    ap.add_argument('--cache', metavar='DIR', help='Cache parsed header/usage results here, keyed by the zip CRC32s')
     args = ap.parse_args()
 
-    try:
-        report = generate_report(args.hwpx)
-    except KeyError as e:
-        print(f"Missing expected entry in package: {e}", file=sys.stderr)
-        sys.exit(1)
+    if os.path.isdir(args.hwpx):
+        paths = find_packages(args.hwpx)
+        if not paths:
+            print(f"No .hwpx files under {args.hwpx}", file=sys.stderr)
+            sys.exit(1)
+        start = time.perf_counter()
+        corpus = merge_corpus(analyze_corpus(paths, args.jobs, args.cache), rare=args.rare, top=args.top)
+        print(f"analyzed {corpus['analyzed']}/{corpus['files']} files in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        if args.format == 'json':
+            report = json.dumps(corpus, ensure_ascii=False, indent=2)
+        else:
+            report = format_corpus_report(args.hwpx, corpus)
+    else:
+        cache = ReportCache(args.cache) if args.cache else None
+        try:
+            report = generate_report(args.hwpx, cache)
+        except KeyError as e:
+            print(f"Missing expected entry in package: {e}", file=sys.stderr)
+            sys.exit(1)
+        if cache is not None:
+            print(f"cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
 
     if args.output:
         with open(args.output, 'w', encoding='utf-8') as f:
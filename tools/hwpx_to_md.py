@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Convert an HWPX package back to the Markdown dialect md_to_hwpx_v2.py reads.
+
+Walks Contents/section*.xml with iterparse and drops every top-level paragraph
+and table row once it has been written, so memory stays bounded by the largest
+single paragraph/row rather than the document. Paragraph and character IDs are
+mapped back through the rulebook (RulebookLoader.patterns):
+
+- paraPr IDs select the element type (□ / ◦ / - / * lines, #/## headings,
+  "- " list items); the result is re-classified with MDParser so the output
+  converts back to the same style
+- <주제목> 3-row tables and <강조> 1-cell tables become their marker lines,
+  other tables become GFM tables (alignment from the cell paraPr IDs)
+- bold/italic/bold-italic/code charPr IDs become **...**, *...*, ***...***
+  and `...`; literal * and ` that would otherwise read as markup are
+  backslash-escaped
+- spacer paragraphs (--spacer-mode) are dropped, NBSP-only paragraphs become
+  blank lines
+
+Usage:
+  python tools/hwpx_to_md.py received.hwpx -o received.md
+  python tools/hwpx_to_md.py received.hwpx --rulebook rulebook.bin > received.md
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import operator
+import os
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from md_to_hwpx_v2 import HWPX_NS, MDParser, RulebookLoader  # noqa: E402
+
+P = f"{{{HWPX_NS['hp']}}}p"
+RUN = f"{{{HWPX_NS['hp']}}}run"
+T = f"{{{HWPX_NS['hp']}}}t"
+TBL = f"{{{HWPX_NS['hp']}}}tbl"
+TR = f"{{{HWPX_NS['hp']}}}tr"
+TC = f"{{{HWPX_NS['hp']}}}tc"
+SUBLIST = f"{{{HWPX_NS['hp']}}}subList"
+TAB = f"{{{HWPX_NS['hp']}}}tab"
+LINE_BREAK = f"{{{HWPX_NS['hp']}}}lineBreak"
+
+SECTION_RE = re.compile(r'Contents/section(\d+)\.xml$')
+
+# Markdown prefix the classifier strips from the paragraph text of these element types
+MARKDOWN_PREFIX = {'h1': '# ', 'h2': '## ', 'h3': '### ', 'ul': '- ', 'ul_level2': '  - ', 'ol': '1. '}
+
+# element types tried first when several share one paraPr ID
+TYPE_ORDER = [
+    'sub_title', 'body_bullet', 'description_dash', 'description_star',
+    'h1', 'h2', 'h3', 'paragraph', 'ul', 'ul_level2', 'ol',
+]
+
+NBSP = '\u00a0'
+
+
+def section_members(zf: zipfile.ZipFile):
+    """Section member names in document order (section0, section1, ...)."""
+    found = []
+    for name in zf.namelist():
+        m = SECTION_RE.match(name)
+        if m:
+            found.append((int(m.group(1)), name))
+    return [name for _, name in sorted(found)]
+
+
+def run_text(run: ET.Element) -> str:
+    """Text of one hp:run (tabs/line breaks inside hp:t become a tab/space)."""
+    parts = []
+    for t in run.iter(T):
+        if t.text:
+            parts.append(t.text)
+        for child in t:
+            if child.tag == TAB:
+                parts.append('\t')
+            elif child.tag == LINE_BREAK:
+                parts.append(' ')
+            if child.tail:
+                parts.append(child.tail)
+    return ''.join(parts)
+
+
+def paragraph_runs(p: ET.Element):
+    """[(text, charPr ID)] for the direct runs of a paragraph (nested table text included)."""
+    runs = []
+    for run in p.findall(RUN):
+        text = run_text(run)
+        if text:
+            runs.append((text, int(run.get('charPrIDRef', '0'))))
+    return runs
+
+
+def escape_cell(text: str) -> str:
+    return text.replace('|', '\\|')
+
+
+# * next to a non-space character can open or close emphasis, any ` can open a code span
+INLINE_MARKUP_RE = re.compile(r'(?<=\S)\*|\*(?=\S)|`')
+
+
+def escape_inline(text: str) -> str:
+    return INLINE_MARKUP_RE.sub(lambda m: '\\' + m.group(), text)
+
+
+class MarkdownWriter:
+    """Maps paraPr/charPr IDs of a generated (or template-styled) HWPX back to Markdown lines."""
+
+    def __init__(self, rulebook: RulebookLoader):
+        self.rulebook = rulebook
+        self.types_by_para = {}
+        for element_type in TYPE_ORDER:
+            pattern = rulebook.patterns.get(element_type)
+            if pattern:
+                self.types_by_para.setdefault(pattern['para_id'], []).append(element_type)
+        self.spacer_paras = {s['para_id'] for s in rulebook.SPACER.values()}
+        self.title_para = rulebook.get_style('main_title')['para_id']
+        self.emphasis_para = rulebook.get_style('emphasis')['para_id']
+        self.align_by_para = {pid: align for align, pid in rulebook.TABLE['align_para_ids'].items()}
+        # --spacer-mode documents put a spacer before every sub_title/body_bullet/- /* line,
+        # which tells "□ ..." apart from "## □ ..." (same paraPr, no spacer)
+        self.spacer_mode = False
+        self.after_spacer = False
+        self.spacer_refs = re.compile(
+            '|'.join(f'paraPrIDRef="{pid}"' for pid in sorted(self.spacer_paras)).encode() or b'(?!)'
+        )
+
+    def uses_spacers(self, f, chunk_size: int = 1024 * 1024) -> bool:
+        """Scan raw section bytes for spacer paragraphs (no XML parsing)."""
+        tail = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return False
+            if self.spacer_refs.search(tail + chunk):
+                return True
+            tail = chunk[-32:]
+
+    def inline(self, runs, element_type) -> str:
+        """Runs -> text with **bold**, *italic*, ***bold italic*** and `code` markup for the element's style.
+
+        Emphasis delimiters are only written where the bold/italic state changes, so
+        a bold-italic run inside a bold span comes out nested (**a *b* c**) instead
+        of as adjacent spans that would not parse back.
+        """
+        style = self.rulebook.get_style(element_type)
+        bold = style.get('bold_char_id', self.rulebook.BOLD_CHAR_ID)
+        italic = style.get('italic_char_id', self.rulebook.ITALIC_CHAR_ID)
+        bold_italic = style.get('bold_italic_char_id', self.rulebook.BOLD_ITALIC_CHAR_ID)
+        # charPr -> emphasis delimiters, in opening order (*** opens italic, then bold)
+        emphasis = {bold: ('**',), italic: ('*',), bold_italic: ('*', '**')}
+        if style['char_id'] in emphasis:
+            # e.g. <강조> whose base style is already the bold charPr
+            emphasis = {k: v for k, v in emphasis.items() if k != style['char_id']}
+        parts = []
+        opened = []
+        # adjacent runs with the same charPr (e.g. nested emphasis) are written as one span
+        for char_id, group in itertools.groupby(runs, key=operator.itemgetter(1)):
+            text = ''.join(t for t, _ in group)
+            if char_id == self.rulebook.CODE_CHAR_ID:
+                # code keeps no emphasis of its own, so open spans simply continue around it
+                parts.append(f'`{text}`')
+                continue
+            wanted = emphasis.get(char_id, ())
+            # close from the innermost delimiter down to the first one no longer wanted
+            keep = 0
+            while keep < len(opened) and opened[keep] in wanted:
+                keep += 1
+            parts.extend(reversed(opened[keep:]))
+            del opened[keep:]
+            for mark in wanted:
+                if mark not in opened:
+                    opened.append(mark)
+                    parts.append(mark)
+            parts.append(escape_inline(text))
+        parts.extend(reversed(opened))
+        return ''.join(parts)
+
+    def paragraph(self, para_id: int, runs):
+        """Markdown line for a top-level paragraph, or None for paragraphs that carry no text."""
+        if para_id in self.spacer_paras:
+            self.after_spacer = True
+            return None
+        after_spacer, self.after_spacer = self.after_spacer, False
+        plain = ''.join(text for text, _ in runs)
+        if not plain:
+            return None
+        if not plain.strip(NBSP + ' '):
+            return ''
+        element_type = self.element_type(para_id, plain, after_spacer)
+        line = self.inline(runs, element_type)
+        return MARKDOWN_PREFIX.get(element_type, '') + line
+
+    def element_type(self, para_id: int, plain: str, after_spacer: bool = False) -> str:
+        """Element type whose rendering matches para_id and whose Markdown classifies back to it."""
+        candidates = self.types_by_para.get(para_id)
+        if not candidates:
+            return 'paragraph'
+        parsed_type = MDParser.parse_line(plain)[0]
+        missing_spacer = self.spacer_mode and not after_spacer and parsed_type in self.rulebook.SPACER
+        if parsed_type in candidates and not missing_spacer:
+            return parsed_type
+        for element_type in candidates:
+            prefix = MARKDOWN_PREFIX.get(element_type)
+            if prefix and MDParser.parse_line(prefix + plain)[0] == element_type:
+                return element_type
+        return 'paragraph'
+
+    def marker_table(self, rows):
+        """<주제목>/<강조> line for a 1-column table built by create_title_table/create_emphasis_table, else None."""
+        cells = [cell for row in rows for cell in row if cell[1]]
+        if len(cells) != 1:
+            return None
+        para_id, runs = cells[0]
+        if para_id == self.title_para and len(rows) == 3:
+            return f"<주제목> {self.inline(runs, 'main_title')}"
+        if para_id == self.emphasis_para and len(rows) == 1:
+            text = self.inline(runs, 'emphasis')
+            return f"<강조> {text[1:].lstrip() if text.startswith('◈') else text}"
+        return None
+
+    def table_row(self, row, element_type) -> str:
+        return '| ' + ' | '.join(escape_cell(self.inline(runs, element_type)) for _, runs in row) + ' |'
+
+    def delimiter_row(self, header, row=None) -> str:
+        """GFM alignment row from the cell paraPr IDs (a column on the default paraPrs -> ---).
+
+        Body cells are checked first; the header cell tells an explicit :--- apart when the
+        body default is the left-aligned paraPr.
+        """
+        defaults = (self.rulebook.get_style('table_header')['para_id'], self.rulebook.get_style('table_cell')['para_id'])
+        marks = {'left': ':---', 'center': ':---:', 'right': '---:'}
+        cells = []
+        for col, (header_para, _) in enumerate(header):
+            body_para = row[col][0] if row and col < len(row) else None
+            align = None
+            if body_para is not None and body_para != defaults[1]:
+                align = self.align_by_para.get(body_para)
+            elif header_para != defaults[0]:
+                align = self.align_by_para.get(header_para)
+            cells.append(marks.get(align, '---'))
+        return '| ' + ' | '.join(cells) + ' |'
+
+
+class TableState:
+    """Rows of the top-level table currently being streamed."""
+
+    def __init__(self, elem: ET.Element):
+        self.elem = elem
+        self.cols = int(elem.get('colCnt', '0') or 0)
+        rows = int(elem.get('rowCnt', '0') or 0)
+        # 1-column tables of up to 3 rows may be <주제목>/<강조>: keep them until the end
+        self.buffered = self.cols == 1 and rows <= 3
+        self.rows = []
+        self.header = None
+        self.emitted = 0
+
+
+def cell_contents(tr: ET.Element):
+    """[(paraPr ID, runs)] per cell; multi-paragraph cells are joined with a space."""
+    cells = []
+    for tc in tr.findall(TC):
+        para_id = None
+        runs = []
+        sub = tc.find(SUBLIST)
+        for p in (sub.findall(P) if sub is not None else []):
+            p_runs = paragraph_runs(p)
+            if para_id is None or (p_runs and not runs):
+                para_id = int(p.get('paraPrIDRef', '0'))
+            if p_runs:
+                if runs:
+                    runs.append((' ', runs[-1][1]))
+                runs.extend(p_runs)
+        cells.append((para_id or 0, runs))
+    return cells
+
+
+def iter_section_markdown(source, writer: MarkdownWriter):
+    """Yield Markdown lines for one section XML file object, clearing elements as they are consumed."""
+    stack = []
+    table = None
+    table_in_paragraph = False
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == TBL and table is None:
+                table = TableState(elem)
+            stack.append(elem)
+            continue
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if elem.tag == TR and table is not None and parent is table.elem:
+            row = cell_contents(elem)
+            parent.remove(elem)
+            if table.buffered:
+                table.rows.append(row)
+            elif table.header is None:
+                table.header = row
+            else:
+                if table.emitted == 0:
+                    yield writer.table_row(table.header, 'table_header')
+                    yield writer.delimiter_row(table.header, row)
+                yield writer.table_row(row, 'table_cell')
+                table.emitted += 1
+        elif elem.tag == TBL and table is not None and elem is table.elem:
+            yield from _finish_table(table, writer)
+            writer.after_spacer = False
+            table = None
+            table_in_paragraph = True
+        elif elem.tag == P and parent is not None and len(stack) == 1:
+            # top-level paragraph (parent is hs:sec); a paragraph anchoring a table was already written
+            if not table_in_paragraph:
+                line = writer.paragraph(int(elem.get('paraPrIDRef', '0')), paragraph_runs(elem))
+                if line is not None:
+                    yield line
+            table_in_paragraph = False
+            parent.remove(elem)
+
+
+def _finish_table(table: TableState, writer: MarkdownWriter):
+    if table.buffered:
+        line = writer.marker_table(table.rows)
+        if line is not None:
+            yield line
+            return
+        if not table.rows:
+            return
+        table.header, rest = table.rows[0], table.rows[1:]
+        yield writer.table_row(table.header, 'table_header')
+        yield writer.delimiter_row(table.header, rest[0] if rest else None)
+        for row in rest:
+            yield writer.table_row(row, 'table_cell')
+    elif table.header is None:
+        return
+    elif table.emitted == 0:
+        # header-only table
+        yield writer.table_row(table.header, 'table_header')
+        yield writer.delimiter_row(table.header)
+    # a following table must not continue this one
+    yield ''
+
+
+def iter_markdown(hwpx_path: str, rulebook: RulebookLoader):
+    """Yield the Markdown lines of every section of an HWPX package in document order."""
+    writer = MarkdownWriter(rulebook)
+    with zipfile.ZipFile(hwpx_path) as zf:
+        for name in section_members(zf):
+            with zf.open(name) as f:
+                writer.spacer_mode = writer.uses_spacers(f)
+            with zf.open(name) as f:
+                yield from iter_section_markdown(f, writer)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('hwpx', help='HWPX file to convert')
+    ap.add_argument('-o', '--output', help='Write Markdown here (default: stdout)')
+    ap.add_argument('--styles', default=os.path.join(ROOT, 'extracted_styles_v2.json'), help='Style JSON the document was generated with')
+    ap.add_argument('--textbook', default=os.path.join(ROOT, 'style_textbook.md'))
+    ap.add_argument('--rulebook', help='Compiled rulebook bundle (overrides --styles/--textbook)')
+    args = ap.parse_args()
+
+    # RulebookLoader reports progress on stdout, which may be the Markdown output
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.rulebook:
+            rulebook = RulebookLoader(args.rulebook)
+        else:
+            rulebook = RulebookLoader(args.styles, args.textbook)
+
+    out = open(args.output, 'w', encoding='utf-8', newline='\n') if args.output else sys.stdout
+    try:
+        count = 0
+        for line in iter_markdown(args.hwpx, rulebook):
+            out.write(line)
+            out.write('\n')
+            count += 1
+    except (zipfile.BadZipFile, ET.ParseError) as e:
+        print(f'error: {args.hwpx}: {e}', file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.output:
+        print(f'wrote {args.output} ({count:,} lines)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()